@@ -55,6 +55,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Opt-in per-view latency/query metrics (see ATTENDANCE_METRICS_ENABLED)
+    'tracker.middleware.RequestMetricsMiddleware',
+    # Compress large JSON API responses (see ATTENDANCE_GZIP_MIN_BYTES)
+    'tracker.middleware.JSONGZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +66,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Reporting views read from the replica when one is configured
+    'tracker.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'attendance.urls'
@@ -94,6 +100,50 @@ DATABASES = {
     }
 }
 
+# Optional read replica for reporting views: a second SQLite file kept
+# current by `manage.py sync_replica`, opened read-only. Tests use the
+# primary for it.
+ATTENDANCE_REPLICA_PATH = os.environ.get('ATTENDANCE_REPLICA_PATH', '')
+if ATTENDANCE_REPLICA_PATH:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': Path(ATTENDANCE_REPLICA_PATH).resolve().as_uri() + '?mode=ro',
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['tracker.routers.ReplicaRouter']
+
+# Cache: in-process locmem by default. 'file' and the socket-based
+# 'memcached' (needs pymemcache) or 'redis' (needs redis) backends are
+# shared between worker processes. ATTENDANCE_CACHE_LOCATION overrides the
+# default location; bump ATTENDANCE_CACHE_VERSION to drop every entry at once.
+_CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'attendance'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', 'unix:/tmp/memcached.sock'),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'unix:///tmp/redis.sock'),
+}
+_cache_backend, _cache_location = _CACHE_BACKENDS[os.environ.get('ATTENDANCE_CACHE', 'locmem')]
+CACHES = {
+    'default': {
+        'BACKEND': _cache_backend,
+        'LOCATION': os.environ.get('ATTENDANCE_CACHE_LOCATION', _cache_location),
+        'KEY_PREFIX': 'attendance',
+        'VERSION': int(os.environ.get('ATTENDANCE_CACHE_VERSION', '1')),
+    }
+}
+
+# Seconds entries live per cache namespace (None = until invalidated).
+# Roster-derived entries are also invalidated whenever teams or students
+# change; status and dashboard include live tap counts, so they are short.
+ATTENDANCE_CACHE_TTL = {
+    'rfid': 300,
+    'teams': 300,
+    'status': 5,
+    'dashboard': 5,
+    'occupancy': None,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -132,6 +182,16 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# `collectstatic` writes content-hashed, precompressed copies to STATIC_ROOT
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'tracker.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+
+# Serve STATIC_ROOT from the app (with far-future caching) when DEBUG is off
+# and no front-end server handles /static/
+ATTENDANCE_SERVE_STATIC = os.environ.get('ATTENDANCE_SERVE_STATIC', 'True').lower() in ('true', '1', 'yes')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -140,3 +200,68 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Login URL
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
+
+# Attendance log archives written by `manage.py archive_attendance`
+ATTENDANCE_ARCHIVE_DIR = BASE_DIR / 'archives'
+
+# Logs older than this many days are moved to cold storage by
+# `manage.py apply_retention`; daily summaries stay online.
+ATTENDANCE_RETENTION_DAYS = int(os.environ.get('ATTENDANCE_RETENTION_DAYS', '30'))
+
+# Record per-view latency and DB query metrics, exposed at /api/metrics
+# and in a Server-Timing response header
+ATTENDANCE_METRICS_ENABLED = os.environ.get('ATTENDANCE_METRICS_ENABLED', 'False').lower() in ('true', '1', 'yes')
+
+# Time each phase of the RFID tap (lookup, insert, ...) with perf_counter_ns;
+# can also be switched at runtime via POST /api/debug/tap-phases
+ATTENDANCE_TAP_TRACING = os.environ.get('ATTENDANCE_TAP_TRACING', 'False').lower() in ('true', '1', 'yes')
+ATTENDANCE_TRACE_WINDOW = 2048
+# Shared secret for POST /api/debug/tap-phases outside DEBUG mode, sent in
+# an X-Debug-Token header (`manage.py tap_top` reads it from here). Empty
+# disables the endpoint's controls unless DEBUG is on.
+ATTENDANCE_DEBUG_TOKEN = os.environ.get('ATTENDANCE_DEBUG_TOKEN', '')
+
+# How readers print UIDs made of digits only: 'decimal', or 'hex' for
+# readers that print hex without separators. UIDs with A-F or byte
+# separators are always hex. Run `manage.py rebuild_rfid_aliases` after
+# changing it.
+ATTENDANCE_RFID_DIGITS = os.environ.get('ATTENDANCE_RFID_DIGITS', 'decimal')
+
+# Per-gate tap stats at /api/attendance/gates: sliding window length and
+# ring buffer size per reader (taps beyond the buffer in one window are
+# not counted in its rate)
+ATTENDANCE_GATE_WINDOW_SECONDS = 60
+ATTENDANCE_GATE_BUFFER_SIZE = 1024
+
+# Token-bucket limit on taps per reader id: ATTENDANCE_TAP_BURST taps at
+# once, refilled at ATTENDANCE_TAP_RATE per second. Over-limit taps get
+# 429 + Retry-After. Taps without a reader_id share a bucket per client IP.
+# A rate of 0 disables it.
+ATTENDANCE_TAP_RATE = float(os.environ.get('ATTENDANCE_TAP_RATE', '5'))
+ATTENDANCE_TAP_BURST = int(os.environ.get('ATTENDANCE_TAP_BURST', '20'))
+# Header a trusted reverse proxy sets to the client address (e.g.
+# 'X-Forwarded-For'); empty uses REMOTE_ADDR. Only set it behind a proxy
+# that overwrites or appends to it, since clients can send it themselves.
+ATTENDANCE_CLIENT_IP_HEADER = os.environ.get('ATTENDANCE_CLIENT_IP_HEADER', '')
+
+# Responses to POSTs sent with an Idempotency-Key header are replayed for
+# repeats of the key for this many seconds; the most recent ones are also
+# kept in memory
+ATTENDANCE_IDEMPOTENCY_TTL = 24 * 60 * 60
+ATTENDANCE_IDEMPOTENCY_CACHE_SIZE = 2048
+
+# Views served from the replica for GET/HEAD requests (shell-style
+# patterns on the URL name), and how often (seconds) sync_replica
+# refreshes it. Each sync copies the whole file, so keep this well above
+# the time one copy takes.
+ATTENDANCE_REPLICA_VIEWS = [
+    'dashboard',
+    'download_attendance_csv',
+    'get_team_attendance',
+    'get_student_attendance',
+    'admin:*_changelist',
+]
+ATTENDANCE_REPLICA_SYNC_INTERVAL = 30
+
+# JSON responses at least this large are gzipped for clients that accept it
+ATTENDANCE_GZIP_MIN_BYTES = 1024
@@ -14,11 +14,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.urls import include,path
 
+from tracker.staticfiles import serve_static
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('tracker.urls')),
 ]
+
+if settings.ATTENDANCE_SERVE_STATIC:
+    # runserver with DEBUG on serves app static dirs itself before this
+    urlpatterns.append(
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static)
+    )
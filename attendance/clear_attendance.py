@@ -1,6 +1,10 @@
 """
 Script to clear all attendance logs while keeping teams and students intact.
 Useful for testing / resetting between days.
+
+Logs are archived to ATTENDANCE_ARCHIVE_DIR first and then deleted in small
+chunks, so running this during an event does not stall live RFID taps.
+Restore with: python manage.py archive_attendance --restore <archive>
 """
 import os
 import sys
@@ -10,9 +14,13 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance.settings')
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 django.setup()
 
+from tracker.archive import archive_and_purge
+from tracker.management.commands.archive_attendance import default_archive_path
 from tracker.models import AttendanceLog
 
 if __name__ == '__main__':
-    count = AttendanceLog.objects.count()
-    AttendanceLog.objects.all().delete()
-    print(f"Cleared {count} attendance log(s). Teams and students are untouched.")
+    path = default_archive_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    archived, deleted = archive_and_purge(AttendanceLog.objects.all(), path)
+    print(f"Archived {archived} attendance log(s) to {path}.")
+    print(f"Cleared {deleted} attendance log(s). Teams and students are untouched.")
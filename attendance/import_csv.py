@@ -13,7 +13,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 django.setup()
 
 from django.utils import timezone
-from tracker.models import Team, Student, AttendanceLog
+from tracker.models import Team, Student, RFIDAlias, AttendanceLog
+from tracker.rfid import canonical_uid, uid_aliases
 
 CSV_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
                         'Attendance (RF ID) - Sheet1.csv')
@@ -65,19 +66,22 @@ def import_csv():
             team = team_cache[current_team_name]
 
             # Check if student with this RFID already exists
-            if Student.objects.filter(rfid_uid=rfid).exists():
+            if RFIDAlias.objects.filter(alias__in=uid_aliases(rfid)).exists():
                 print(f"  Skipped (RFID exists): {name} ({rfid})")
                 continue
 
             # Create student - set registered_at manually, bypass full_clean
-            student = Student(name=name, rfid_uid=rfid, team=team, registered_at=now)
+            student = Student(
+                name=name, rfid_uid=rfid, uid_canonical=canonical_uid(rfid), team=team, registered_at=now
+            )
             student.save_base(raw=True)
+            RFIDAlias.index([student])
             students_created += 1
 
-            # Mark team as complete if it now has 6 students
-            if team.students.count() == 6:
-                team.is_complete = True
-                team.save_base(raw=True)
+            # Keep the denormalized count in sync; complete at 6 students
+            team.student_count += 1
+            team.is_complete = team.student_count >= 6
+            team.save_base(raw=True)
 
     print(f"\n=== Import Summary ===")
     print(f"Teams created: {teams_created}")
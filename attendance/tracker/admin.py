@@ -2,31 +2,116 @@
 """
 Django Admin configuration for RFID Team-Based Event Attendance System
 """
-from django.contrib import admin
-from .models import Team, Student, AttendanceLog
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
+
+from .models import (
+    Team, Student, RFIDAlias, AttendanceLog, ArchivedAttendanceLog, DailyAttendanceSummary, AttendanceSession
+)
+from .utils import AttendanceService
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never counts more than count_limit rows.
+
+    An unfiltered table is sized from its id range (two index lookups).
+    A filtered changelist is counted exactly up to count_limit; past
+    that, paging stops at count_limit rows and search or filters narrow
+    the list down.
+    """
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+            if bounds['low'] is None:
+                return 0
+            return bounds['high'] - bounds['low'] + 1
+        return queryset.order_by()[:self.count_limit].count()
+
+
+class TeamFilter(admin.SimpleListFilter):
+    """
+    Filter by team name typed into a search box.
+
+    The stock related-field filter lists every team in the sidebar; this
+    one is a single input however many teams there are.
+    """
+    title = 'team'
+    parameter_name = 'team_name'
+    template = 'admin/tracker/text_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value:
+            # Resolve the teams first so the filter uses the team_id index
+            return queryset.filter(team__in=Team.objects.filter(team_name__icontains=value.strip()))
+        return queryset
+
+    def choices(self, changelist):
+        # Everything else in the query string rides along as hidden inputs
+        params = [
+            (name, value) for name, value in changelist.params.items()
+            if name not in (self.parameter_name, 'p', 'e')
+        ]
+        yield {'value': self.value() or '', 'params': params}
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow to millions of rows."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('student__team', 'team')
 
 
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
     """Admin interface for Team model."""
-    list_display = ('team_name', 'is_complete', 'get_student_count', 'created_at')
+    list_display = ('team_name', 'is_complete', 'student_count', 'created_at')
     list_filter = ('is_complete', 'created_at')
     search_fields = ('team_name',)
-    readonly_fields = ('is_complete', 'created_at')
-    
-    def get_student_count(self, obj):
-        """Display student count in list view."""
-        return obj.students.count()
-    get_student_count.short_description = 'Student Count'
+    readonly_fields = ('is_complete', 'student_count', 'created_at')
+    actions = ['check_out_students']
+
+    @admin.action(description='Check out students still IN')
+    def check_out_students(self, request, queryset):
+        checked_out = AttendanceService.check_out_all(team_ids=queryset.values('id'))
+        self.message_user(request, f'Checked out {checked_out} student(s).', messages.SUCCESS)
+
+
+class RFIDAliasInline(admin.TabularInline):
+    """Read-only list of the reader encodings a student's card answers to."""
+    model = RFIDAlias
+    fields = ('alias',)
+    readonly_fields = ('alias',)
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
     """Admin interface for Student model."""
-    list_display = ('name', 'rfid_uid', 'team', 'registered_at')
-    list_filter = ('team', 'registered_at')
-    search_fields = ('name', 'rfid_uid', 'team__team_name')
-    readonly_fields = ('registered_at',)
+    list_display = ('name', 'rfid_uid', 'uid_canonical', 'team', 'registered_at')
+    list_filter = (TeamFilter, 'registered_at')
+    list_select_related = ('team',)
+    autocomplete_fields = ('team',)
+    search_fields = ('name', 'rfid_uid', 'uid_canonical', 'team__team_name')
+    readonly_fields = ('uid_canonical', 'registered_at')
+    inlines = [RFIDAliasInline]
     
     def get_readonly_fields(self, request, obj=None):
         """Make RFID and team read-only after creation."""
@@ -36,15 +121,57 @@ class StudentAdmin(admin.ModelAdmin):
 
 
 @admin.register(AttendanceLog)
-class AttendanceLogAdmin(admin.ModelAdmin):
+class AttendanceLogAdmin(LargeTableAdmin):
     """Admin interface for AttendanceLog model."""
-    list_display = ('student', 'team', 'status', 'check_in_time', 'check_out_time', 'created_at')
-    list_filter = ('status', 'team', 'created_at')
-    search_fields = ('student__name', 'student__rfid_uid', 'team__team_name')
+    list_display = ('student', 'team', 'status', 'reader_id', 'check_in_time', 'check_out_time', 'created_at')
+    # A date filter instead of date_hierarchy, which scans the table for its dates
+    list_filter = ('status', TeamFilter, 'created_at')
+    search_fields = ('student__name', 'student__rfid_uid', 'team__team_name', 'reader_id')
     readonly_fields = ('created_at', 'check_in_time', 'check_out_time')
-    date_hierarchy = 'created_at'
+    autocomplete_fields = ('student', 'team')
     
     def has_add_permission(self, request):
         """Disable manual creation of attendance logs (should be created via RFID tap)."""
         return False
 
+
+@admin.register(ArchivedAttendanceLog)
+class ArchivedAttendanceLogAdmin(LargeTableAdmin):
+    """Read-only admin interface for logs moved to cold storage."""
+    list_display = ('student', 'team', 'status', 'check_in_time', 'check_out_time', 'created_at')
+    list_filter = ('status', TeamFilter)
+    search_fields = ('student__name', 'student__rfid_uid', 'team__team_name')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailyAttendanceSummary)
+class DailyAttendanceSummaryAdmin(LargeTableAdmin):
+    """Read-only admin interface for per-student daily rollups."""
+    list_display = ('student', 'team', 'date', 'first_in', 'last_out', 'in_count', 'out_count')
+    list_filter = ('date', TeamFilter)
+    search_fields = ('student__name', 'student__rfid_uid', 'team__team_name')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AttendanceSession)
+class AttendanceSessionAdmin(LargeTableAdmin):
+    """Read-only admin interface for paired IN/OUT sessions."""
+    list_display = ('student', 'team', 'check_in_time', 'check_out_time', 'duration')
+    list_filter = (TeamFilter, 'check_in_time')
+    search_fields = ('student__name', 'student__rfid_uid', 'team__team_name')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
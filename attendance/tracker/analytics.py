@@ -0,0 +1,280 @@
+# tracker/analytics.py
+"""
+Attendance analytics for RFID team attendance system.
+
+Occupancy is computed from the day's taps as a per-minute curve: IN and OUT
+taps are counted per team and minute in SQL, each IN adds +1 and each OUT
+-1 to its minute slot, and a running sum over the slots gives how many
+people are inside at each minute. A day has as many slots as it has real
+minutes, so days when the clocks change get 1380 or 1500.
+
+Arrival/departure histograms are bucketed in SQL (hour truncation plus a
+minute slot), so only one row per non-empty bucket leaves the database.
+Both read the archive table too when the range reaches back into it.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, ExtractMinute, Floor, TruncHour, TruncMinute
+from django.utils import timezone
+
+from .archive import archive_horizon
+from .caching import OCCUPANCY, app_cache
+from .models import Team, Student, AttendanceLog, ArchivedAttendanceLog
+
+HISTOGRAM_INTERVALS = {
+    '5m': 5,
+    '15m': 15,
+    '30m': 30,
+    '1h': 60,
+}
+MAX_HISTOGRAM_DAYS = 31
+
+
+def _log_models(start):
+    """Log tables to read for taps from start on: cold storage only when it reaches that far."""
+    horizon = archive_horizon()
+    if horizon is None or horizon < start:
+        return (AttendanceLog,)
+    return (AttendanceLog, ArchivedAttendanceLog)
+
+
+class OccupancyService:
+    """Per-minute occupancy timeline and peak analytics."""
+
+    @staticmethod
+    def day_bounds(day):
+        """Return the aware [start, end) datetimes of a local calendar day."""
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), datetime.min.time()))
+        return start, end
+
+    @staticmethod
+    def _elapsed_minutes(start, moment):
+        """Whole minutes from start to moment, in real time across DST changes."""
+        # Aware datetimes sharing a tzinfo subtract as wall-clock times, so
+        # compare them in UTC
+        elapsed = moment.astimezone(dt_timezone.utc) - start.astimezone(dt_timezone.utc)
+        return int(elapsed.total_seconds() // 60)
+
+    @staticmethod
+    def _minutes_covered(start, end):
+        """Minutes of the curve: the whole day, or up to now for the current day."""
+        now = timezone.now()
+        if start <= now < end:
+            return OccupancyService._elapsed_minutes(start, now) + 1
+        # 1440, or 1380/1500 on the days clocks change
+        return OccupancyService._elapsed_minutes(start, end)
+
+    @staticmethod
+    def _initial_occupancy(start):
+        """
+        Count students already inside when the day starts, per team.
+
+        A student is inside if their last tap before the start was IN.
+        Archived logs are older than online ones, so the archive is only
+        consulted for students with no online tap before the start.
+        """
+        statuses = []
+        models = (AttendanceLog,) if archive_horizon() is None else (AttendanceLog, ArchivedAttendanceLog)
+        for model in models:
+            statuses.append(Subquery(model.objects.filter(
+                student=OuterRef('pk'), created_at__lt=start
+            ).order_by('-created_at').values('status')[:1]))
+        last_status = Coalesce(*statuses) if len(statuses) > 1 else statuses[0]
+
+        rows = Student.objects.annotate(
+            last_status=last_status
+        ).filter(last_status='IN').values('team_id').annotate(inside=Count('id'))
+        return {row['team_id']: row['inside'] for row in rows}
+
+    @staticmethod
+    def _minute_deltas(start, end, minutes):
+        """
+        Net +1/-1 per (team, minute) of the day, counted in SQL.
+
+        Only one row per team, minute and status leaves the database, and
+        the archive is included when the day has been moved there.
+
+        Returns:
+            tuple: ({team_id: {minute: delta}}, {team_id: first IN minute})
+        """
+        deltas, first_in = {}, {}
+        for model in _log_models(start):
+            rows = model.objects.filter(
+                created_at__gte=start, created_at__lt=end
+            ).annotate(
+                minute=TruncMinute('created_at', tzinfo=dt_timezone.utc)
+            ).values('team_id', 'minute', 'status').annotate(taps=Count('id')).order_by()
+            for row in rows:
+                minute = min(max(OccupancyService._elapsed_minutes(start, row['minute']), 0), minutes - 1)
+                team_id = row['team_id']
+                step = row['taps'] if row['status'] == 'IN' else -row['taps']
+                team_deltas = deltas.setdefault(team_id, {})
+                team_deltas[minute] = team_deltas.get(minute, 0) + step
+                if step > 0 and minute < first_in.get(team_id, minutes):
+                    first_in[team_id] = minute
+        return deltas, first_in
+
+    @staticmethod
+    def _curve(initial, deltas, minutes):
+        """Running sum of sparse per-minute deltas starting from the initial occupancy."""
+        return list(accumulate((deltas.get(minute, 0) for minute in range(minutes)), initial=initial))[1:]
+
+    @staticmethod
+    def _peak(curve, first_in_minute, start):
+        """Summarize the peak of a curve and how long after the first arrival it came."""
+        peak = max(curve) if curve else 0
+        peak_minute = curve.index(peak) if curve else 0
+        peak_time = start.astimezone(dt_timezone.utc) + timedelta(minutes=peak_minute)
+        return {
+            'peak': peak,
+            'peak_time': timezone.localtime(peak_time).isoformat(),
+            # None when nobody arrived, or the peak was already there before the first arrival
+            'time_to_peak_minutes': (
+                peak_minute - first_in_minute
+                if first_in_minute is not None and peak_minute >= first_in_minute else None
+            ),
+        }
+
+    @staticmethod
+    def _compute(day):
+        """Build the occupancy timeline for a day from its per-minute tap counts."""
+        start, end = OccupancyService.day_bounds(day)
+        initial = OccupancyService._initial_occupancy(start)
+
+        minutes = OccupancyService._minutes_covered(start, end)
+        team_deltas, team_first_in = OccupancyService._minute_deltas(start, end, minutes)
+
+        event_deltas = {}
+        for deltas in team_deltas.values():
+            for minute, step in deltas.items():
+                event_deltas[minute] = event_deltas.get(minute, 0) + step
+        event_curve = OccupancyService._curve(sum(initial.values()), event_deltas, minutes)
+        event_first_in = min(team_first_in.values()) if team_first_in else None
+
+        teams = []
+        team_names = dict(Team.objects.values_list('id', 'team_name'))
+        for team_id in sorted(set(team_deltas) | set(initial), key=lambda pk: team_names.get(pk, '')):
+            curve = OccupancyService._curve(initial.get(team_id, 0), team_deltas.get(team_id, {}), minutes)
+            teams.append({
+                'team_id': team_id,
+                'team_name': team_names.get(team_id),
+                **OccupancyService._peak(curve, team_first_in.get(team_id), start),
+                'curve': curve,
+            })
+
+        return {
+            'date': day.isoformat(),
+            'start': start.isoformat(),
+            'interval_minutes': 1,
+            'initial_occupancy': sum(initial.values()),
+            **OccupancyService._peak(event_curve, event_first_in, start),
+            'curve': event_curve,
+            'teams': teams,
+        }
+
+    @staticmethod
+    def get_occupancy(day):
+        """
+        Get the occupancy timeline for a day, cached until a new tap lands in it.
+
+        The cache version is the newest log id and log count within the day,
+        so any new (or deleted) tap for that day invalidates the entry. Days
+        moved to cold storage by the retention policy are read from the
+        archive; days purged by archive_attendance have no taps left and
+        give a flat curve until they are restored.
+
+        Args:
+            day (date): Local calendar day
+
+        Returns:
+            dict: Event-wide curve and peak plus a per-team breakdown
+        """
+        start, end = OccupancyService.day_bounds(day)
+        version = {
+            model._meta.model_name: tuple(model.objects.filter(
+                created_at__gte=start, created_at__lt=end
+            ).aggregate(last_id=Max('id'), taps=Count('id')).values())
+            for model in _log_models(start)
+        }
+        # Today's curve also grows by one slot every minute
+        version['minutes'] = OccupancyService._minutes_covered(start, end)
+
+        cached = app_cache.get(OCCUPANCY, day.isoformat())
+        if cached and cached['version'] == version:
+            return cached['result']
+
+        result = OccupancyService._compute(day)
+        app_cache.set(OCCUPANCY, day.isoformat(), {'version': version, 'result': result})
+        return result
+
+
+class HistogramService:
+    """Arrival/departure counts per time bucket."""
+
+    @staticmethod
+    def get_histogram(start, end, interval='1h', team_id=None):
+        """
+        Count IN and OUT taps per time bucket between start and end.
+
+        Buckets are computed in SQL by truncating to the hour and grouping
+        minutes into fixed slots, so the cost depends on the number of
+        buckets rather than the number of taps. Ranges reaching back past
+        the retention horizon also count the archived logs.
+
+        Args:
+            start (datetime): Range start (inclusive)
+            end (datetime): Range end (exclusive)
+            interval (str): One of HISTOGRAM_INTERVALS
+            team_id (int): Optional team filter
+
+        Returns:
+            list: Zero-filled buckets of {'start', 'in', 'out'}, oldest first
+
+        Raises:
+            ValidationError: If the interval or range is invalid
+        """
+        if interval not in HISTOGRAM_INTERVALS:
+            raise ValidationError(
+                f"Invalid interval '{interval}'. Choose one of: {', '.join(HISTOGRAM_INTERVALS)}"
+            )
+        if end <= start:
+            raise ValidationError("'to' must be after 'from'")
+        if end - start > timedelta(days=MAX_HISTOGRAM_DAYS):
+            raise ValidationError(f"Range cannot exceed {MAX_HISTOGRAM_DAYS} days")
+
+        minutes = HISTOGRAM_INTERVALS[interval]
+        tz = timezone.get_current_timezone()
+        counts = {}
+        for model in _log_models(start):
+            logs = model.objects.filter(created_at__gte=start, created_at__lt=end)
+            if team_id:
+                logs = logs.filter(team_id=team_id)
+
+            rows = logs.annotate(
+                hour=TruncHour('created_at', tzinfo=tz),
+                slot=Floor(ExtractMinute('created_at', tzinfo=tz) / Value(minutes)),
+            ).values('hour', 'slot', 'status').annotate(taps=Count('id')).order_by()
+            for row in rows:
+                bucket = row['hour'] + timedelta(minutes=int(row['slot']) * minutes)
+                counts.setdefault(bucket, {'IN': 0, 'OUT': 0})[row['status']] += row['taps']
+
+        # Zero-fill from the bucket containing start up to end
+        local_start = timezone.localtime(start, tz)
+        bucket = local_start.replace(
+            minute=local_start.minute - local_start.minute % minutes, second=0, microsecond=0
+        )
+        step = timedelta(minutes=minutes)
+        buckets = []
+        while bucket < end:
+            counted = counts.get(bucket, {'IN': 0, 'OUT': 0})
+            buckets.append({
+                'start': bucket.isoformat(),
+                'in': counted['IN'],
+                'out': counted['OUT'],
+            })
+            bucket += step
+        return buckets
@@ -0,0 +1,309 @@
+# tracker/archive.py
+"""
+Archive, purge and restore helpers for attendance logs.
+
+Logs are written to a gzip-compressed JSON Lines file (one log per line)
+a primary-key page at a time, then deleted in small primary-key-range
+chunks. Every page is fetched in full before it is written and every DELETE
+is its own short transaction, so neither step holds a SQLite lock for long
+and live RFID taps keep flowing.
+
+The retention policy moves old logs into the ArchivedAttendanceLog table
+instead, rolling them up into DailyAttendanceSummary rows on the way. It
+leaves each student's open IN online, since the tap toggle, the checkout
+and the live count only read AttendanceLog.
+"""
+import gzip
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Exists, Max, Min, OuterRef, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Student, AttendanceLog, ArchivedAttendanceLog, AttendanceSession, DailyAttendanceSummary
+
+
+ARCHIVE_FIELDS = (
+    'id', 'student_id', 'team_id', 'status',
+    'check_in_time', 'check_out_time', 'reader_id', 'created_at',
+)
+DATETIME_FIELDS = ('check_in_time', 'check_out_time', 'created_at')
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _serialize_value(value):
+    """Convert a model value into something JSON can store."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def export_logs(queryset, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Write logs from a queryset into a gzip JSON Lines archive.
+
+    Rows are read in primary-key pages of chunk_size, each fetched in full
+    before it is compressed and written, so no cursor (and no SQLite read
+    lock) stays open while the file is written and memory stays flat
+    regardless of table size.
+
+    Args:
+        queryset (QuerySet): AttendanceLog queryset to archive
+        path (str): Destination file path
+        chunk_size (int): Rows fetched per page
+
+    Returns:
+        int: Number of logs written
+    """
+    count = 0
+    rows = queryset.order_by('pk').values_list(*ARCHIVE_FIELDS)
+    with gzip.open(path, 'wt', encoding='utf-8') as archive:
+        page = list(rows[:chunk_size])
+        while page:
+            for row in page:
+                record = {field: _serialize_value(value) for field, value in zip(ARCHIVE_FIELDS, row)}
+                archive.write(json.dumps(record, separators=(',', ':')))
+                archive.write('\n')
+            count += len(page)
+            if len(page) < chunk_size:
+                break
+            page = list(rows.filter(pk__gt=page[-1][0])[:chunk_size])
+    return count
+
+
+def purge_logs(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Delete logs from a queryset in primary-key-range chunks.
+
+    Each chunk runs in its own short transaction so the write lock is
+    released between chunks. Open sessions whose IN log was deleted can
+    never be closed by a tap any more, so they are deleted too; closed
+    sessions are kept for time-on-site reports.
+
+    Args:
+        queryset (QuerySet): AttendanceLog queryset to delete
+        chunk_size (int): Width of each primary-key range
+
+    Returns:
+        int: Number of logs deleted
+    """
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+
+    deleted = 0
+    low = bounds['low']
+    while low <= bounds['high']:
+        high = low + chunk_size
+        with transaction.atomic():
+            count, _ = queryset.filter(pk__gte=low, pk__lt=high).delete()
+        deleted += count
+        low = high
+
+    AttendanceSession.objects.filter(check_out_time__isnull=True).exclude(Exists(
+        AttendanceLog.objects.filter(
+            student_id=OuterRef('student_id'), status='IN', check_in_time=OuterRef('check_in_time')
+        )
+    )).delete()
+    return deleted
+
+
+def archive_and_purge(queryset, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Archive logs to a file, then purge exactly the archived rows.
+
+    The purge is capped at the highest primary key seen before export, so
+    taps that arrive while the archive is being written are never deleted
+    without having been archived.
+
+    Returns:
+        tuple: (archived_count, deleted_count)
+    """
+    max_pk = queryset.aggregate(high=Max('pk'))['high']
+    if max_pk is None:
+        return 0, 0
+
+    queryset = queryset.filter(pk__lte=max_pk)
+    archived = export_logs(queryset, path, chunk_size=chunk_size)
+    deleted = purge_logs(queryset, chunk_size=chunk_size)
+    return archived, deleted
+
+
+def _read_records(path):
+    """Yield archived log records from a gzip JSON Lines file."""
+    with gzip.open(path, 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _restore_chunk(records):
+    """Insert one chunk of archived records, skipping ones that cannot be restored."""
+    ids = [record['id'] for record in records]
+    existing_ids = set(AttendanceLog.objects.filter(id__in=ids).values_list('id', flat=True))
+    student_ids = set(Student.objects.filter(
+        id__in={record['student_id'] for record in records}
+    ).values_list('id', flat=True))
+
+    logs = []
+    for record in records:
+        if record['id'] in existing_ids or record['student_id'] not in student_ids:
+            continue
+        values = dict(record)
+        for field in DATETIME_FIELDS:
+            if values[field]:
+                values[field] = parse_datetime(values[field])
+        logs.append(AttendanceLog(**values))
+
+    if logs:
+        # bulk_create applies auto_now_add; the archived created_at is put back after
+        created_at = {log.pk: log.created_at for log in logs}
+        with transaction.atomic():
+            AttendanceLog.objects.bulk_create(logs)
+            AttendanceLog.objects.filter(pk__in=created_at).update(created_at=Case(
+                *[When(pk=pk, then=Value(value)) for pk, value in created_at.items()]
+            ))
+    return len(logs), len(records) - len(logs)
+
+
+def restore_logs(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Restore logs from a gzip JSON Lines archive.
+
+    Logs whose id already exists, or whose student no longer exists,
+    are skipped so a restore can safely be re-run.
+
+    Returns:
+        tuple: (restored_count, skipped_count)
+    """
+    restored = 0
+    skipped = 0
+    chunk = []
+    for record in _read_records(path):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            done, missed = _restore_chunk(chunk)
+            restored += done
+            skipped += missed
+            chunk = []
+    if chunk:
+        done, missed = _restore_chunk(chunk)
+        restored += done
+        skipped += missed
+    return restored, skipped
+
+
+# ============================================================================
+# RETENTION POLICY (COLD STORAGE)
+# ============================================================================
+
+def _rollup_daily(rows):
+    """
+    Merge archived log rows into DailyAttendanceSummary.
+
+    Rows for the same student and day may span several chunks, so
+    existing summaries are merged rather than overwritten.
+    """
+    rollups = {}
+    for row in rows:
+        key = (row['student_id'], timezone.localdate(row['created_at']))
+        summary = rollups.setdefault(key, {
+            'team_id': row['team_id'], 'first_in': None, 'last_out': None,
+            'in_count': 0, 'out_count': 0,
+        })
+        if row['status'] == 'IN':
+            summary['in_count'] += 1
+            if row['check_in_time'] and (summary['first_in'] is None or row['check_in_time'] < summary['first_in']):
+                summary['first_in'] = row['check_in_time']
+        else:
+            summary['out_count'] += 1
+            if row['check_out_time'] and (summary['last_out'] is None or row['check_out_time'] > summary['last_out']):
+                summary['last_out'] = row['check_out_time']
+
+    existing = {
+        (summary.student_id, summary.date): summary
+        for summary in DailyAttendanceSummary.objects.filter(
+            student_id__in={student_id for student_id, _ in rollups},
+            date__in={date for _, date in rollups},
+        )
+    }
+
+    to_create = []
+    to_update = []
+    for (student_id, date), values in rollups.items():
+        summary = existing.get((student_id, date))
+        if summary is None:
+            to_create.append(DailyAttendanceSummary(student_id=student_id, date=date, **values))
+            continue
+        summary.in_count += values['in_count']
+        summary.out_count += values['out_count']
+        if values['first_in'] and (summary.first_in is None or values['first_in'] < summary.first_in):
+            summary.first_in = values['first_in']
+        if values['last_out'] and (summary.last_out is None or values['last_out'] > summary.last_out):
+            summary.last_out = values['last_out']
+        to_update.append(summary)
+
+    DailyAttendanceSummary.objects.bulk_create(to_create)
+    DailyAttendanceSummary.objects.bulk_update(
+        to_update, ['first_in', 'last_out', 'in_count', 'out_count']
+    )
+
+
+def apply_retention(days=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Move attendance logs older than the retention window into cold storage.
+
+    Each primary-key chunk is rolled up into daily summaries, copied into
+    ArchivedAttendanceLog and deleted from AttendanceLog in one short
+    transaction. A student still checked IN keeps that IN log online,
+    however old it is, until a later tap lets it go.
+
+    Args:
+        days (int): Logs older than this many days are moved
+            (default: settings.ATTENDANCE_RETENTION_DAYS)
+        chunk_size (int): Width of each primary-key range
+
+    Returns:
+        tuple: (moved_count, cutoff_datetime)
+    """
+    if days is None:
+        days = settings.ATTENDANCE_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    # A student's latest log, if it is an IN, stays online: the next tap's
+    # toggle, the end-of-day checkout and the live count read it from there
+    newer_log = AttendanceLog.objects.filter(
+        student_id=OuterRef('student_id'), created_at__gt=OuterRef('created_at')
+    )
+    queryset = AttendanceLog.objects.filter(created_at__lt=cutoff).exclude(
+        Q(status='IN') & ~Exists(newer_log)
+    )
+
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0, cutoff
+
+    moved = 0
+    low = bounds['low']
+    while low <= bounds['high']:
+        high = low + chunk_size
+        with transaction.atomic():
+            rows = list(queryset.filter(pk__gte=low, pk__lt=high).values(*ARCHIVE_FIELDS))
+            if rows:
+                _rollup_daily(rows)
+                ArchivedAttendanceLog.objects.bulk_create(
+                    [ArchivedAttendanceLog(**row) for row in rows],
+                    ignore_conflicts=True,
+                )
+                AttendanceLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+        low = high
+    return moved, cutoff
+
+
+def archive_horizon():
+    """Return the newest created_at in cold storage, or None if it is empty."""
+    return ArchivedAttendanceLog.objects.aggregate(newest=Max('created_at'))['newest']
@@ -0,0 +1,160 @@
+# tracker/benchmark.py
+"""
+In-process benchmark helpers: synthetic data generation and timed scenarios.
+
+Scenarios drive the real URL routes through Django's test client, so the
+full middleware/view/ORM stack is measured without a running server or
+network hop. Used by `manage.py benchmark`.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .middleware import QueryTimer
+from .models import MAX_STUDENTS_PER_TEAM, Team, Student, AttendanceLog
+from .utils import SessionService
+
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def generate_roster(teams, students_per_team=MAX_STUDENTS_PER_TEAM, prefix='Bench'):
+    """
+    Create teams with students using bulk inserts.
+
+    Returns:
+        list: Created Team instances
+    """
+    students_per_team = min(students_per_team, MAX_STUDENTS_PER_TEAM)
+    created = Team.objects.bulk_create([
+        Team(
+            team_name=f'{prefix} Team {t:04d}',
+            student_count=students_per_team,
+            is_complete=students_per_team >= MAX_STUDENTS_PER_TEAM
+        )
+        for t in range(teams)
+    ])
+    Student.bulk_register([
+        Student(name=f'{prefix} Student {t:04d}-{s}', rfid_uid=f'{9000000 + t * 10 + s}', team=team)
+        for t, team in enumerate(created)
+        for s in range(students_per_team)
+    ], batch_size=500)
+    return created
+
+
+@contextmanager
+def _keep_created_at():
+    """Let bulk_create store explicit created_at values (benchmark data only)."""
+    field = AttendanceLog._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def generate_log_history(total_logs, days=1, seed=0):
+    """
+    Create an alternating IN/OUT tap history spread over the last `days` days.
+
+    Students are picked at random; each student's taps alternate IN/OUT in
+    time order, like real readers produce.
+
+    Returns:
+        int: Number of logs created
+    """
+    rng = random.Random(seed)
+    students = list(Student.objects.values_list('id', 'team_id'))
+    if not students or total_logs <= 0:
+        return 0
+
+    end = timezone.now() - timedelta(minutes=1)
+    start = end - timedelta(days=days)
+    span = (end - start).total_seconds()
+    moments = sorted(start + timedelta(seconds=rng.random() * span) for _ in range(total_logs))
+
+    next_status = {}
+    logs = []
+    for moment in moments:
+        student_id, team_id = students[rng.randrange(len(students))]
+        status = next_status.get(student_id, 'IN')
+        next_status[student_id] = 'OUT' if status == 'IN' else 'IN'
+        logs.append(AttendanceLog(
+            student_id=student_id,
+            team_id=team_id,
+            status=status,
+            check_in_time=moment if status == 'IN' else None,
+            check_out_time=moment if status == 'OUT' else None,
+            created_at=moment,
+        ))
+
+    with _keep_created_at():
+        AttendanceLog.objects.bulk_create(logs, batch_size=500)
+    SessionService.backfill_sessions()
+    return len(logs)
+
+
+# ============================================================================
+# TIMED SCENARIOS
+# ============================================================================
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, -(-pct * len(sorted_values) // 100) - 1)
+    return sorted_values[rank]
+
+
+def run_scenario(name, request_fn, iterations, warmup=5):
+    """
+    Time `request_fn(i)` for a number of iterations.
+
+    request_fn must return a response; non-2xx responses are counted as
+    errors.
+
+    Returns:
+        dict: Throughput, latency percentiles (ms), mean query count, errors
+    """
+    for i in range(min(warmup, iterations)):
+        response = request_fn(-1 - i)
+        if response.streaming:
+            b''.join(response.streaming_content)
+            response.close()
+
+    latencies = []
+    errors = 0
+    timer = QueryTimer()
+    started = time.perf_counter()
+    with connection.execute_wrapper(timer):
+        for i in range(iterations):
+            begin = time.perf_counter()
+            response = request_fn(i)
+            if response.streaming:
+                # Streamed bodies are produced while they are read
+                for _ in response.streaming_content:
+                    pass
+                response.close()
+            latencies.append((time.perf_counter() - begin) * 1000)
+            if not 200 <= response.status_code < 300:
+                errors += 1
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'scenario': name,
+        'iterations': iterations,
+        'errors': errors,
+        'throughput_rps': round(iterations / elapsed, 1) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+        'mean_queries': round(timer.count / iterations, 2) if iterations else 0.0,
+    }
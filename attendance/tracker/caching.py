@@ -0,0 +1,154 @@
+# tracker/caching.py
+"""
+Namespaced, versioned cache layer on top of Django's configured cache.
+
+Keys are built as <namespace>:<generation>:<key>. The backend adds
+KEY_PREFIX and VERSION from settings.CACHES. Each namespace's generation
+lives in the cache itself, so invalidate() drops a whole namespace for
+every worker sharing the cache by bumping one counter. Hits and misses
+are counted per namespace in this process.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from .metrics import format_labels, register_collector
+
+
+# Namespaces
+RFID = 'rfid'               # lookup key -> student/team identity for taps
+TEAMS = 'teams'             # team list API payload
+STATUS = 'status'           # system status statistics
+DASHBOARD = 'dashboard'     # dashboard aggregates
+OCCUPANCY = 'occupancy'     # per-day occupancy timelines
+
+# Namespaces derived from teams and students (not from taps)
+ROSTER_NAMESPACES = (TEAMS, STATUS, DASHBOARD)
+
+_MISSING = object()
+
+
+class NamespacedCache:
+    """Cache access by namespace with generation-based invalidation and hit stats."""
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def timeout(self, namespace):
+        """Default timeout for a namespace from ATTENDANCE_CACHE_TTL."""
+        return getattr(settings, 'ATTENDANCE_CACHE_TTL', {}).get(namespace, 300)
+
+    def generation(self, namespace):
+        """Current generation of a namespace; changes whenever it is invalidated."""
+        key = f'ns:{namespace}'
+        generation = self.backend.get(key)
+        if generation is None:
+            # Start from the clock so an evicted counter never reuses an old generation
+            self.backend.add(key, time.time_ns(), timeout=None)
+            generation = self.backend.get(key)
+        return generation
+
+    def make_key(self, namespace, key):
+        return f'{namespace}:{self.generation(namespace)}:{key}'
+
+    def _count(self, namespace, hit):
+        counts = self._hits if hit else self._misses
+        with self._lock:
+            counts[namespace] = counts.get(namespace, 0) + 1
+
+    def get(self, namespace, key, default=None):
+        value = self.backend.get(self.make_key(namespace, key), _MISSING)
+        self._count(namespace, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def set(self, namespace, key, value, timeout=None):
+        self.backend.set(
+            self.make_key(namespace, key), value,
+            timeout=self.timeout(namespace) if timeout is None else timeout
+        )
+
+    def get_or_set(self, namespace, key, compute, timeout=None):
+        """Return the cached value, computing and storing it on a miss."""
+        full_key = self.make_key(namespace, key)
+        value = self.backend.get(full_key, _MISSING)
+        self._count(namespace, value is not _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.backend.set(full_key, value, timeout=self.timeout(namespace) if timeout is None else timeout)
+        return value
+
+    def delete(self, namespace, key):
+        self.backend.delete(self.make_key(namespace, key))
+
+    def invalidate(self, *namespaces):
+        """Drop every entry of the given namespaces."""
+        for namespace in namespaces:
+            key = f'ns:{namespace}'
+            try:
+                self.backend.incr(key)
+            except ValueError:
+                self.backend.set(key, time.time_ns(), timeout=None)
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits.clear()
+            self._misses.clear()
+
+    def stats(self):
+        """
+        Hit/miss counts and hit rate per namespace.
+
+        Returns:
+            dict: namespace -> {'hits', 'misses', 'hit_rate'}
+        """
+        with self._lock:
+            hits, misses = dict(self._hits), dict(self._misses)
+        stats = {}
+        for namespace in sorted(set(hits) | set(misses)):
+            total = hits.get(namespace, 0) + misses.get(namespace, 0)
+            stats[namespace] = {
+                'hits': hits.get(namespace, 0),
+                'misses': misses.get(namespace, 0),
+                'hit_rate': round(hits.get(namespace, 0) / total, 3) if total else None,
+            }
+        return stats
+
+    def render_metrics(self):
+        name = 'attendance_cache_requests_total'
+        lines = [
+            f'# HELP {name} Cache lookups by namespace and result.',
+            f'# TYPE {name} counter',
+        ]
+        for namespace, stats in self.stats().items():
+            for result, count in (('hit', stats['hits']), ('miss', stats['misses'])):
+                lines.append(f'{name}{format_labels({"namespace": namespace, "result": result})} {count}')
+        return lines
+
+
+app_cache = NamespacedCache()
+register_collector(app_cache.render_metrics)
+
+
+def roster_changed(rfid=False):
+    """
+    Invalidate caches derived from teams and students.
+
+    Pass rfid=True when existing students or teams changed or went away,
+    so cached tap lookups are dropped too.
+    """
+    namespaces = ROSTER_NAMESPACES + ((RFID,) if rfid else ())
+    app_cache.invalidate(*namespaces)
+    # Inside a transaction, readers may re-cache the old rows before the
+    # commit; drop those entries again once it lands
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: app_cache.invalidate(*namespaces))
@@ -0,0 +1,173 @@
+# tracker/gates.py
+"""
+Per-gate tap statistics kept in fixed-size in-memory ring buffers.
+
+Every tap records (time, latency, ok) in its reader's ring buffer, and the
+number of taps currently being processed per reader is its queue depth.
+Stats are computed from the buffers on demand and never touch the
+database. Like the request metrics, they are per worker process.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import format_labels, register_collector
+
+
+# Label used for taps that did not say which reader they came from
+UNKNOWN_READER = 'unknown'
+
+# Readers beyond this many share one bucket, so memory stays bounded
+# whatever reader ids clients send
+OTHER_READERS = 'other'
+
+
+class RingBuffer:
+    """Fixed-capacity buffer that overwrites its oldest entry when full."""
+
+    __slots__ = ('capacity', 'items', 'next', 'size')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = [None] * capacity
+        self.next = 0
+        self.size = 0
+
+    def append(self, item):
+        self.items[self.next] = item
+        self.next = (self.next + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def __iter__(self):
+        """Iterate from newest to oldest."""
+        for offset in range(1, self.size + 1):
+            yield self.items[(self.next - offset) % self.capacity]
+
+
+class _Gate:
+    __slots__ = ('samples', 'in_flight', 'peak_in_flight', 'total')
+
+    def __init__(self, capacity):
+        self.samples = RingBuffer(capacity)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total = 0
+
+
+class GateStats:
+    """Sliding-window tap rate, queue depth and latency per reader."""
+
+    def __init__(self, window=60, capacity=1024, max_gates=256):
+        self.window = window
+        self.capacity = capacity
+        self.max_gates = max_gates
+        self._lock = threading.Lock()
+        self._gates = {}
+
+    def _gate(self, reader_id):
+        reader_id = reader_id or UNKNOWN_READER
+        gate = self._gates.get(reader_id)
+        if gate is None:
+            if len(self._gates) >= self.max_gates:
+                reader_id = OTHER_READERS
+                gate = self._gates.get(reader_id)
+            if gate is None:
+                gate = self._gates[reader_id] = _Gate(self.capacity)
+        return gate
+
+    def begin(self, reader_id):
+        """Count a tap as in flight; returns the token for finish()."""
+        with self._lock:
+            gate = self._gate(reader_id)
+            gate.in_flight += 1
+            gate.peak_in_flight = max(gate.peak_in_flight, gate.in_flight)
+        return gate, time.monotonic()
+
+    def finish(self, token, ok=True):
+        """Record a finished tap started with begin()."""
+        gate, started = token
+        now = time.monotonic()
+        with self._lock:
+            gate.in_flight -= 1
+            gate.total += 1
+            gate.samples.append((now, now - started, ok))
+
+    def reset(self):
+        with self._lock:
+            self._gates.clear()
+
+    def summary(self):
+        """
+        Summarize each gate over the sliding window.
+
+        Returns:
+            dict: reader_id -> {'taps_per_minute', 'taps_in_window', 'errors',
+            'in_flight', 'peak_in_flight', 'total', 'last_tap_seconds_ago',
+            'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}
+        """
+        now = time.monotonic()
+        cutoff = now - self.window
+        with self._lock:
+            snapshot = {
+                reader_id: (list(gate.samples), gate.in_flight, gate.peak_in_flight, gate.total)
+                for reader_id, gate in self._gates.items()
+            }
+
+        summary = {}
+        for reader_id, (samples, in_flight, peak, total) in sorted(snapshot.items()):
+            recent = []
+            for sample in samples:
+                if sample[0] < cutoff:
+                    break
+                recent.append(sample)
+            latencies = sorted(latency for _, latency, _ in recent)
+            stats = {
+                'taps_per_minute': round(len(recent) * 60 / self.window, 1),
+                'taps_in_window': len(recent),
+                'errors': sum(1 for _, _, ok in recent if not ok),
+                'in_flight': in_flight,
+                'peak_in_flight': peak,
+                'total': total,
+                'last_tap_seconds_ago': round(now - samples[0][0], 1) if samples else None,
+            }
+            for percentile in (50, 95, 99):
+                # Nearest-rank percentile
+                rank = max(0, -(-percentile * len(latencies) // 100) - 1)
+                stats[f'p{percentile}_ms'] = round(latencies[rank] * 1000, 2) if latencies else None
+            stats['max_ms'] = round(latencies[-1] * 1000, 2) if latencies else None
+            summary[reader_id] = stats
+        return summary
+
+    def render_metrics(self):
+        """Render per-gate stats for /api/metrics."""
+        summary = self.summary()
+        lines = []
+        for key, name, help_text in (
+            ('taps_per_minute', 'attendance_gate_taps_per_minute', 'Taps per minute over the sliding window.'),
+            ('in_flight', 'attendance_gate_in_flight', 'Taps currently being processed (queue depth).'),
+            ('total', 'attendance_gate_taps_total', 'Taps processed since the worker started.'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {"counter" if key == "total" else "gauge"}')
+            for reader_id, stats in summary.items():
+                lines.append(f'{name}{format_labels({"reader": reader_id})} {stats[key]}')
+
+        name = 'attendance_gate_latency_seconds'
+        lines.append(f'# HELP {name} Tap latency per gate over the sliding window.')
+        lines.append(f'# TYPE {name} summary')
+        for reader_id, stats in summary.items():
+            for percentile in (50, 95, 99):
+                value = stats[f'p{percentile}_ms']
+                if value is not None:
+                    labels = format_labels({'reader': reader_id, 'quantile': percentile / 100})
+                    lines.append(f'{name}{labels} {value / 1000:.6f}')
+        return lines
+
+
+gate_stats = GateStats(
+    window=getattr(settings, 'ATTENDANCE_GATE_WINDOW_SECONDS', 60),
+    capacity=getattr(settings, 'ATTENDANCE_GATE_BUFFER_SIZE', 1024),
+)
+register_collector(gate_stats.render_metrics)
@@ -0,0 +1,275 @@
+# tracker/gateway.py
+"""
+Asyncio gateway between RFID readers and AttendanceService.
+
+Readers connect over TCP and speak a UTF-8 line protocol, one command per
+line:
+
+    READER gate-1      ->  OK                name this connection's reader (optional)
+    04A1B2C3           ->  IN John Doe       a tap; the reply is the new status
+                       ->  ERR <message>     e.g. an unregistered card or a
+                                             reader over its tap rate
+
+Replies come back in request order, so a reader may pipeline taps. Taps
+from all connections are coalesced into micro-batches of up to batch_size
+taps, collected for at most batch_window seconds. One worker thread runs
+each batch in a single transaction, so a burst at the gates costs one
+commit instead of one per tap.
+"""
+import asyncio
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, transaction
+
+from .benchmark import percentile
+from .ratelimit import tap_limiter
+from .utils import AttendanceService
+
+
+# Longest accepted line; anything longer closes the connection
+MAX_LINE_BYTES = 1024
+
+READER_COMMAND = 'READER'
+
+
+def process_batch(taps):
+    """
+    Process (rfid_uid, reader_id) taps in order inside one transaction.
+
+    Returns:
+        list: One reply line per tap
+    """
+    close_old_connections()
+    replies = []
+    with transaction.atomic():
+        for rfid_uid, reader_id in taps:
+            try:
+                result = AttendanceService.process_rfid_tap(rfid_uid, reader_id=reader_id)
+            except ValidationError as e:
+                replies.append('ERR ' + ' '.join(e.messages))
+            else:
+                replies.append(f"{result['status']} {result['student_name']}")
+    return replies
+
+
+class TapBatcher:
+    """Collects taps from every connection and processes them in micro-batches."""
+
+    def __init__(self, batch_size=64, batch_window=0.005):
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.queue = asyncio.Queue()
+        # A single thread: SQLite takes one writer at a time anyway
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tap-batch')
+        self.batches = 0
+        self.taps = 0
+
+    def submit(self, rfid_uid, reader_id=''):
+        """Queue a tap; returns a future for its reply line."""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((rfid_uid, reader_id, future))
+        return future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                batch = await self._collect()
+                taps = [(rfid_uid, reader_id) for rfid_uid, reader_id, _ in batch]
+                try:
+                    replies = await loop.run_in_executor(self.executor, process_batch, taps)
+                except Exception as e:
+                    # The whole batch was rolled back
+                    replies = [f'ERR Server error: {e}'] * len(batch)
+                for (_, _, future), reply in zip(batch, replies):
+                    if not future.done():
+                        future.set_result(reply)
+                self.batches += 1
+                self.taps += len(batch)
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+class ReaderGateway:
+    """Serves reader connections and hands their taps to a TapBatcher."""
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.clients = {}
+
+    async def close(self):
+        """Disconnect every reader and wait until their pending replies are settled."""
+        for writer in self.clients.values():
+            writer.transport.abort()
+        await asyncio.gather(*self.clients, return_exceptions=True)
+
+    async def handle(self, reader, writer):
+        self.clients[asyncio.current_task()] = writer
+        reader_id = ''
+        # Unnamed readers are limited by their address, like HTTP taps
+        peer = writer.get_extra_info('peername')
+        client_ip = peer[0] if peer else ''
+        pending = asyncio.Queue()
+        sender = asyncio.create_task(self._send(writer, pending))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    pending.put_nowait('ERR Line too long')
+                    break
+                if not line:
+                    break
+                text = line.decode('utf-8', 'replace').strip()
+                if not text:
+                    continue
+                command, _, argument = text.partition(' ')
+                if command.upper() == READER_COMMAND:
+                    reader_id = argument.strip()[:64]
+                    pending.put_nowait('OK')
+                else:
+                    retry_after = tap_limiter.take(tap_limiter.key_for(reader_id, client_ip))
+                    if retry_after:
+                        pending.put_nowait(f'ERR Rate limited; retry in {math.ceil(retry_after)} s')
+                    else:
+                        pending.put_nowait(self.batcher.submit(text, reader_id))
+        except ConnectionError:
+            pass
+        finally:
+            pending.put_nowait(None)
+            await sender
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            del self.clients[asyncio.current_task()]
+
+    @staticmethod
+    async def _send(writer, pending):
+        """Write replies in request order, waiting for each tap's batch."""
+        connected = True
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            reply = item if isinstance(item, str) else await item
+            if not connected:
+                continue
+            try:
+                writer.write(reply.replace('\n', ' ').encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+
+
+async def serve(host='127.0.0.1', port=9000, batch_size=64, batch_window=0.005, started=None):
+    """
+    Run the gateway until cancelled.
+
+    started, if given, is called with the listening server once it accepts
+    connections.
+    """
+    batcher = TapBatcher(batch_size=batch_size, batch_window=batch_window)
+    gateway = ReaderGateway(batcher)
+    server = await asyncio.start_server(gateway.handle, host, port, limit=MAX_LINE_BYTES)
+    batches = asyncio.create_task(batcher.run())
+    if started is not None:
+        started(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        server.close()
+        # Settle open connections while the batcher can still answer them
+        await gateway.close()
+        batches.cancel()
+        try:
+            await batches
+        except asyncio.CancelledError:
+            pass
+
+
+# ============================================================================
+# SIMULATED READERS
+# ============================================================================
+
+async def simulate_readers(host, port, uids, readers=10, taps=100, interval=0.0, seed=0):
+    """
+    Load-test a gateway with simulated readers.
+
+    Each reader opens its own connection, names itself sim-<n> and sends
+    `taps` taps of random cards from uids, waiting for each reply (and
+    then `interval` seconds) before the next, like a real reader.
+
+    Returns:
+        dict: Taps, errors, IN/OUT counts, throughput and latency percentiles (ms)
+    """
+    rng = random.Random(seed)
+    latencies = []
+    counts = {'IN': 0, 'OUT': 0, 'ERR': 0}
+
+    async def run_reader(number, cards):
+        stream_reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE_BYTES)
+        try:
+            writer.write(f'{READER_COMMAND} sim-{number}\n'.encode())
+            await writer.drain()
+            await stream_reader.readline()
+            for uid in cards:
+                began = time.perf_counter()
+                writer.write(uid.encode() + b'\n')
+                await writer.drain()
+                reply = (await stream_reader.readline()).decode()
+                latencies.append((time.perf_counter() - began) * 1000)
+                status = reply.split(' ', 1)[0].strip()
+                counts[status if status in counts else 'ERR'] += 1
+                if interval:
+                    await asyncio.sleep(interval)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    plans = [[rng.choice(uids) for _ in range(taps)] for _ in range(readers)]
+    started = time.perf_counter()
+    await asyncio.gather(*(run_reader(number, cards) for number, cards in enumerate(plans, 1)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    total = readers * taps
+    return {
+        'readers': readers,
+        'taps': total,
+        'in': counts['IN'],
+        'out': counts['OUT'],
+        'errors': counts['ERR'],
+        'elapsed_s': round(elapsed, 3),
+        'throughput_tps': round(total / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3) if latencies else 0.0,
+        },
+    }
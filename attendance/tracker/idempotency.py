@@ -0,0 +1,205 @@
+# tracker/idempotency.py
+"""
+Idempotency-Key support for the POST APIs.
+
+A client that sends `Idempotency-Key: <unique value>` may retry the same
+request as often as it likes: the first request runs, and every repeat
+gets its stored response back (with `Idempotent-Replayed: true`) without
+running the view again. A tap retried after a timeout therefore never
+toggles twice.
+
+Keys are scoped to the request path. Before the view runs, the key is
+claimed with a row in IdempotencyRecord, so a repeat arriving while the
+first request is still running, on any worker, gets a 409 instead of
+running it twice. Successful (< 400) responses are stored on the row;
+failed requests release the key so they can be retried for real. Recent
+responses are also kept in a bounded in-process LRU so most repeats need
+no query. Records expire after ATTENDANCE_IDEMPOTENCY_TTL seconds; expired
+rows are ignored on lookup and deleted by `manage.py purge_idempotency_keys`.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .metrics import format_labels, register_collector
+from .models import IdempotencyRecord
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# A claim whose request never finished (e.g. the worker died) is released after this
+PENDING_TIMEOUT = 60
+
+
+class IdempotencyStore:
+    """Claims keys and stores responses in the database, fronted by an LRU."""
+
+    def __init__(self, ttl=86400, max_entries=2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()
+        self._counts = {}
+
+    def count(self, result):
+        with self._lock:
+            self._counts[result] = self._counts.get(result, 0) + 1
+
+    def _remember(self, path, key, record):
+        with self._lock:
+            self._recent[path, key] = record
+            self._recent.move_to_end((path, key))
+            if len(self._recent) > self.max_entries:
+                self._recent.popitem(last=False)
+
+    def _recall(self, path, key):
+        with self._lock:
+            record = self._recent.get((path, key))
+            if record is None:
+                return None
+            if record.created_at < timezone.now() - timedelta(seconds=self.ttl):
+                del self._recent[path, key]
+                return None
+            self._recent.move_to_end((path, key))
+            return record
+
+    def purge_expired(self):
+        """Delete records older than the TTL; returns the number deleted."""
+        cutoff = timezone.now() - timedelta(seconds=self.ttl)
+        deleted, _ = IdempotencyRecord.objects.filter(created_at__lt=cutoff).delete()
+        return deleted
+
+    def claim(self, path, key, fingerprint):
+        """
+        Claim a key for a new request.
+
+        Returns:
+            IdempotencyRecord or None: None if the key is now ours, else
+            the live record (finished or still running) that holds it
+        """
+        record = self._recall(path, key)
+        if record is not None:
+            return record
+
+        now = timezone.now()
+        for _ in range(2):
+            try:
+                with transaction.atomic():
+                    IdempotencyRecord.objects.create(path=path, key=key, fingerprint=fingerprint, created_at=now)
+                return None
+            except IntegrityError:
+                record = IdempotencyRecord.objects.filter(path=path, key=key).first()
+            if record is None:
+                continue  # released in the meantime
+            expired = record.created_at < now - timedelta(seconds=self.ttl)
+            abandoned = record.status_code is None and record.created_at < now - timedelta(seconds=PENDING_TIMEOUT)
+            if not (expired or abandoned):
+                if record.status_code is not None:
+                    self._remember(path, key, record)
+                return record
+            IdempotencyRecord.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+        return None
+
+    def complete(self, path, key, fingerprint, response):
+        """Store a successful response for the claimed key, or release the key."""
+        if response.status_code >= 400 or response.streaming:
+            self.release(path, key)
+            return
+        record = IdempotencyRecord(
+            path=path, key=key, fingerprint=fingerprint,
+            status_code=response.status_code,
+            content_type=response.get('Content-Type', ''),
+            body=response.content.decode('utf-8'),
+        )
+        IdempotencyRecord.objects.filter(path=path, key=key).update(
+            status_code=record.status_code, content_type=record.content_type, body=record.body
+        )
+        self._remember(path, key, record)
+
+    def release(self, path, key):
+        IdempotencyRecord.objects.filter(path=path, key=key, status_code__isnull=True).delete()
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._counts.clear()
+
+    def render_metrics(self):
+        name = 'attendance_idempotency_requests_total'
+        lines = [
+            f'# HELP {name} POST requests with an Idempotency-Key, by outcome.',
+            f'# TYPE {name} counter',
+        ]
+        with self._lock:
+            counts = sorted(self._counts.items())
+        for result, count in counts:
+            lines.append(f'{name}{format_labels({"result": result})} {count}')
+        return lines
+
+
+idempotency_store = IdempotencyStore(
+    ttl=getattr(settings, 'ATTENDANCE_IDEMPOTENCY_TTL', 86400),
+    max_entries=getattr(settings, 'ATTENDANCE_IDEMPOTENCY_CACHE_SIZE', 2048),
+)
+register_collector(idempotency_store.render_metrics)
+
+
+def replay_response(record):
+    response = HttpResponse(record.body, status=record.status_code, content_type=record.content_type)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Honour an Idempotency-Key header on a POST view."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+        if not key or request.method != 'POST':
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse(
+                {'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}, status=400
+            )
+
+        store = idempotency_store
+        path = request.path
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+        record = store.claim(path, key, fingerprint)
+
+        if record is not None:
+            if record.fingerprint != fingerprint:
+                store.count('mismatch')
+                return JsonResponse(
+                    {'error': f'{IDEMPOTENCY_HEADER} was already used with a different request body'},
+                    status=422
+                )
+            if record.status_code is None:
+                store.count('in_progress')
+                response = JsonResponse(
+                    {'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress'}, status=409
+                )
+                response['Retry-After'] = '1'
+                return response
+            store.count('replayed')
+            return replay_response(record)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            store.release(path, key)
+            raise
+        store.complete(path, key, fingerprint, response)
+        store.count('executed')
+        return response
+
+    return wrapped
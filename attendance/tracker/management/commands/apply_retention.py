@@ -0,0 +1,36 @@
+"""
+Move attendance logs older than the retention window into cold storage.
+
+Usage:
+    python manage.py apply_retention
+    python manage.py apply_retention --days 7 --chunk-size 200
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.archive import DEFAULT_CHUNK_SIZE, apply_retention
+
+
+class Command(BaseCommand):
+    help = 'Move old attendance logs into the archive table, keeping daily summaries online.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ATTENDANCE_RETENTION_DAYS,
+            help=f'Keep this many days of logs online (default: {settings.ATTENDANCE_RETENTION_DAYS})',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows moved per transaction (default: {DEFAULT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days cannot be negative')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        moved, cutoff = apply_retention(days=options['days'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} attendance log(s) older than {cutoff:%Y-%m-%d %H:%M} to cold storage.'
+        ))
@@ -0,0 +1,73 @@
+"""
+Archive attendance logs to a compressed file, then purge them in chunks.
+
+Usage:
+    python manage.py archive_attendance
+    python manage.py archive_attendance --output logs.jsonl.gz --chunk-size 200
+    python manage.py archive_attendance --no-purge
+    python manage.py archive_attendance --restore logs.jsonl.gz
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tracker.archive import DEFAULT_CHUNK_SIZE, archive_and_purge, export_logs, restore_logs
+from tracker.models import AttendanceLog
+
+
+class Command(BaseCommand):
+    help = 'Archive attendance logs to a gzip JSON Lines file and purge them in small chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Archive file path (default: attendance_<timestamp>.jsonl.gz in ATTENDANCE_ARCHIVE_DIR)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows per read/delete chunk (default: {DEFAULT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--no-purge', action='store_true',
+            help='Only write the archive, keep the logs in the database',
+        )
+        parser.add_argument(
+            '--restore', metavar='ARCHIVE',
+            help='Restore logs from an archive file instead of archiving',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        if options['restore']:
+            path = options['restore']
+            if not os.path.exists(path):
+                raise CommandError(f'Archive {path} does not exist.')
+            restored, skipped = restore_logs(path, chunk_size=chunk_size)
+            self.stdout.write(self.style.SUCCESS(
+                f'Restored {restored} attendance log(s) from {path} ({skipped} skipped).'
+            ))
+            return
+
+        path = options['output'] or default_archive_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if options['no_purge']:
+            archived = export_logs(AttendanceLog.objects.all(), path, chunk_size=chunk_size)
+            self.stdout.write(self.style.SUCCESS(f'Archived {archived} attendance log(s) to {path}.'))
+            return
+
+        archived, deleted = archive_and_purge(AttendanceLog.objects.all(), path, chunk_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} attendance log(s) to {path} and purged {deleted}.'
+        ))
+
+
+def default_archive_path():
+    """Build a timestamped archive path inside ATTENDANCE_ARCHIVE_DIR."""
+    stamp = timezone.localtime().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(settings.ATTENDANCE_ARCHIVE_DIR, f'attendance_{stamp}.jsonl.gz')
@@ -0,0 +1,47 @@
+"""
+Check out every student who is still IN at the end of the day.
+
+Usage:
+    python manage.py auto_checkout
+    python manage.py auto_checkout --at "2025-01-31 18:00"
+    python manage.py auto_checkout --team 3 --team 5
+"""
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from tracker.utils import AttendanceService
+
+
+class Command(BaseCommand):
+    help = 'Write an OUT log for every student still checked IN and close their sessions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--at',
+            help='Checkout time, ISO datetime in the local time zone (default: now)',
+        )
+        parser.add_argument(
+            '--team', type=int, action='append', dest='teams',
+            help='Only check out students of this team id (repeatable)',
+        )
+
+    def handle(self, *args, **options):
+        at = timezone.now()
+        if options['at']:
+            at = parse_datetime(options['at'])
+            if at is None:
+                raise CommandError(f"Invalid --at value: {options['at']}")
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        try:
+            checked_out = AttendanceService.check_out_all(at, team_ids=options['teams'])
+        except ValidationError as e:
+            raise CommandError(' '.join(e.messages))
+
+        local = timezone.localtime(at)
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked out {checked_out} student(s) at {local:%Y-%m-%d %H:%M:%S}.'
+        ))
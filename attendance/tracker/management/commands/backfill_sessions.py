@@ -0,0 +1,27 @@
+"""
+Rebuild AttendanceSession rows from the attendance log history.
+
+Usage:
+    python manage.py backfill_sessions
+    python manage.py backfill_sessions --batch-size 5000
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.utils import SessionService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild paired IN/OUT attendance sessions from online and archived logs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows read and sessions inserted per batch (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        created = SessionService.backfill_sessions(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} attendance session(s).'))
@@ -0,0 +1,181 @@
+"""
+Benchmark the main endpoints in-process against a throwaway database.
+
+A test database is created, filled with a synthetic roster and tap
+history, and the real URL routes are driven through Django's test client.
+Results (throughput, p50/p95/p99 latency, queries per request) are written
+as JSON so runs can be compared across commits.
+
+Usage:
+    python manage.py benchmark
+    python manage.py benchmark --teams 500 --logs 50000 --iterations 500
+    python manage.py benchmark --scenario tap --scenario dashboard
+    python manage.py benchmark --output bench.json --compare previous.json
+"""
+import itertools
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from tracker.benchmark import generate_roster, generate_log_history, run_scenario
+from tracker.models import MAX_STUDENTS_PER_TEAM, Team, Student
+from tracker.ratelimit import tap_limiter
+
+
+SCENARIOS = (
+    'tap', 'register', 'dashboard', 'csv_export',
+    'team_history', 'student_history', 'list_teams', 'status',
+)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark taps, registration, dashboard, CSV export and history APIs in-process.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', type=int, default=500, help='Synthetic teams (default: 500)')
+        parser.add_argument(
+            '--students-per-team', type=int, default=MAX_STUDENTS_PER_TEAM,
+            help=f'Students per team, at most {MAX_STUDENTS_PER_TEAM} (default: {MAX_STUDENTS_PER_TEAM})',
+        )
+        parser.add_argument('--logs', type=int, default=20000, help='Synthetic tap history size (default: 20000)')
+        parser.add_argument('--days', type=int, default=1, help='Days the tap history spans (default: 1)')
+        parser.add_argument('--iterations', type=int, default=200, help='Timed requests per scenario (default: 200)')
+        parser.add_argument(
+            '--scenario', action='append', choices=SCENARIOS,
+            help='Scenario to run; repeat for several (default: all)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the tap history')
+        parser.add_argument('--output', help='Write results JSON here (default: benchmarks/bench_<timestamp>.json)')
+        parser.add_argument('--compare', help='Previous results JSON to compare against')
+
+    def handle(self, *args, **options):
+        if options['teams'] < 1 or options['iterations'] < 1:
+            raise CommandError('--teams and --iterations must be at least 1')
+        if not 1 <= options['students_per_team'] <= MAX_STUDENTS_PER_TEAM:
+            raise CommandError(f'--students-per-team must be between 1 and {MAX_STUDENTS_PER_TEAM}')
+
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {options["compare"]}: {e}')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            report = self.run_benchmarks(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = Path(options['output'] or Path(settings.BASE_DIR) / 'benchmarks' / (
+            f'bench_{timezone.localtime():%Y%m%d_%H%M%S}.json'
+        ))
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+
+        self.print_results(report['results'], baseline)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+    def run_benchmarks(self, options):
+        self.stdout.write('Generating synthetic data...')
+        teams = generate_roster(options['teams'], options['students_per_team'])
+        logs = generate_log_history(options['logs'], days=options['days'], seed=options['seed'])
+
+        # Measure the application, not the per-reader tap rate limit
+        tap_limiter.rate = 0
+
+        client = Client()
+        client.force_login(User.objects.create_user('bench', password='bench'))
+
+        team_ids = [team.id for team in teams]
+        student_ids = list(Student.objects.values_list('id', flat=True))
+        rfids = list(Student.objects.values_list('rfid_uid', flat=True))
+
+        # Registration needs free slots: one empty team per six registrations
+        needed = options['iterations'] + 5
+        open_teams = Team.objects.bulk_create([
+            Team(team_name=f'Bench Open Team {t:04d}')
+            for t in range(-(-needed // MAX_STUDENTS_PER_TEAM))
+        ])
+        registrations = itertools.count()
+
+        def register(i):
+            n = next(registrations)
+            return client.post('/api/students/register', {
+                'team_id': open_teams[n // MAX_STUDENTS_PER_TEAM].id,
+                'student_name': f'Bench Registrant {n}',
+                'rfid_uid': f'BENCH{n:06d}',
+            }, content_type='application/json')
+
+        requests = {
+            'tap': lambda i: client.post(
+                '/api/attendance/tap', {'rfid_uid': rfids[i % len(rfids)]},
+                content_type='application/json',
+            ),
+            'register': register,
+            'dashboard': lambda i: client.get('/dashboard/'),
+            'csv_export': lambda i: client.get('/dashboard/download-csv/'),
+            'team_history': lambda i: client.get(f'/api/attendance/team/{team_ids[i % len(team_ids)]}'),
+            'student_history': lambda i: client.get(f'/api/attendance/student/{student_ids[i % len(student_ids)]}'),
+            'list_teams': lambda i: client.get('/api/teams/list'),
+            'status': lambda i: client.get('/api/status'),
+        }
+
+        results = {}
+        for name in options['scenario'] or SCENARIOS:
+            self.stdout.write(f'Running {name}...')
+            results[name] = run_scenario(name, requests[name], options['iterations'])
+
+        return {
+            'meta': {
+                'git_revision': _git_revision(),
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'teams': options['teams'],
+                'students': len(student_ids),
+                'logs': logs,
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+            },
+            'results': results,
+        }
+
+    def print_results(self, results, baseline=None):
+        previous = (baseline or {}).get('results', {})
+        self.stdout.write(
+            f'\n{"scenario":<16}{"req/s":>9}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"queries":>9}{"errors":>8}'
+        )
+        for name, stats in results.items():
+            line = (
+                f'{name:<16}{stats["throughput_rps"]:>9}{stats["p50_ms"]:>10}'
+                f'{stats["p95_ms"]:>10}{stats["p99_ms"]:>10}{stats["mean_queries"]:>9}{stats["errors"]:>8}'
+            )
+            before = previous.get(name)
+            if before and before.get('p95_ms'):
+                change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+                line += f'   p95 {change:+.1f}% vs {(baseline.get("meta") or {}).get("git_revision") or "baseline"}'
+            self.stdout.write(line)
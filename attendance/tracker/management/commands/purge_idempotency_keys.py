@@ -0,0 +1,20 @@
+"""
+Delete Idempotency-Key records older than ATTENDANCE_IDEMPOTENCY_TTL.
+
+Expired records are already ignored by the POST APIs; this only keeps the
+table small. Run it from cron, e.g. hourly.
+
+Usage:
+    python manage.py purge_idempotency_keys
+"""
+from django.core.management.base import BaseCommand
+
+from tracker.idempotency import idempotency_store
+
+
+class Command(BaseCommand):
+    help = 'Delete expired Idempotency-Key records.'
+
+    def handle(self, *args, **options):
+        deleted = idempotency_store.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency record(s).'))
@@ -0,0 +1,53 @@
+"""
+Accept RFID reader connections over TCP and record their taps in-process.
+
+See tracker/gateway.py for the line protocol. Serial readers can be
+bridged to the gateway with a serial-to-TCP tool such as ser2net or socat.
+
+Usage:
+    python manage.py reader_gateway
+    python manage.py reader_gateway --host 0.0.0.0 --port 9000
+    python manage.py reader_gateway --batch-size 128 --batch-window-ms 10
+"""
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.gateway import serve
+
+
+class Command(BaseCommand):
+    help = 'Run the asyncio RFID reader gateway (TCP line protocol, micro-batched taps).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=9000, help='TCP port (default: 9000)')
+        parser.add_argument(
+            '--batch-size', type=int, default=64,
+            help='Most taps processed in one transaction (default: 64)',
+        )
+        parser.add_argument(
+            '--batch-window-ms', type=float, default=5.0,
+            help='Longest a tap waits for others to share its batch (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['batch_window_ms'] < 0:
+            raise CommandError('--batch-size must be at least 1 and --batch-window-ms >= 0')
+
+        def started(server):
+            addresses = ', '.join(f'{sock.getsockname()[0]}:{sock.getsockname()[1]}' for sock in server.sockets)
+            self.stdout.write(self.style.SUCCESS(f'Reader gateway listening on {addresses}'))
+
+        try:
+            asyncio.run(serve(
+                host=options['host'],
+                port=options['port'],
+                batch_size=options['batch_size'],
+                batch_window=options['batch_window_ms'] / 1000,
+                started=started,
+            ))
+        except OSError as e:
+            raise CommandError(str(e))
+        except KeyboardInterrupt:
+            pass
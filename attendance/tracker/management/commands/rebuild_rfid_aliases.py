@@ -0,0 +1,27 @@
+"""
+Recompute every student's canonical UID and RFID aliases.
+
+Run this after changing ATTENDANCE_RFID_DIGITS, since stored aliases
+follow the reader format that was configured when each card registered.
+
+Usage:
+    python manage.py rebuild_rfid_aliases
+"""
+from django.core.management.base import BaseCommand
+
+from tracker.models import RFIDAlias, Student
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the RFID alias index for the current ATTENDANCE_RFID_DIGITS reader format.'
+
+    def handle(self, *args, **options):
+        clashes = RFIDAlias.rebuild()
+        for student in clashes:
+            self.stderr.write(
+                f"RFID '{student.rfid_uid}' (student {student.id}) is the same card as an earlier "
+                f"registration in this format; it no longer resolves."
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt RFID aliases for {Student.objects.count()} student(s).'
+        ))
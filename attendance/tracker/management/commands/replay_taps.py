@@ -0,0 +1,119 @@
+"""
+Export recorded RFID taps and replay them to reproduce real load.
+
+By default taps are replayed through AttendanceService against a scratch
+copy of the SQLite database, rewound to the start of the replayed period,
+so the live data is untouched and toggles can be compared with what was
+recorded.
+
+Usage:
+    python manage.py replay_taps --export taps.csv --from 2026-10-19T08:00 --to 2026-10-19T10:00
+    python manage.py replay_taps taps.csv                      # original speed
+    python manage.py replay_taps taps.csv --speed 10 --concurrency 4
+    python manage.py replay_taps taps.csv --speed 0            # as fast as possible
+    python manage.py replay_taps reader.log --url http://localhost:8000
+"""
+import json
+from datetime import datetime, time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from tracker.replay import export_taps, http_target, read_taps, replay, scratch_database, service_target
+
+
+def _parse_moment(value, option):
+    if value is None:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'{option} must be an ISO date or datetime')
+        moment = datetime.combine(day, time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class Command(BaseCommand):
+    help = 'Export recorded RFID taps, or replay a tap file and report latency and toggle divergences.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tapfile', nargs='?', help='Tap file to replay (timestamp,rfid_uid[,status[,reader_id]])')
+        parser.add_argument('--export', metavar='PATH', help='Write recorded taps to PATH instead of replaying')
+        parser.add_argument('--from', dest='start', help='Export taps from this date/datetime')
+        parser.add_argument('--to', dest='end', help='Export taps before this date/datetime')
+        parser.add_argument(
+            '--speed', type=float, default=1.0,
+            help='1 = original speed, N = N times faster, 0 = as fast as possible (default: 1)',
+        )
+        parser.add_argument('--concurrency', type=int, default=1, help='Worker threads (default: 1)')
+        parser.add_argument('--url', help='Replay against this server over HTTP instead of in-process')
+        parser.add_argument(
+            '--in-place', action='store_true',
+            help='Replay in-process against the configured database instead of a scratch copy',
+        )
+        parser.add_argument('--output', help='Also write the report as JSON to this path')
+
+    def handle(self, *args, **options):
+        if options['export']:
+            count = export_taps(
+                options['export'],
+                start=_parse_moment(options['start'], '--from'),
+                end=_parse_moment(options['end'], '--to'),
+            )
+            self.stdout.write(self.style.SUCCESS(f'Exported {count} tap(s) to {options["export"]}.'))
+            return
+
+        if not options['tapfile']:
+            raise CommandError('Give a tap file to replay, or --export PATH.')
+        if options['speed'] < 0 or options['concurrency'] < 1:
+            raise CommandError('--speed must be >= 0 and --concurrency at least 1')
+
+        try:
+            taps = read_taps(options['tapfile'])
+        except (OSError, ValidationError) as e:
+            raise CommandError(str(e))
+        if not taps:
+            raise CommandError('The tap file contains no taps.')
+
+        run = lambda target: replay(taps, target, speed=options['speed'], concurrency=options['concurrency'])
+        speed = f'{options["speed"]:g}x' if options['speed'] else 'full'
+        self.stdout.write(
+            f'Replaying {len(taps)} tap(s) spanning {taps[-1].timestamp - taps[0].timestamp} at {speed} speed...'
+        )
+        if options['url']:
+            report = run(http_target(options['url']))
+        elif options['in_place']:
+            report = run(service_target)
+        else:
+            try:
+                with scratch_database(taps[0].timestamp):
+                    report = run(service_target)
+            except ValidationError as e:
+                raise CommandError(f'{e.messages[0]} Use --in-place or --url.')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        self.print_report(report)
+
+    def print_report(self, report):
+        latency = report['latency_ms']
+        self.stdout.write(
+            f'\nTaps:        {report["taps"]} in {report["elapsed_s"]}s '
+            f'({report["throughput_tps"]} taps/s, concurrency {report["concurrency"]})\n'
+            f'Latency ms:  mean {latency["mean"]}  p50 {latency["p50"]}  p95 {latency["p95"]}  '
+            f'p99 {latency["p99"]}  max {latency["max"]}\n'
+            f'Max lag ms:  {report["max_lag_ms"]}\n'
+            f'Errors:      {report["errors"]}\n'
+            f'Divergences: {report["divergences"]} of {report["compared"]} compared'
+        )
+        for sample in report['error_samples']:
+            self.stdout.write(self.style.ERROR(f'  #{sample["index"]} {sample["rfid_uid"]}: {sample["error"]}'))
+        for sample in report['divergence_samples']:
+            self.stdout.write(self.style.WARNING(
+                f'  #{sample["index"]} {sample["rfid_uid"]} at {sample["timestamp"]}: '
+                f'recorded {sample["recorded"]}, replayed {sample["replayed"]}'
+            ))
@@ -0,0 +1,65 @@
+"""
+Load-test a running reader gateway with simulated RFID readers.
+
+Cards are picked at random from the registered students (generate a
+roster first with `manage.py benchmark` data or the import script).
+
+Usage:
+    python manage.py simulate_readers
+    python manage.py simulate_readers --readers 50 --taps 200
+    python manage.py simulate_readers --port 9000 --interval 0.5 --output sim.json
+"""
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.gateway import simulate_readers
+from tracker.models import Student
+
+
+class Command(BaseCommand):
+    help = 'Open many simulated reader connections to the gateway and report tap latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Gateway address (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=9000, help='Gateway port (default: 9000)')
+        parser.add_argument('--readers', type=int, default=10, help='Concurrent reader connections (default: 10)')
+        parser.add_argument('--taps', type=int, default=100, help='Taps per reader (default: 100)')
+        parser.add_argument(
+            '--interval', type=float, default=0.0,
+            help='Seconds each reader waits between taps (default: 0)',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for card choice')
+        parser.add_argument('--output', help='Also write the report as JSON to this path')
+
+    def handle(self, *args, **options):
+        if options['readers'] < 1 or options['taps'] < 1:
+            raise CommandError('--readers and --taps must be at least 1')
+        uids = list(Student.objects.values_list('rfid_uid', flat=True))
+        if not uids:
+            raise CommandError('No registered students to simulate taps for.')
+
+        try:
+            report = asyncio.run(simulate_readers(
+                options['host'], options['port'], uids,
+                readers=options['readers'], taps=options['taps'],
+                interval=options['interval'], seed=options['seed'],
+            ))
+        except OSError as e:
+            raise CommandError(f"Cannot reach the gateway at {options['host']}:{options['port']}: {e}")
+
+        latency = report['latency_ms']
+        self.stdout.write(
+            f"{report['taps']} taps from {report['readers']} readers in {report['elapsed_s']} s "
+            f"({report['throughput_tps']} taps/s): {report['in']} IN, {report['out']} OUT, "
+            f"{report['errors']} errors"
+        )
+        self.stdout.write(
+            f"latency ms  mean {latency['mean']}  p50 {latency['p50']}  p95 {latency['p95']}  "
+            f"p99 {latency['p99']}  max {latency['max']}"
+        )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
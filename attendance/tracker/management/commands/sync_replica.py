@@ -0,0 +1,47 @@
+"""
+Keep the reporting replica current with periodic SQLite online backups.
+
+Run it next to the server when ATTENDANCE_REPLICA_PATH is set.
+
+Usage:
+    python manage.py sync_replica                 # every ATTENDANCE_REPLICA_SYNC_INTERVAL seconds
+    python manage.py sync_replica --interval 60
+    python manage.py sync_replica --once
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tracker.replica import replica_enabled, replica_path, sync_replica
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the read replica, once or periodically.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Seconds between syncs (default: ATTENDANCE_REPLICA_SYNC_INTERVAL)',
+        )
+        parser.add_argument('--once', action='store_true', help='Sync once and exit')
+
+    def handle(self, *args, **options):
+        if not replica_enabled():
+            raise CommandError('No replica configured; set ATTENDANCE_REPLICA_PATH.')
+        interval = options['interval'] or settings.ATTENDANCE_REPLICA_SYNC_INTERVAL
+        if interval <= 0:
+            raise CommandError('--interval must be positive')
+
+        try:
+            while True:
+                duration = sync_replica()
+                self.stdout.write(
+                    f'{timezone.localtime():%H:%M:%S} synced {replica_path()} in {duration * 1000:.0f} ms'
+                )
+                if options['once']:
+                    return
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,98 @@
+"""
+Live top-style view of RFID tap phase timings from a running server.
+
+Polls /api/debug/tap-phases, so it works against the server process that
+is actually handling taps. --enable needs the server in DEBUG mode or its
+ATTENDANCE_DEBUG_TOKEN, which is read from the settings or passed with
+--token.
+
+Usage:
+    python manage.py tap_top
+    python manage.py tap_top --url http://10.0.0.5:8000 --interval 5
+    python manage.py tap_top --enable --once --token "$ATTENDANCE_DEBUG_TOKEN"
+"""
+import json
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tracker.tracing import DEBUG_TOKEN_HEADER
+
+
+ENDPOINT = '/api/debug/tap-phases'
+COLUMNS = ('count', 'mean_us', 'p50_us', 'p95_us', 'p99_us', 'max_us')
+
+
+class Command(BaseCommand):
+    help = 'Print a live summary of RFID tap phase percentiles from a running server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000', help='Server base URL')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between refreshes')
+        parser.add_argument('--once', action='store_true', help='Print one summary and exit')
+        parser.add_argument('--enable', action='store_true', help='Switch tracing on before watching')
+        parser.add_argument(
+            '--token', default=settings.ATTENDANCE_DEBUG_TOKEN,
+            help='Debug token sent with --enable (default: ATTENDANCE_DEBUG_TOKEN)',
+        )
+
+    def handle(self, *args, **options):
+        url = options['url'].rstrip('/') + ENDPOINT
+        if options['enable']:
+            self.fetch(url, {'enabled': True}, token=options['token'])
+
+        previous_total = None
+        try:
+            while True:
+                data = self.fetch(url)
+                total = data['phases'].get('total', {}).get('count', 0)
+                rate = None
+                if previous_total is not None:
+                    rate = (total - previous_total) / options['interval']
+                previous_total = total
+
+                if not options['once']:
+                    # Clear the screen and move the cursor home, like top
+                    self.stdout.write('\033[2J\033[H', ending='')
+                self.stdout.write(self.render(data, rate))
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def fetch(self, url, payload=None, token=''):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers[DEBUG_TOKEN_HEADER] = token
+        request = urllib.request.Request(url, data=body, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if e.code == 403:
+                raise CommandError(
+                    f'{url} refused to switch tracing on: run the server with DEBUG, '
+                    'or set ATTENDANCE_DEBUG_TOKEN there and pass it with --token'
+                )
+            raise CommandError(f'Could not read {url}: {e}')
+        except (urllib.error.URLError, ValueError) as e:
+            raise CommandError(f'Could not read {url}: {e}')
+
+    def render(self, data, rate):
+        state = 'ON' if data['enabled'] else 'OFF (start with --enable)'
+        lines = [
+            f"RFID tap phases  {data['timestamp']}  tracing {state}  window {data['window']}",
+            f"taps/s: {rate:.1f}" if rate is not None else 'taps/s: -',
+            '',
+            f"{'phase':<18}" + ''.join(f'{column:>11}' for column in COLUMNS),
+        ]
+        for phase, stats in data['phases'].items():
+            lines.append(f'{phase:<18}' + ''.join(f'{stats[column]:>11}' for column in COLUMNS))
+        if not data['phases']:
+            lines.append('(no traced taps yet)')
+        return '\n'.join(lines)
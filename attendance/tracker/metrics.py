@@ -0,0 +1,127 @@
+# tracker/metrics.py
+"""
+In-memory metrics for the attendance system, exposed in Prometheus text format.
+
+Metrics live in the worker process that recorded them, so each worker
+reports its own numbers. Other modules can add their own lines to the
+/api/metrics output with register_collector().
+"""
+import threading
+from bisect import bisect_left
+
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels):
+    """Render a dict of labels as {key="value",...}."""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class Histogram:
+    """Fixed-bucket histogram: cumulative bucket counts, sum and count."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{format_labels({**labels, "le": bound})} {cumulative}')
+        lines.append(f'{name}_bucket{format_labels({**labels, "le": "+Inf"})} {self.count}')
+        lines.append(f'{name}_sum{format_labels(labels)} {self.sum:.6f}')
+        lines.append(f'{name}_count{format_labels(labels)} {self.count}')
+        return lines
+
+
+class RequestMetrics:
+    """Per-view request latency, DB query count and DB time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._responses = {}
+
+    def observe(self, view, status, duration, queries, db_duration):
+        """Record one finished request."""
+        with self._lock:
+            histograms = self._views.get(view)
+            if histograms is None:
+                histograms = self._views[view] = {
+                    'latency': Histogram(LATENCY_BUCKETS),
+                    'queries': Histogram(QUERY_COUNT_BUCKETS),
+                    'db': Histogram(LATENCY_BUCKETS),
+                }
+            histograms['latency'].observe(duration)
+            histograms['queries'].observe(queries)
+            histograms['db'].observe(db_duration)
+            key = (view, status)
+            self._responses[key] = self._responses.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._responses.clear()
+
+    def render(self):
+        with self._lock:
+            lines = [
+                '# HELP attendance_http_responses_total Responses by view and status code.',
+                '# TYPE attendance_http_responses_total counter',
+            ]
+            for (view, status), count in sorted(self._responses.items()):
+                lines.append(f'attendance_http_responses_total{format_labels({"view": view, "status": status})} {count}')
+
+            for key, name, help_text in (
+                ('latency', 'attendance_http_request_duration_seconds', 'Request latency by view.'),
+                ('queries', 'attendance_http_request_db_queries', 'Database queries per request by view.'),
+                ('db', 'attendance_http_request_db_duration_seconds', 'Database time per request by view.'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for view in sorted(self._views):
+                    lines.extend(self._views[view][key].render(name, {'view': view}))
+            return lines
+
+
+request_metrics = RequestMetrics()
+
+_collectors = [request_metrics.render]
+
+
+def register_collector(collector):
+    """
+    Add a callable returning a list of Prometheus text lines to /api/metrics.
+
+    Returns the collector so it can be used as a decorator.
+    """
+    if collector not in _collectors:
+        _collectors.append(collector)
+    return collector
+
+
+def render_metrics():
+    """Render every registered collector as one Prometheus text document."""
+    lines = []
+    for collector in _collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
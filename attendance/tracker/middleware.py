@@ -0,0 +1,118 @@
+# tracker/middleware.py
+"""
+Middleware for RFID Team-Based Event Attendance System
+"""
+import time
+from contextlib import ExitStack
+from fnmatch import fnmatchcase
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+
+from .metrics import request_metrics
+from .replica import replica_enabled, use_replica
+
+
+class QueryTimer:
+    """Database execute wrapper that counts queries and their total time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, DB query count and DB time per URL name.
+
+    Opt-in with ATTENDANCE_METRICS_ENABLED. Results are exposed at
+    /api/metrics and summarized per response in a Server-Timing header.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ATTENDANCE_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        request_metrics.observe(view, response.status_code, duration, timer.count, timer.duration)
+
+        response['Server-Timing'] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={timer.duration * 1000:.1f};desc="{timer.count} queries"'
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve read-only reporting views from the replica database.
+
+    GET/HEAD requests to views named in ATTENDANCE_REPLICA_VIEWS (shell-style
+    patterns on the view name, e.g. 'admin:*_changelist') read tracker
+    tables from the replica until the response is complete, including
+    deferred template rendering. Inactive unless a replica is configured.
+    """
+
+    def __init__(self, get_response):
+        if not replica_enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.patterns = tuple(getattr(settings, 'ATTENDANCE_REPLICA_VIEWS', ()))
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            routing = getattr(request, '_replica_routing', None)
+            if routing is not None:
+                routing.close()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        view_name = request.resolver_match.view_name
+        if any(fnmatchcase(view_name, pattern) for pattern in self.patterns):
+            request._replica_routing = ExitStack()
+            request._replica_routing.enter_context(use_replica())
+        return None
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """
+    Gzip JSON responses of at least ATTENDANCE_GZIP_MIN_BYTES.
+
+    Only JSON is compressed: HTML pages carry CSRF tokens, and small
+    payloads gain less than the compression costs.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_length = getattr(settings, 'ATTENDANCE_GZIP_MIN_BYTES', 1024)
+
+    def process_response(self, request, response):
+        if not response.get('Content-Type', '').startswith('application/json'):
+            return response
+        if not response.streaming and len(response.content) < self.min_length:
+            return response
+        return super().process_response(request, response)
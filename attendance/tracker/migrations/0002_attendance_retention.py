@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttendanceLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('IN', 'Checked In'), ('OUT', 'Checked Out')], max_length=3)),
+                ('check_in_time', models.DateTimeField(blank=True, null=True)),
+                ('check_out_time', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance_logs', to='tracker.student')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance_logs', to='tracker.team')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['student', 'created_at'], name='tracker_arc_student_2f7f29_idx'), models.Index(fields=['team', 'created_at'], name='tracker_arc_team_id_144d40_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('first_in', models.DateTimeField(blank=True, null=True)),
+                ('last_out', models.DateTimeField(blank=True, null=True)),
+                ('in_count', models.PositiveIntegerField(default=0)),
+                ('out_count', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='tracker.student')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='tracker.team')),
+            ],
+            options={
+                'ordering': ['-date', 'student'],
+                'indexes': [models.Index(fields=['team', 'date'], name='tracker_dai_team_id_d8b5c0_idx')],
+                'unique_together': {('student', 'date')},
+            },
+        ),
+    ]
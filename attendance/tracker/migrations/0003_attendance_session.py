@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0002_attendance_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_in_time', models.DateTimeField()),
+                ('check_out_time', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.DurationField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_sessions', to='tracker.student')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_sessions', to='tracker.team')),
+            ],
+            options={
+                'ordering': ['-check_in_time'],
+                'indexes': [models.Index(fields=['student', 'check_out_time'], name='tracker_att_student_43ccb3_idx'), models.Index(fields=['team', 'check_in_time'], name='tracker_att_team_id_8902f9_idx'), models.Index(fields=['check_in_time'], name='tracker_att_check_i_9a2d73_idx')],
+            },
+        ),
+    ]
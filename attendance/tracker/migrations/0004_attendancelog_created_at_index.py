@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0003_attendance_session'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['created_at'], name='tracker_att_created_9b0138_idx'),
+        ),
+    ]
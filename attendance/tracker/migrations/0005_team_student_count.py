@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_student_count(apps, schema_editor):
+    """Fill student_count from the students table and derive is_complete."""
+    Team = apps.get_model('tracker', 'Team')
+    Student = apps.get_model('tracker', 'Student')
+    counts = Student.objects.filter(team=OuterRef('pk')).order_by().values('team').annotate(
+        total=Count('id')
+    ).values('total')
+    Team.objects.update(student_count=Coalesce(Subquery(counts), 0))
+    Team.objects.update(is_complete=False)
+    Team.objects.filter(student_count__gte=6).update(is_complete=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_attendancelog_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='student_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_student_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_team_student_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='student',
+            name='rfid_uid',
+            field=models.CharField(db_index=True, error_messages={'unique': 'This RFID is already registered.'}, max_length=100, unique=True),
+        ),
+    ]
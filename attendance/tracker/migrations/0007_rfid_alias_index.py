@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:55
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copies of the tracker.rfid encoding rules as they were when this
+# migration was written, so later changes to them cannot alter it.
+
+_SEPARATORS = re.compile(r'[\s:\-]')
+_HEX_DIGITS = frozenset('0123456789ABCDEF')
+MIN_UID_BYTES = 4
+
+
+def _compact(rfid_uid):
+    return _SEPARATORS.sub('', str(rfid_uid or '')).upper()
+
+
+def lookup_key(rfid_uid):
+    compact = _compact(rfid_uid)
+    if not compact:
+        return compact
+    return compact.lstrip('0') or '0'
+
+
+def _readings(compact):
+    if compact.isdigit():
+        value = int(compact)
+        yield value, max(MIN_UID_BYTES, (value.bit_length() + 7) // 8)
+    if compact and set(compact) <= _HEX_DIGITS:
+        value = int(compact, 16)
+        yield value, max(MIN_UID_BYTES, (len(compact) + 1) // 2, (value.bit_length() + 7) // 8)
+
+
+def _reverse_bytes(value, length):
+    return int.from_bytes(value.to_bytes(length, 'big'), 'little')
+
+
+def canonical_uid(rfid_uid):
+    compact = _compact(rfid_uid)
+    for value, length in _readings(compact):
+        return value.to_bytes(length, 'big').hex().upper()
+    return lookup_key(rfid_uid)
+
+
+def uid_aliases(rfid_uid):
+    aliases = [lookup_key(rfid_uid)]
+    for value, length in _readings(_compact(rfid_uid)):
+        reversed_value = _reverse_bytes(value, length)
+        for encoded in (str(value), f'{value:X}', f'{reversed_value:X}', str(reversed_value)):
+            key = lookup_key(encoded)
+            if key not in aliases:
+                aliases.append(key)
+    return aliases
+
+
+def index_existing_cards(apps, schema_editor):
+    """
+    Fill uid_canonical and the alias index for already registered students.
+
+    Every student's own lookup key is stored before any derived encoding,
+    oldest registration first, so existing cards keep resolving the way
+    they did before the index existed.
+    """
+    Student = apps.get_model('tracker', 'Student')
+    RFIDAlias = apps.get_model('tracker', 'RFIDAlias')
+
+    students = list(Student.objects.order_by('pk').only('id', 'rfid_uid'))
+    for student in students:
+        student.uid_canonical = canonical_uid(student.rfid_uid)
+    Student.objects.bulk_update(students, ['uid_canonical'], batch_size=500)
+
+    aliases = [(student, uid_aliases(student.rfid_uid)) for student in students]
+    RFIDAlias.objects.bulk_create(
+        [RFIDAlias(alias=keys[0], student=student) for student, keys in aliases],
+        batch_size=500, ignore_conflicts=True,
+    )
+    RFIDAlias.objects.bulk_create(
+        [RFIDAlias(alias=key, student=student) for student, keys in aliases for key in keys[1:]],
+        batch_size=500, ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0006_student_rfid_unique_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='uid_canonical',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100),
+        ),
+        migrations.CreateModel(
+            name='RFIDAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100, unique=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rfid_aliases', to='tracker.student')),
+            ],
+            options={
+                'verbose_name': 'RFID alias',
+                'verbose_name_plural': 'RFID aliases',
+            },
+        ),
+        migrations.RunPython(index_existing_cards, migrations.RunPython.noop),
+    ]
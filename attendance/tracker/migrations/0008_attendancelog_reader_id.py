@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_rfid_alias_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedattendancelog',
+            name='reader_id',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='attendancelog',
+            name='reader_id',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['reader_id', 'created_at'], name='tracker_att_reader__a4b1e9_idx'),
+        ),
+    ]
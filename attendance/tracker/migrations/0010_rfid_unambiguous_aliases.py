@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:40
+
+import re
+
+from django.conf import settings
+from django.db import migrations
+
+
+# Copies of the tracker.rfid encoding rules as they were when this
+# migration was written, so later changes to them cannot alter it.
+
+_SEPARATORS = re.compile(r'[\s:\-]')
+_HEX_DIGITS = frozenset('0123456789ABCDEF')
+MIN_UID_BYTES = 4
+
+
+def _compact(rfid_uid):
+    return _SEPARATORS.sub('', str(rfid_uid or '')).upper()
+
+
+def _byte_length(value):
+    return max(MIN_UID_BYTES, (value.bit_length() + 7) // 8)
+
+
+def _reading(rfid_uid):
+    raw = str(rfid_uid or '').strip()
+    compact = _compact(raw)
+    if not compact or not set(compact) <= _HEX_DIGITS:
+        return None
+    digits_only = compact.isdigit() and not _SEPARATORS.search(raw)
+    if digits_only and getattr(settings, 'ATTENDANCE_RFID_DIGITS', 'decimal') != 'hex':
+        value = int(compact)
+        return value, _byte_length(value)
+    value = int(compact, 16)
+    return value, max(_byte_length(value), (len(compact) + 1) // 2)
+
+
+def _hex_key(value):
+    return value.to_bytes(_byte_length(value), 'big').hex().upper()
+
+
+def lookup_key(rfid_uid):
+    reading = _reading(rfid_uid)
+    if reading is not None:
+        return _hex_key(reading[0])
+    compact = _compact(rfid_uid)
+    if not compact:
+        return compact
+    return compact.lstrip('0') or '0'
+
+
+def uid_aliases(rfid_uid):
+    aliases = [lookup_key(rfid_uid)]
+    reading = _reading(rfid_uid)
+    if reading is not None:
+        value, length = reading
+        reversed_key = _hex_key(int.from_bytes(value.to_bytes(length, 'big'), 'little'))
+        if reversed_key not in aliases:
+            aliases.append(reversed_key)
+    return aliases
+
+
+def reindex_cards(apps, schema_editor):
+    """
+    Rebuild uid_canonical and the alias index with one reading per UID.
+
+    Digits-only UIDs used to be read as both decimal and hex, which made
+    unrelated decimal cards alias each other. Own keys are stored before
+    byte-reversed ones, oldest registration first.
+    """
+    Student = apps.get_model('tracker', 'Student')
+    RFIDAlias = apps.get_model('tracker', 'RFIDAlias')
+
+    students = list(Student.objects.order_by('pk').only('id', 'rfid_uid'))
+    for student in students:
+        student.uid_canonical = lookup_key(student.rfid_uid)
+    Student.objects.bulk_update(students, ['uid_canonical'], batch_size=500)
+
+    RFIDAlias.objects.all().delete()
+    aliases = [(student, uid_aliases(student.rfid_uid)) for student in students]
+    RFIDAlias.objects.bulk_create(
+        [RFIDAlias(alias=keys[0], student=student) for student, keys in aliases],
+        batch_size=500, ignore_conflicts=True,
+    )
+    RFIDAlias.objects.bulk_create(
+        [RFIDAlias(alias=key, student=student) for student, keys in aliases for key in keys[1:]],
+        batch_size=500, ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_idempotency_record'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_cards, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,31 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from .caching import roster_changed
+from .rfid import canonical_uid, uid_aliases
+
+
+MAX_STUDENTS_PER_TEAM = 6
+
+# Team columns maintained by reserve_slot()/release_slot() alone
+TEAM_COUNTER_FIELDS = ('student_count', 'is_complete')
+
 
 class Team(models.Model):
     """
     Represents a team in the RFID attendance system.
     Each team can have up to 6 students.
+    
+    student_count is kept in sync with the students table by reserve_slot()
+    and release_slot(); is_complete is always derived from it.
     """
     team_name = models.CharField(max_length=100, unique=True)
     is_complete = models.BooleanField(default=False)
+    student_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['team_name']
@@ -20,14 +35,68 @@ class Team(models.Model):
 
     def get_student_count(self):
         """Return the number of students in this team."""
-        return self.students.count()
+        return self.student_count
+
+    def reserve_slot(self, count=1):
+        """
+        Atomically claim student slots in this team.
+        
+        A single conditional UPDATE increments student_count only while the
+        team has room for `count` more students, so two concurrent
+        registrations can never both take the last slot. Call it inside the
+        transaction that inserts the students so a failed insert gives the
+        slots back.
+        
+        Raises:
+            ValidationError: If the team does not have enough free slots
+        """
+        reserved = Team.objects.filter(
+            pk=self.pk, student_count__lte=MAX_STUDENTS_PER_TEAM - count
+        ).update(
+            student_count=F('student_count') + count,
+            # The right-hand side sees the pre-update count
+            is_complete=Case(
+                When(student_count__gte=MAX_STUDENTS_PER_TEAM - count, then=Value(True)),
+                default=Value(False)
+            )
+        )
+        if not reserved:
+            if count > 1:
+                raise ValidationError(f"Team {self.team_name} does not have room for {count} more students.")
+            raise ValidationError(
+                f"Team {self.team_name} already has {MAX_STUDENTS_PER_TEAM} students."
+            )
+        # Mirror the update locally instead of re-reading the row
+        self.student_count += count
+        self.is_complete = self.student_count >= MAX_STUDENTS_PER_TEAM
+
+    @staticmethod
+    def release_slot(team_id):
+        """Give back one student slot after a student is removed from a team."""
+        Team.objects.filter(pk=team_id, student_count__gt=0).update(
+            student_count=F('student_count') - 1,
+            is_complete=False
+        )
 
     def clean(self):
         """Validate team creation constraints."""
         pass
 
     def save(self, *args, **kwargs):
+        """
+        Validate and save the team.
+        
+        Updates never write student_count or is_complete: only the
+        conditional UPDATEs in reserve_slot() and release_slot() change
+        them, and writing back a stale in-memory count would undo a
+        concurrent reservation.
+        """
         self.full_clean()
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name not in TEAM_COUNTER_FIELDS]
         super().save(*args, **kwargs)
 
 
@@ -35,11 +104,19 @@ class Student(models.Model):
     """
     Represents a student with RFID card.
     Each student belongs to exactly one team.
+    
+    rfid_uid is the UID as registered; uid_canonical is the same card as
+    hex bytes, and its reader encodings are indexed in RFIDAlias.
     """
     name = models.CharField(max_length=200)
-    rfid_uid = models.CharField(max_length=100, unique=True, db_index=True)
+    rfid_uid = models.CharField(
+        max_length=100, unique=True, db_index=True,
+        error_messages={'unique': 'This RFID is already registered.'}
+    )
+    uid_canonical = models.CharField(max_length=100, blank=True, db_index=True, editable=False)
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='students')
     registered_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['team', 'name']
@@ -49,26 +126,138 @@ class Student(models.Model):
 
     def clean(self):
         """Validate student registration constraints."""
-        # Check if RFID is already registered
-        if self.rfid_uid:
-            existing = Student.objects.filter(rfid_uid=self.rfid_uid).exclude(pk=self.pk)
-            if existing.exists():
-                raise ValidationError(f"RFID {self.rfid_uid} is already registered.")
-
-        # Check if team already has 6 students
-        if self.team:
-            current_count = self.team.students.exclude(pk=self.pk).count()
-            if current_count >= 6:
-                raise ValidationError(f"Team {self.team.team_name} already has 6 students.")
+        # RFID uniqueness is checked once by validate_unique() and enforced
+        # by the unique index, so it is not queried again here.
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        # Check if team already has 6 students (final guarantee is reserve_slot)
+        if self.team_id and self._state.adding:
+            if self.team.student_count >= MAX_STUDENTS_PER_TEAM:
+                raise ValidationError(
+                    f"Team {self.team.team_name} already has {MAX_STUDENTS_PER_TEAM} students."
+                )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        student = super().from_db(db, field_names, values)
+        # Remember the stored team so save() can move the slot with the student
+        student._saved_team_id = student.__dict__.get('team_id')
+        return student
+
+    def save(self, *args, full_clean=True, **kwargs):
+        """
+        Validate and save the student, reserving a team slot on insert.
+        
+        Moving a saved student to another team reserves a slot in the new
+        team and gives the old one back. Pass full_clean=False when the
+        caller has already validated the student; the unique RFID index and
+        reserve_slot() still guarantee correctness.
+        """
+        if full_clean:
+            self.full_clean()
+        adding = self._state.adding
+        if adding:
+            self.uid_canonical = canonical_uid(self.rfid_uid)
+        saved_team_id = getattr(self, '_saved_team_id', None)
+        moved = not adding and saved_team_id is not None and saved_team_id != self.team_id
+        with transaction.atomic():
+            # Reserving the slot also auto-completes the team on the 6th student
+            if adding or moved:
+                self.team.reserve_slot()
+            super().save(*args, **kwargs)
+            if adding:
+                RFIDAlias.index([self])
+            if moved:
+                Team.release_slot(saved_team_id)
+        self._saved_team_id = self.team_id
+
+    @staticmethod
+    def bulk_register(students, batch_size=None):
+        """
+        Insert new students with bulk_create and index their RFID aliases.
+        
+        Team slots are not reserved here; callers reserve or recount them.
         
-        # Auto-complete team when 6th student is added
-        if self.team.students.count() == 6:
-            self.team.is_complete = True
-            self.team.save()
+        Returns:
+            list: The created students
+        """
+        for student in students:
+            student.uid_canonical = canonical_uid(student.rfid_uid)
+        created = Student.objects.bulk_create(students, batch_size=batch_size)
+        RFIDAlias.index(created, batch_size=batch_size)
+        roster_changed()
+        return created
+
+
+class RFIDAlias(models.Model):
+    """
+    One reader encoding (lookup key) of a student's RFID card.
+    
+    Each student has its own lookup key plus, for numeric cards, the
+    byte-reversed UID, so a tap in any reader format is resolved with one
+    unique-index lookup.
+    """
+    alias = models.CharField(max_length=100, unique=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='rfid_aliases')
+
+    class Meta:
+        verbose_name = 'RFID alias'
+        verbose_name_plural = 'RFID aliases'
+
+    def __str__(self):
+        return f"{self.alias} -> {self.student.rfid_uid}"
+
+    @staticmethod
+    def index(students, batch_size=None):
+        """
+        Store the aliases of newly registered students.
+        
+        Each student's own lookup key must be free (callers check it first)
+        and raises IntegrityError if it is not. Derived encodings that
+        another card already owns are skipped, so earlier registrations keep
+        resolving as before.
+        """
+        own, derived = [], []
+        for student in students:
+            aliases = uid_aliases(student.rfid_uid)
+            own.append(RFIDAlias(alias=aliases[0], student=student))
+            derived.extend(RFIDAlias(alias=alias, student=student) for alias in aliases[1:])
+        RFIDAlias.objects.bulk_create(own, batch_size=batch_size)
+        if derived:
+            RFIDAlias.objects.bulk_create(derived, batch_size=batch_size, ignore_conflicts=True)
+
+    @staticmethod
+    def rebuild(batch_size=500):
+        """
+        Recompute every student's canonical UID and aliases from scratch.
+        
+        Needed after ATTENDANCE_RFID_DIGITS changes. Oldest registrations
+        claim their keys first; a student whose own key another card now
+        owns is left without it.
+        
+        Returns:
+            list: Students whose own lookup key was already taken
+        """
+        with transaction.atomic():
+            students = list(Student.objects.order_by('pk').only('id', 'rfid_uid'))
+            for student in students:
+                student.uid_canonical = canonical_uid(student.rfid_uid)
+            Student.objects.bulk_update(students, ['uid_canonical'], batch_size=batch_size)
+
+            RFIDAlias.objects.all().delete()
+            owners = {}
+            clashes = []
+            aliases = [(student, uid_aliases(student.rfid_uid)) for student in students]
+            for student, keys in aliases:
+                if owners.setdefault(keys[0], student) is not student:
+                    clashes.append(student)
+            for student, keys in aliases:
+                for key in keys[1:]:
+                    owners.setdefault(key, student)
+            RFIDAlias.objects.bulk_create(
+                [RFIDAlias(alias=key, student=student) for key, student in owners.items()], batch_size=batch_size
+            )
+        roster_changed(rfid=True)
+        return clashes
 
 
 class AttendanceLog(models.Model):
@@ -86,10 +275,15 @@ class AttendanceLog(models.Model):
     status = models.CharField(max_length=3, choices=STATUS_CHOICES)
     check_in_time = models.DateTimeField(null=True, blank=True)
     check_out_time = models.DateTimeField(null=True, blank=True)
+    reader_id = models.CharField(max_length=64, blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['reader_id', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.student.name} - {self.status} at {self.created_at}"
@@ -101,3 +295,100 @@ class AttendanceLog(models.Model):
         elif self.status == 'OUT' and not self.check_out_time:
             self.check_out_time = timezone.now()
         super().save(*args, **kwargs)
+
+
+class ArchivedAttendanceLog(models.Model):
+    """
+    Cold-storage copy of an AttendanceLog moved out by the retention policy.
+    Keeps the original primary key and timestamps.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_attendance_logs')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='archived_attendance_logs')
+    status = models.CharField(max_length=3, choices=AttendanceLog.STATUS_CHOICES)
+    check_in_time = models.DateTimeField(null=True, blank=True)
+    check_out_time = models.DateTimeField(null=True, blank=True)
+    reader_id = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(db_index=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['student', 'created_at']),
+            models.Index(fields=['team', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.name} - {self.status} at {self.created_at} (archived)"
+
+
+class DailyAttendanceSummary(models.Model):
+    """
+    Per-student, per-day rollup of attendance logs.
+    Stays online after the raw logs for that day are archived.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='daily_summaries')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+    first_in = models.DateTimeField(null=True, blank=True)
+    last_out = models.DateTimeField(null=True, blank=True)
+    in_count = models.PositiveIntegerField(default=0)
+    out_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date', 'student']
+        unique_together = [('student', 'date')]
+        indexes = [
+            models.Index(fields=['team', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.student.name} - {self.date} ({self.in_count} IN / {self.out_count} OUT)"
+
+
+class AttendanceSession(models.Model):
+    """
+    A paired IN/OUT stay for a student.
+    Opened by an IN tap and closed by the next OUT tap; duration is set on close.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_sessions')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='attendance_sessions')
+    check_in_time = models.DateTimeField()
+    check_out_time = models.DateTimeField(null=True, blank=True)
+    duration = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-check_in_time']
+        indexes = [
+            models.Index(fields=['student', 'check_out_time']),
+            models.Index(fields=['team', 'check_in_time']),
+            models.Index(fields=['check_in_time']),
+        ]
+
+    def __str__(self):
+        end = self.check_out_time or 'open'
+        return f"{self.student.name} - {self.check_in_time} to {end}"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Stored response of a POST request sent with an Idempotency-Key header.
+    
+    The row is claimed (status_code empty) before the request runs and
+    filled in with the response once it succeeds; repeats of the key
+    replay that response until the record expires.
+    """
+    path = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = [('path', 'key')]
+
+    def __str__(self):
+        return f"{self.key} {self.path} ({self.status_code or 'pending'})"
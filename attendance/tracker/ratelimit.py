@@ -0,0 +1,182 @@
+# tracker/ratelimit.py
+"""
+In-memory token-bucket rate limiting for RFID taps.
+
+Each reader id has a bucket holding up to `burst` tokens that refills at
+`rate` tokens per second. A tap takes one token. Taps without a reader id
+share a bucket per client IP, so a reader that never names itself is
+still limited; readers behind one proxy or NAT should send reader ids, or
+they throttle each other. An empty bucket means the tap is refused with
+the time until the next token. Buckets live in the worker process, like
+the other in-memory stats, and the least recently seen ones are dropped
+past max_keys. A dropped bucket would have refilled to full by then
+anyway.
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from .metrics import format_labels, register_collector
+
+
+# Keys with the most refused taps listed individually in /api/metrics
+TOP_LIMITED_KEYS = 10
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'updated', 'limited')
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated = now
+        self.limited = 0
+
+
+class RateLimiter:
+    """Token buckets keyed by reader id, or client IP for unnamed readers."""
+
+    def __init__(self, rate=5.0, burst=20, max_keys=4096):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        self.allowed = 0
+        self.limited = 0
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def take(self, key):
+        """
+        Take a token for key.
+
+        Returns:
+            float: 0 if the tap may proceed, else seconds until it would
+        """
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(self.burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                self.allowed += 1
+                return 0.0
+            bucket.limited += 1
+            self.limited += 1
+            return (1 - bucket.tokens) / self.rate
+
+    @staticmethod
+    def key_for(reader_id='', client_ip=''):
+        """Bucket key for a reader id, falling back to the client IP."""
+        if reader_id:
+            return f'reader:{reader_id}'
+        return f'ip:{client_ip}'
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+            self.allowed = 0
+            self.limited = 0
+
+    def render_metrics(self):
+        """Render limiter totals and the most limited keys for /api/metrics."""
+        with self._lock:
+            allowed, limited, keys = self.allowed, self.limited, len(self._buckets)
+            top = sorted(
+                ((key, bucket.limited, bucket.tokens) for key, bucket in self._buckets.items() if bucket.limited),
+                key=lambda item: item[1], reverse=True
+            )[:TOP_LIMITED_KEYS]
+
+        name = 'attendance_tap_rate_limit_requests_total'
+        lines = [
+            f'# HELP {name} Taps checked by the rate limiter, by result.',
+            f'# TYPE {name} counter',
+            f'{name}{format_labels({"result": "allowed"})} {allowed}',
+            f'{name}{format_labels({"result": "limited"})} {limited}',
+            '# HELP attendance_tap_rate_limit_keys Readers and client IPs with a token bucket.',
+            '# TYPE attendance_tap_rate_limit_keys gauge',
+            f'attendance_tap_rate_limit_keys {keys}',
+        ]
+        name = 'attendance_tap_rate_limited_total'
+        lines.append(f'# HELP {name} Refused taps of the most limited readers.')
+        lines.append(f'# TYPE {name} counter')
+        for key, count, _ in top:
+            lines.append(f'{name}{format_labels({"key": key})} {count}')
+        name = 'attendance_tap_rate_limit_tokens'
+        lines.append(f'# HELP {name} Tokens left after the last tap of the most limited readers.')
+        lines.append(f'# TYPE {name} gauge')
+        for key, _, tokens in top:
+            lines.append(f'{name}{format_labels({"key": key})} {tokens:.3f}')
+        return lines
+
+
+tap_limiter = RateLimiter(
+    rate=getattr(settings, 'ATTENDANCE_TAP_RATE', 5.0),
+    burst=getattr(settings, 'ATTENDANCE_TAP_BURST', 20),
+)
+register_collector(tap_limiter.render_metrics)
+
+
+def rate_limited_response(retry_after):
+    """Return a 429 telling the client how many seconds to wait."""
+    seconds = math.ceil(retry_after)
+    response = JsonResponse({'error': 'Too many requests; slow down', 'retry_after': seconds}, status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def client_ip(request):
+    """
+    The tapping client's IP address.
+
+    Taken from ATTENDANCE_CLIENT_IP_HEADER when the server sits behind a
+    trusted proxy that sets it (the last, proxy-added entry of a
+    comma-separated list), else REMOTE_ADDR.
+    """
+    header = getattr(settings, 'ATTENDANCE_CLIENT_IP_HEADER', '')
+    if header:
+        forwarded = request.headers.get(header, '').rsplit(',', 1)[-1].strip()
+        if forwarded:
+            return forwarded
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def throttle_taps(view):
+    """
+    Refuse a tap over its reader's (or client IP's) rate with a 429 before the view runs.
+
+    Goes outside @idempotent, so a refused tap makes no query at all, not
+    even an idempotency claim. A malformed body is left for the view to
+    reject.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        try:
+            reader_id = json.loads(request.body).get('reader_id') or ''
+        except (ValueError, AttributeError):
+            reader_id = ''
+        reader_id = reader_id.strip() if isinstance(reader_id, str) else ''
+        retry_after = tap_limiter.take(tap_limiter.key_for(reader_id, client_ip(request)))
+        if retry_after:
+            return rate_limited_response(retry_after)
+        return view(request, *args, **kwargs)
+
+    return wrapped
@@ -0,0 +1,283 @@
+# tracker/replay.py
+"""
+Export and replay recorded RFID taps.
+
+A tap file is plain CSV: timestamp,rfid_uid[,status[,reader_id]]. The
+recorded status is optional (reader logs do not have it); when present,
+the replayed toggle result is compared against it.
+
+Taps are sharded across workers by RFID, so each student's taps are
+replayed in their original order whatever the concurrency, and a toggle
+only diverges when the system really decides differently.
+"""
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .benchmark import percentile
+from .models import AttendanceLog, AttendanceSession
+from .utils import AttendanceService
+
+
+Tap = namedtuple('Tap', ['timestamp', 'rfid_uid', 'status', 'reader_id'], defaults=[''])
+
+MAX_SAMPLES = 20
+
+
+# ============================================================================
+# TAP FILES
+# ============================================================================
+
+def export_taps(path, start=None, end=None, chunk_size=1000):
+    """
+    Write recorded taps from AttendanceLog to a CSV tap file, oldest first.
+
+    Returns:
+        int: Number of taps written
+    """
+    logs = AttendanceLog.objects.order_by('created_at', 'pk')
+    if start is not None:
+        logs = logs.filter(created_at__gte=start)
+    if end is not None:
+        logs = logs.filter(created_at__lt=end)
+
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['timestamp', 'rfid_uid', 'status', 'reader_id'])
+        for created_at, rfid_uid, status, reader_id in logs.values_list(
+            'created_at', 'student__rfid_uid', 'status', 'reader_id'
+        ).iterator(chunk_size=chunk_size):
+            writer.writerow([created_at.isoformat(), rfid_uid, status, reader_id])
+            count += 1
+    return count
+
+
+def _parse_timestamp(value):
+    value = value.strip()
+    try:
+        moment = datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+    except ValueError:
+        moment = parse_datetime(value)
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def read_taps(path):
+    """
+    Read a tap file exported by export_taps() or written by a reader.
+
+    Accepts comma- or whitespace-separated lines of timestamp (ISO 8601 or
+    Unix epoch seconds), RFID, optional IN/OUT status and optional reader
+    id. A header line,
+    blank lines and '#' comments are skipped.
+
+    Returns:
+        list: Tap tuples sorted by timestamp
+
+    Raises:
+        ValidationError: On a line that cannot be parsed
+    """
+    taps = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = next(csv.reader([line])) if ',' in line else line.split()
+            if len(fields) < 2:
+                raise ValidationError(f'{path}:{line_no}: expected "timestamp,rfid_uid[,status]"')
+
+            moment = _parse_timestamp(fields[0])
+            if moment is None:
+                if not taps and fields[0].strip().lower() == 'timestamp':
+                    continue
+                raise ValidationError(f'{path}:{line_no}: invalid timestamp {fields[0]!r}')
+
+            status = fields[2].strip().upper() if len(fields) > 2 and fields[2].strip() else None
+            if status not in (None, 'IN', 'OUT'):
+                raise ValidationError(f'{path}:{line_no}: status must be IN or OUT')
+            reader_id = fields[3].strip() if len(fields) > 3 else ''
+            taps.append(Tap(moment, fields[1].strip(), status, reader_id))
+
+    taps.sort(key=lambda tap: tap.timestamp)
+    return taps
+
+
+# ============================================================================
+# SCRATCH DATABASE
+# ============================================================================
+
+@contextmanager
+def scratch_database(since, alias='default'):
+    """
+    Point the database at a throwaway copy of itself, rewound to `since`.
+
+    The SQLite file is copied with the online backup API, so the live
+    database can stay in use. Logs from `since` onwards are removed from
+    the copy and sessions are rewound, giving every student the IN/OUT
+    state they had when the replayed period began.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise ValidationError('A scratch copy is only supported for SQLite databases.')
+
+    original = connection.settings_dict['NAME']
+    fd, scratch = tempfile.mkstemp(suffix='.sqlite3', prefix='replay_')
+    os.close(fd)
+    source = sqlite3.connect(original)
+    target = sqlite3.connect(scratch)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+    connection.close()
+    connection.settings_dict['NAME'] = scratch
+    try:
+        AttendanceLog.objects.filter(created_at__gte=since).delete()
+        AttendanceSession.objects.filter(check_in_time__gte=since).delete()
+        AttendanceSession.objects.filter(check_out_time__gte=since).update(check_out_time=None, duration=None)
+        yield scratch
+    finally:
+        connections.close_all()
+        connection.settings_dict['NAME'] = original
+        os.remove(scratch)
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+def service_target(rfid_uid, reader_id=''):
+    """Replay one tap through AttendanceService; returns the new status."""
+    return AttendanceService.process_rfid_tap(rfid_uid, reader_id=reader_id)['status']
+
+
+def http_target(base_url, timeout=10):
+    """Build a target that replays taps against a running server."""
+    url = base_url.rstrip('/') + '/api/attendance/tap'
+
+    def tap(rfid_uid, reader_id=''):
+        payload = {'rfid_uid': rfid_uid}
+        if reader_id:
+            payload['reader_id'] = reader_id
+        request = urllib.request.Request(
+            url, data=json.dumps(payload).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.load(response)['attendance_log']['status']
+        except urllib.error.HTTPError as e:
+            raise ValidationError(f'HTTP {e.code}: {e.read().decode(errors="replace")[:200]}')
+    return tap
+
+
+def replay(taps, target, speed=1.0, concurrency=1):
+    """
+    Replay taps against a target callable.
+
+    Args:
+        taps (list): Tap tuples sorted by timestamp
+        target (callable): Takes an RFID and a reader id and returns 'IN'
+            or 'OUT'
+        speed (float): Time scale; 1 is real time, 10 is ten times faster,
+            0 replays as fast as possible
+        concurrency (int): Worker threads
+
+    Returns:
+        dict: Throughput, latency distribution, schedule lag, errors and
+        toggle divergences
+    """
+    shards = [[] for _ in range(concurrency)]
+    for index, tap in enumerate(taps):
+        shards[hash(tap.rfid_uid) % concurrency].append((index, tap))
+
+    lock = threading.Lock()
+    latencies = []
+    lags = []
+    errors = []
+    divergences = []
+    origin = taps[0].timestamp if taps else None
+
+    def work(shard):
+        try:
+            for index, tap in shard:
+                if speed:
+                    due = started + (tap.timestamp - origin).total_seconds() / speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    lag = max(0.0, time.perf_counter() - due)
+                else:
+                    lag = 0.0
+
+                begin = time.perf_counter()
+                try:
+                    status, error = target(tap.rfid_uid, tap.reader_id), None
+                except Exception as e:
+                    status, error = None, str(e)
+                latency = time.perf_counter() - begin
+
+                with lock:
+                    latencies.append(latency * 1000)
+                    lags.append(lag * 1000)
+                    if error is not None:
+                        errors.append({'index': index, 'rfid_uid': tap.rfid_uid, 'error': error})
+                    elif tap.status and status != tap.status:
+                        divergences.append({
+                            'index': index, 'rfid_uid': tap.rfid_uid,
+                            'timestamp': tap.timestamp.isoformat(),
+                            'recorded': tap.status, 'replayed': status,
+                        })
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=work, args=(shard,)) for shard in shards if shard]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors.sort(key=lambda item: item['index'])
+    divergences.sort(key=lambda item: item['index'])
+    return {
+        'taps': len(taps),
+        'errors': len(errors),
+        'divergences': len(divergences),
+        'compared': sum(1 for tap in taps if tap.status),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_tps': round(len(taps) / elapsed, 1) if elapsed else None,
+        'speed': speed,
+        'concurrency': concurrency,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3) if latencies else 0.0,
+        },
+        'max_lag_ms': round(max(lags), 3) if lags else 0.0,
+        'error_samples': errors[:MAX_SAMPLES],
+        'divergence_samples': divergences[:MAX_SAMPLES],
+    }
@@ -0,0 +1,105 @@
+# tracker/rfid.py
+"""
+RFID UID encodings.
+
+Readers report the same card in different formats: the UID as a decimal
+number, as hex, or with the bytes reversed, with or without leading zeros
+and separators. lookup_key() reads a reader value as one number and
+reduces it to the card's UID as hex bytes, so a decimal and a hex reader
+give the same key for the same card. The byte-reversed UID is stored as
+a second alias at registration, so a tap needs only lookup_key() and one
+indexed lookup, whatever the reader.
+
+A value is read as hex when it contains A-F or byte separators. A value
+of digits only is read as decimal, or as hex when ATTENDANCE_RFID_DIGITS
+is 'hex' (readers that print hex UIDs without separators). It is never
+read both ways, since that would make unrelated decimal cards alias each
+other.
+"""
+import re
+
+from django.conf import settings
+
+
+# Separators some readers put between UID bytes ("04:A2:1B:7C", "04-A2-...")
+_SEPARATORS = re.compile(r'[\s:\-]')
+_HEX_DIGITS = frozenset('0123456789ABCDEF')
+
+# Shortest UID length in bytes (MIFARE Classic 4-byte UIDs); keys and byte
+# reversal use at least this many bytes
+MIN_UID_BYTES = 4
+
+
+def _compact(rfid_uid):
+    """Upper-case the UID and drop byte separators."""
+    return _SEPARATORS.sub('', str(rfid_uid or '')).upper()
+
+
+def _byte_length(value):
+    return max(MIN_UID_BYTES, (value.bit_length() + 7) // 8)
+
+
+def _reading(rfid_uid):
+    """
+    The (value, byte_length) a reader value stands for, or None.
+
+    Anything that is not hex (e.g. 'RFID001') has no numeric reading.
+    """
+    raw = str(rfid_uid or '').strip()
+    compact = _compact(raw)
+    if not compact or not set(compact) <= _HEX_DIGITS:
+        return None
+    digits_only = compact.isdigit() and not _SEPARATORS.search(raw)
+    if digits_only and getattr(settings, 'ATTENDANCE_RFID_DIGITS', 'decimal') != 'hex':
+        value = int(compact)
+        return value, _byte_length(value)
+    value = int(compact, 16)
+    return value, max(_byte_length(value), (len(compact) + 1) // 2)
+
+
+def _hex_key(value):
+    return value.to_bytes(_byte_length(value), 'big').hex().upper()
+
+
+def lookup_key(rfid_uid):
+    """
+    Reduce a raw reader value to the form aliases are stored in.
+
+    Examples:
+        '77732732' -> '04A21B7C'
+        '04:a2:1b:7c' -> '04A21B7C'
+        '0RFID001' -> 'RFID001'
+    """
+    reading = _reading(rfid_uid)
+    if reading is not None:
+        return _hex_key(reading[0])
+    compact = _compact(rfid_uid)
+    if not compact:
+        return compact
+    return compact.lstrip('0') or '0'
+
+
+def canonical_uid(rfid_uid):
+    """
+    The card's UID as upper-case hex bytes.
+
+    Non-numeric UIDs are their own canonical form (their lookup key).
+    """
+    return lookup_key(rfid_uid)
+
+
+def uid_aliases(rfid_uid):
+    """
+    Every lookup key a reader may report for this card.
+
+    The UID's own lookup key comes first, followed by the byte-reversed
+    UID for numeric cards.
+    """
+    aliases = [lookup_key(rfid_uid)]
+    reading = _reading(rfid_uid)
+    if reading is not None:
+        value, length = reading
+        reversed_key = _hex_key(int.from_bytes(value.to_bytes(length, 'big'), 'little'))
+        if reversed_key not in aliases:
+            aliases.append(reversed_key)
+    return aliases
@@ -0,0 +1,29 @@
+# tracker/routers.py
+"""
+Database routers for RFID Team-Based Event Attendance System
+"""
+from .replica import REPLICA_ALIAS, reading_from_replica
+
+
+class ReplicaRouter:
+    """
+    Send tracker reads to the replica inside use_replica(), all else to the primary.
+
+    Only tracker models are routed, so sessions and auth always see the
+    primary's latest state. Writes and migrations always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'tracker' and reading_from_replica():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so rows from either relate
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
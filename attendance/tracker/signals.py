@@ -0,0 +1,28 @@
+# tracker/signals.py
+"""
+Signal handlers keeping denormalized counters and caches in sync.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import roster_changed
+from .models import Team, Student
+
+
+@receiver(post_delete, sender=Student)
+def release_team_slot(sender, instance, **kwargs):
+    """Decrement the team's student_count when a student is deleted."""
+    Team.release_slot(instance.team_id)
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_save, sender=Student)
+def roster_saved(sender, instance, created, **kwargs):
+    """New rows only change listings; edits can also change cached tap lookups."""
+    roster_changed(rfid=not created)
+
+
+@receiver(post_delete, sender=Team)
+@receiver(post_delete, sender=Student)
+def roster_deleted(sender, instance, **kwargs):
+    roster_changed(rfid=True)
@@ -0,0 +1,133 @@
+# tracker/staticfiles.py
+"""
+Hashed, precompressed static files.
+
+`collectstatic` copies each file under a content-hashed name
+(dashboard.3f2a9c1b.css) listed in staticfiles.json, and writes .gz (and
+.br when the optional `brotli` package is installed) next to every text
+asset. `{% static %}` resolves names through that manifest. serve_static()
+hands out the smallest encoding the client accepts and marks hashed files
+as cacheable forever, since any change to their content changes the name.
+"""
+import gzip
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.utils._os import safe_join
+from django.views import static
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.html')
+
+# Files this small gain nothing from compression
+MIN_COMPRESS_SIZE = 256
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress_file(path):
+    """
+    Write .gz and .br siblings of path when they are smaller than the original.
+
+    Returns:
+        list: Suffixes of the files written ('.gz', '.br')
+    """
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data, quality=11)))
+
+    written = []
+    for suffix, compressed in variants:
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as fh:
+                fh.write(compressed)
+            written.append(suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that precompresses text assets during collectstatic."""
+
+    # Templates still render (with unhashed names) before collectstatic has run
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        compress = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                compress.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in compress:
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                for suffix in compress_file(self.path(hashed_name)):
+                    yield hashed_name, hashed_name + suffix, True
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # File missing from STATIC_ROOT: fall back to the plain name
+            return name
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        try:
+            if params.startswith('q=') and float(params[2:]) == 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _is_hashed(path):
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None) or {}
+    return path in set(hashed_files.values())
+
+
+def serve_static(request, path):
+    """
+    Serve a file from STATIC_ROOT with precompression and cache headers.
+
+    A precompressed sibling is served when the client accepts its encoding.
+    Hashed names get a one-year immutable Cache-Control; anything else must
+    revalidate (django.views.static.serve answers If-Modified-Since).
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    root = settings.STATIC_ROOT
+
+    accepted = _accepted_encodings(request)
+    served = path
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(safe_join(root, path + suffix)):
+            served = path + suffix
+            break
+
+    # static.serve() sets Content-Type from the original extension and
+    # Content-Encoding from the .gz/.br suffix
+    response = static.serve(request, served, document_root=root)
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if _is_hashed(path) else REVALIDATE_CACHE_CONTROL
+    return response
@@ -0,0 +1,76 @@
+# tracker/streaming.py
+"""
+Streaming JSON responses for large result sets.
+
+StreamingJSONResponse writes a JSON object whose main array is encoded
+element by element as its iterable is consumed, so the first bytes go out
+before the last row is read and memory does not grow with the result.
+Datetimes are encoded as ISO 8601 by the encoder itself. The optional
+`orjson` package does that (and everything else) in C when installed.
+"""
+import json
+from datetime import date, datetime, time
+
+from django.http import StreamingHttpResponse
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+
+# Encoded array elements sent per chunk
+ELEMENTS_PER_CHUNK = 500
+
+
+def _default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    def encode(value):
+        """Encode a value as compact JSON bytes."""
+        return orjson.dumps(value)
+else:
+    _encoder = json.JSONEncoder(default=_default, separators=(',', ':'))
+
+    def encode(value):
+        """Encode a value as compact JSON bytes."""
+        return _encoder.encode(value).encode()
+
+
+class StreamingJSONResponse(StreamingHttpResponse):
+    """
+    Stream {**fields, items_key: [...items], count_key: <number of items>}.
+
+    items may be any iterable, including a lazy queryset iterator. The
+    count is only known once every item has been written, so it comes
+    after the array.
+    """
+
+    def __init__(self, fields, items_key, items, count_key=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(self._stream(fields, items_key, items, count_key), **kwargs)
+
+    @staticmethod
+    def _stream(fields, items_key, items, count_key):
+        head = encode(fields)[:-1]
+        yield head + (b',' if fields else b'') + encode(items_key) + b':['
+
+        count = 0
+        chunk = []
+        for item in items:
+            chunk.append(encode(item))
+            count += 1
+            if len(chunk) == ELEMENTS_PER_CHUNK:
+                yield (b',' if count > ELEMENTS_PER_CHUNK else b'') + b','.join(chunk)
+                chunk = []
+        if chunk:
+            yield (b',' if count > len(chunk) else b'') + b','.join(chunk)
+
+        tail = b']'
+        if count_key:
+            tail += b',' + encode(count_key) + b':' + encode(count)
+        yield tail + b'}'
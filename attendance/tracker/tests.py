@@ -1,3 +1,1743 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .models import MAX_STUDENTS_PER_TEAM, Team, Student
+from .rfid import lookup_key
+from .utils import AttendanceService, RegistrationService
+
+
+# Statements for one successful registration: team + RFID check, then
+# BEGIN, slot reservation, insert, alias insert, COMMIT. Numeric UIDs add
+# one more insert for their derived encodings.
+REGISTRATION_QUERY_BUDGET = 6
+
+
+class RegistrationQueryBudgetTests(TransactionTestCase):
+    """
+    Registration must stay within a fixed number of queries.
+
+    TransactionTestCase is used so no test-level transaction adds
+    savepoint statements to the count.
+    """
+
+    def setUp(self):
+        self.team = RegistrationService.create_team('Team Alpha')
+
+    def test_register_student_query_budget(self):
+        with self.assertNumQueries(REGISTRATION_QUERY_BUDGET):
+            RegistrationService.register_student(self.team.id, 'John Doe', 'RFID001')
+
+    def test_register_last_slot_query_budget(self):
+        for i in range(MAX_STUDENTS_PER_TEAM - 1):
+            RegistrationService.register_student(self.team.id, f'Student {i}', f'RFID10{i}')
+
+        with self.assertNumQueries(REGISTRATION_QUERY_BUDGET):
+            student = RegistrationService.register_student(self.team.id, 'Last', 'RFID200')
+
+        self.assertTrue(student.team.is_complete)
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.student_count, MAX_STUDENTS_PER_TEAM)
+        self.assertTrue(self.team.is_complete)
+
+    def test_register_api_query_budget(self):
+        with self.assertNumQueries(REGISTRATION_QUERY_BUDGET):
+            response = self.client.post(
+                '/api/students/register',
+                {'team_id': self.team.id, 'student_name': 'John Doe', 'rfid_uid': 'RFID001'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['team']['student_count'], 1)
+
+    def test_rejections_cost_one_query(self):
+        RegistrationService.register_student(self.team.id, 'John Doe', 'RFID001')
+
+        with self.assertNumQueries(1):
+            with self.assertRaises(ValidationError):
+                RegistrationService.register_student(self.team.id, 'Jane Doe', '0RFID001')
+
+        with self.assertNumQueries(1):
+            with self.assertRaises(ValidationError):
+                RegistrationService.register_student(self.team.id + 100, 'Jane Doe', 'RFID002')
+
+
+class RegistrationValidationTests(TestCase):
+    """Registration rules still hold after the single-pass restructure."""
+
+    def setUp(self):
+        self.team = RegistrationService.create_team('Team Alpha')
+
+    def test_normalizes_rfid(self):
+        student = RegistrationService.register_student(self.team.id, 'John Doe', '00012345')
+        self.assertEqual(student.rfid_uid, '12345')
+
+    def test_duplicate_rfid_rejected_across_teams(self):
+        other = RegistrationService.create_team('Team Beta')
+        RegistrationService.register_student(self.team.id, 'John Doe', 'RFID001')
+
+        with self.assertRaisesMessage(ValidationError, 'already registered'):
+            RegistrationService.register_student(other.id, 'Jane Doe', 'RFID001')
+        self.assertEqual(Student.objects.count(), 1)
+
+    def test_full_team_rejected(self):
+        for i in range(MAX_STUDENTS_PER_TEAM):
+            RegistrationService.register_student(self.team.id, f'Student {i}', f'RFID{i}')
+
+        with self.assertRaisesMessage(ValidationError, 'already has 6 students'):
+            RegistrationService.register_student(self.team.id, 'Extra', 'RFID999')
+        self.assertEqual(Team.objects.get(id=self.team.id).student_count, MAX_STUDENTS_PER_TEAM)
+
+    def test_stale_count_cannot_overfill_team(self):
+        """The conditional UPDATE refuses a slot even if the caller's copy looks free."""
+        for i in range(MAX_STUDENTS_PER_TEAM):
+            RegistrationService.register_student(self.team.id, f'Student {i}', f'RFID{i}')
+
+        stale = Team.objects.get(id=self.team.id)
+        stale.student_count = 0
+        with self.assertRaises(ValidationError):
+            stale.reserve_slot()
+        self.assertEqual(self.team.students.count(), MAX_STUDENTS_PER_TEAM)
+
+    def test_deleting_student_releases_slot(self):
+        for i in range(MAX_STUDENTS_PER_TEAM):
+            RegistrationService.register_student(self.team.id, f'Student {i}', f'RFID{i}')
+
+        Student.objects.filter(rfid_uid='RFID0').delete()
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.student_count, MAX_STUDENTS_PER_TEAM - 1)
+        self.assertFalse(self.team.is_complete)
+
+
+class BatchRegistrationTests(TestCase):
+    """Batch registration validates set-wise and inserts in one transaction."""
+
+    def setUp(self):
+        self.alpha = RegistrationService.create_team('Team Alpha')
+        self.beta = RegistrationService.create_team('Team Beta')
+
+    def post_batch(self, students, mode='all_or_nothing'):
+        return self.client.post(
+            '/api/students/register/batch',
+            {'mode': mode, 'students': students},
+            content_type='application/json',
+        )
+
+    def test_whole_batch_uses_fixed_queries(self):
+        students = [
+            {'team_id': team.id, 'name': f'{team.team_name} {i}', 'rfid_uid': f'{team.id}{i:07d}'}
+            for team in (self.alpha, self.beta) for i in range(MAX_STUDENTS_PER_TEAM)
+        ]
+        # RFID check, team load, then per-team reservation, one bulk insert
+        # and two alias inserts (plus the savepoint around them)
+        with self.assertNumQueries(9):
+            response = self.post_batch(students)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 12)
+        self.alpha.refresh_from_db()
+        self.assertEqual(self.alpha.student_count, MAX_STUDENTS_PER_TEAM)
+        self.assertTrue(self.alpha.is_complete)
+
+    def test_all_or_nothing_rejects_whole_batch(self):
+        RegistrationService.register_student(self.alpha.id, 'Existing', 'RFID001')
+        response = self.post_batch([
+            {'team_id': self.beta.id, 'name': 'New', 'rfid_uid': 'RFID002'},
+            {'team_id': self.beta.id, 'name': 'Dup', 'rfid_uid': 'RFID001'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        statuses = [result['status'] for result in response.json()['results']]
+        self.assertEqual(statuses, ['skipped', 'error'])
+        self.assertEqual(Student.objects.count(), 1)
+
+    def test_partial_mode_reports_duplicates_and_overflow(self):
+        students = [
+            {'team_id': self.alpha.id, 'name': f'Student {i}', 'rfid_uid': f'RFID{i}'}
+            for i in range(MAX_STUDENTS_PER_TEAM + 1)
+        ]
+        students.append({'team_id': self.beta.id, 'name': 'Twin', 'rfid_uid': 'RFID0'})
+        response = self.post_batch(students, mode='partial')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['created'], MAX_STUDENTS_PER_TEAM)
+        self.assertIn('already has 6 students', body['results'][MAX_STUDENTS_PER_TEAM]['error'])
+        self.assertIn('more than once', body['results'][-1]['error'])
+        self.assertEqual(Team.objects.get(id=self.alpha.id).student_count, MAX_STUDENTS_PER_TEAM)
+
+    def test_same_card_in_two_formats(self):
+        # 77732732 == 0x04A21B7C: one physical card, decimal and hex
+        response = self.post_batch([
+            {'team_id': self.alpha.id, 'name': 'Decimal', 'rfid_uid': '77732732'},
+            {'team_id': self.beta.id, 'name': 'Hex', 'rfid_uid': '04:A2:1B:7C'},
+        ], mode='partial')
+        self.assertEqual([result['status'] for result in response.json()['results']], ['created', 'error'])
+        self.assertIn('more than once', response.json()['results'][1]['error'])
+
+        response = self.post_batch([{'team_id': self.beta.id, 'name': 'Hex', 'rfid_uid': '04A21B7C'}])
+        self.assertIn('already registered', response.json()['results'][0]['error'])
+        self.assertEqual(Student.objects.count(), 1)
+
+
+class TeamUpsertTests(TestCase):
+    """Bulk team upsert uses a fixed number of queries regardless of size."""
+
+    def post_teams(self, teams):
+        return self.client.post('/api/teams/bulk', {'teams': teams}, content_type='application/json')
+
+    def test_creates_many_teams_in_constant_queries(self):
+        teams = [
+            {'team_name': f'Team {t}', 'students': [
+                {'name': f'Student {t}-{i}', 'rfid_uid': f'R{t}-{i}'} for i in range(MAX_STUDENTS_PER_TEAM)
+            ]}
+            for t in range(20)
+        ]
+        # 2 existence checks, savepoint, team insert, student insert, alias
+        # insert, recount, limit check, release, final read + prefetch
+        with self.assertNumQueries(11):
+            response = self.post_teams(teams)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 20)
+        self.assertEqual(Student.objects.count(), 20 * MAX_STUDENTS_PER_TEAM)
+        self.assertFalse(Team.objects.filter(is_complete=False).exists())
+
+    def test_updates_existing_team_members(self):
+        team = RegistrationService.create_team('Team Alpha')
+        RegistrationService.register_student(team.id, 'Old Name', 'RFID001')
+
+        response = self.post_teams([{'team_name': 'Team Alpha', 'students': [
+            {'name': 'New Name', 'rfid_uid': 'RFID001'},
+            {'name': 'Second', 'rfid_uid': 'RFID002'},
+        ]}])
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()['teams'][0]
+        self.assertFalse(body['created'])
+        self.assertEqual(body['student_count'], 2)
+        self.assertEqual(Student.objects.get(rfid_uid='RFID001').name, 'New Name')
+        self.assertEqual(Team.objects.get(id=team.id).student_count, 2)
+
+    def test_rejects_rfid_of_other_team_without_writing(self):
+        team = RegistrationService.create_team('Team Alpha')
+        RegistrationService.register_student(team.id, 'John Doe', 'RFID001')
+
+        response = self.post_teams([{'team_name': 'Team Beta', 'students': [
+            {'name': 'Thief', 'rfid_uid': 'RFID001'},
+        ]}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('another team', response.json()['errors'][0])
+        self.assertFalse(Team.objects.filter(team_name='Team Beta').exists())
+
+    def test_same_card_in_two_formats(self):
+        response = self.post_teams([{'team_name': 'Team Alpha', 'students': [
+            {'name': 'Decimal', 'rfid_uid': '77732732'},
+            {'name': 'Hex', 'rfid_uid': '04:A2:1B:7C'},
+        ]}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('more than once', response.json()['errors'][0])
+
+        # An existing card is matched in another format and renamed
+        self.post_teams([{'team_name': 'Team Alpha', 'students': [{'name': 'Decimal', 'rfid_uid': '77732732'}]}])
+        response = self.post_teams([{'team_name': 'Team Alpha', 'students': [{'name': 'Hex', 'rfid_uid': '04A21B7C'}]}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Student.objects.values_list('name', flat=True)), ['Hex'])
+
+
+class ArchiveTests(TransactionTestCase):
+    """Archive, purge and restore round-trip the logs without holding locks."""
+
+    def setUp(self):
+        import tempfile
+        from .caching import app_cache
+
+        # Tap lookups cached by other tests point at flushed students
+        app_cache.backend.clear()
+        self.addCleanup(app_cache.backend.clear)
+        team = RegistrationService.create_team('Team Alpha')
+        RegistrationService.register_student(team.id, 'John Doe', 'RFID001')
+        RegistrationService.register_student(team.id, 'Jane Doe', 'RFID002')
+        for uid in ('RFID001', 'RFID001', 'RFID001', 'RFID002'):
+            AttendanceService.process_rfid_tap(uid, reader_id='gate-1')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/logs.jsonl.gz'
+
+    def snapshot(self):
+        from .archive import ARCHIVE_FIELDS
+        from .models import AttendanceLog
+
+        return list(AttendanceLog.objects.order_by('pk').values_list(*ARCHIVE_FIELDS))
+
+    def test_export_purge_restore_round_trip(self):
+        from .archive import archive_and_purge, restore_logs
+        from .models import AttendanceLog, AttendanceSession
+
+        before = self.snapshot()
+        self.assertEqual(archive_and_purge(AttendanceLog.objects.all(), self.path, chunk_size=3), (4, 4))
+        self.assertFalse(AttendanceLog.objects.exists())
+        # The closed session stays; open ones lost their IN log
+        self.assertEqual(AttendanceSession.objects.count(), 1)
+        self.assertFalse(AttendanceSession.objects.filter(check_out_time__isnull=True).exists())
+
+        # Per chunk: id and student checks, then BEGIN, one bulk insert,
+        # the created_at fix-up and COMMIT
+        with self.assertNumQueries(12):
+            self.assertEqual(restore_logs(self.path, chunk_size=3), (4, 0))
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(restore_logs(self.path), (0, 4))
+
+    def test_taps_write_between_export_pages(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+        from django.db import connection
+        from . import archive
+        from .models import AttendanceLog
+
+        taps = []
+        serialize = archive._serialize_value
+
+        def tap():
+            try:
+                return AttendanceService.process_rfid_tap('RFID002')['status']
+            finally:
+                connection.close()
+
+        def serialize_and_tap(value):
+            # Mid-export, while the first page is being written
+            if not taps:
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    taps.append(executor.submit(tap).result(timeout=10))
+            return serialize(value)
+
+        with mock.patch.object(archive, '_serialize_value', serialize_and_tap):
+            self.assertEqual(archive.export_logs(AttendanceLog.objects.all(), self.path, chunk_size=2), 5)
+        self.assertEqual(taps, ['OUT'])
+
+
+class RetentionTests(TestCase):
+    """Old logs move to cold storage and roll up into daily summaries."""
+
+    def setUp(self):
+        team = RegistrationService.create_team('Team Alpha')
+        self.first = RegistrationService.register_student(team.id, 'Student 1', 'RFID001')
+        self.second = RegistrationService.register_student(team.id, 'Student 2', 'RFID002')
+        self.day = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=40)
+
+    def log(self, student, status, at):
+        from .models import AttendanceLog
+
+        times = {'check_in_time': at} if status == 'IN' else {'check_out_time': at}
+        log = AttendanceLog.objects.create(student=student, team_id=student.team_id, status=status, **times)
+        AttendanceLog.objects.filter(pk=log.pk).update(created_at=at)
+
+    def test_apply_retention(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .archive import apply_retention
+        from .models import AttendanceLog, ArchivedAttendanceLog, DailyAttendanceSummary
+
+        hours = [self.day + timedelta(hours=hour) for hour in (9, 12, 13, 17)]
+        for status, at in zip(('IN', 'OUT', 'IN', 'OUT'), hours):
+            self.log(self.first, status, at)
+        self.log(self.second, 'IN', self.day + timedelta(hours=10))
+        self.log(self.first, 'IN', timezone.now())
+
+        # Chunks of two split the first student's day across several transactions
+        moved, cutoff = apply_retention(days=30, chunk_size=2)
+        self.assertEqual(moved, 4)
+        # The second student is still IN, so that log stays online
+        self.assertEqual(AttendanceLog.objects.filter(student=self.second).count(), 1)
+        self.assertEqual(ArchivedAttendanceLog.objects.count(), 4)
+
+        summaries = {summary.student_id: summary for summary in DailyAttendanceSummary.objects.all()}
+        self.assertEqual(list(summaries), [self.first.id])
+        first = summaries[self.first.id]
+        self.assertEqual(first.date, self.day.date())
+        self.assertEqual((first.in_count, first.out_count), (2, 2))
+        self.assertEqual((first.first_in, first.last_out), (hours[0], hours[3]))
+
+        # Nothing left to move, and the summaries are not counted twice
+        out = StringIO()
+        call_command('apply_retention', days=30, stdout=out)
+        self.assertIn('Moved 0 attendance log(s)', out.getvalue())
+        self.assertEqual(DailyAttendanceSummary.objects.get(student=self.first).in_count, 2)
+
+    def test_open_check_ins_stay_online(self):
+        from .archive import apply_retention
+        from .models import AttendanceLog, ArchivedAttendanceLog
+
+        self.log(self.first, 'IN', self.day + timedelta(hours=9))
+        self.log(self.second, 'IN', self.day + timedelta(hours=9))
+        self.log(self.second, 'OUT', self.day + timedelta(hours=17))
+        AttendanceService.process_rfid_tap('RFID001')  # OUT
+        AttendanceService.process_rfid_tap('RFID001')  # IN again, still inside
+
+        self.assertEqual(apply_retention(days=0)[0], 4)
+        self.assertEqual(list(AttendanceLog.objects.values_list('student_id', 'status')), [(self.first.id, 'IN')])
+        self.assertEqual(ArchivedAttendanceLog.objects.count(), 4)
+        self.assertEqual(AttendanceService.get_live_count()['in_count'], 1)
+        self.assertEqual(AttendanceService.process_rfid_tap('RFID002')['status'], 'IN')
+        self.assertEqual(AttendanceService.check_out_all(), 2)
+
+        # Once the student is OUT, the next run lets the old IN go too
+        self.assertEqual(apply_retention(days=0)[0], 4)
+        self.assertFalse(AttendanceLog.objects.exists())
+        self.assertEqual(AttendanceService.process_rfid_tap('RFID001')['status'], 'IN')
+
+    def test_history_reads_the_archive_only_when_asked_for(self):
+        from .archive import apply_retention
+
+        self.log(self.first, 'IN', self.day + timedelta(hours=9))
+        self.log(self.first, 'OUT', self.day + timedelta(hours=17))
+        self.log(self.first, 'IN', timezone.now())
+        apply_retention(days=30)
+
+        url = f'/api/attendance/student/{self.first.id}'
+        self.assertEqual(json.loads(b''.join(self.client.get(url).streaming_content))['total_logs'], 3)
+        response = self.client.get(url, {'from': timezone.localdate().isoformat()})
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['total_logs'], 1)
+        response = self.client.get(url, {'from': self.day.date().isoformat(), 'to': self.day.date().isoformat()})
+        logs = json.loads(b''.join(response.streaming_content))['attendance_logs']
+        self.assertEqual([log['status'] for log in logs], ['OUT', 'IN'])
+
+
+class SessionTests(TestCase):
+    """IN/OUT taps pair into sessions that time-on-site sums."""
+
+    def setUp(self):
+        team = RegistrationService.create_team('Team Alpha')
+        self.first = RegistrationService.register_student(team.id, 'Student 1', 'RFID001')
+        self.second = RegistrationService.register_student(team.id, 'Student 2', 'RFID002')
+
+    def log(self, student, status, at):
+        from .models import AttendanceLog
+
+        times = {'check_in_time': at} if status == 'IN' else {'check_out_time': at}
+        log = AttendanceLog.objects.create(student=student, team_id=student.team_id, status=status, **times)
+        AttendanceLog.objects.filter(pk=log.pk).update(created_at=at)
+
+    def sessions(self):
+        from .models import AttendanceSession
+
+        return list(AttendanceSession.objects.order_by('student_id', 'check_in_time').values_list(
+            'student_id', 'check_in_time', 'check_out_time', 'duration'
+        ))
+
+    def test_taps_open_and_close_sessions(self):
+        from .models import AttendanceLog
+
+        for _ in range(3):
+            AttendanceService.process_rfid_tap('RFID001')
+        check_in, check_out, again = AttendanceLog.objects.order_by('id')
+        self.assertEqual(self.sessions(), [
+            (self.first.id, check_in.check_in_time, check_out.check_out_time,
+             check_out.check_out_time - check_in.check_in_time),
+            (self.first.id, again.check_in_time, None, None),
+        ])
+
+    def test_backfill_pairs_online_and_archived_logs(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .archive import apply_retention
+        from .models import AttendanceSession
+        from .utils import SessionService
+
+        now = timezone.now().replace(microsecond=0)
+        old = now - timedelta(days=40)
+        self.log(self.first, 'IN', old)
+        self.log(self.first, 'OUT', old + timedelta(hours=3))
+        self.log(self.first, 'IN', now - timedelta(hours=3))
+        self.log(self.first, 'IN', now - timedelta(hours=2))  # never checked out
+        self.log(self.first, 'OUT', now - timedelta(hours=1))
+        self.log(self.second, 'OUT', now)  # no IN to pair with
+        apply_retention(days=30)
+        AttendanceSession.objects.all().delete()
+
+        expected = [
+            (self.first.id, old, old + timedelta(hours=3), timedelta(hours=3)),
+            (self.first.id, now - timedelta(hours=3), None, None),
+            (self.first.id, now - timedelta(hours=2), now - timedelta(hours=1), timedelta(hours=1)),
+        ]
+        # Batches of one flush mid-history without splitting a pair
+        self.assertEqual(SessionService.backfill_sessions(batch_size=1), 3)
+        self.assertEqual(self.sessions(), expected)
+
+        out = StringIO()
+        call_command('backfill_sessions', stdout=out)
+        self.assertIn('Rebuilt 3 attendance session(s)', out.getvalue())
+        self.assertEqual(self.sessions(), expected)
+
+    def test_time_on_site(self):
+        from .utils import SessionService
+
+        now = timezone.now().replace(microsecond=0)
+        for student, hours in ((self.first, (5, 4, 2, 1)), (self.second, (3, 2))):
+            for index, hour in enumerate(hours):
+                self.log(student, 'OUT' if index % 2 else 'IN', now - timedelta(hours=hour))
+        AttendanceService.process_rfid_tap('RFID002')  # open sessions are not counted
+        SessionService.backfill_sessions()
+
+        response = self.client.get('/api/attendance/time-on-site')
+        self.assertEqual(response.status_code, 200)
+        rows = [(row['student_id'], row['sessions'], row['total_seconds']) for row in response.json()['students']]
+        self.assertEqual(rows, [(self.first.id, 2, 2 * 3600), (self.second.id, 1, 3600)])
+
+        response = self.client.get('/api/attendance/time-on-site', {
+            'student_id': self.first.id, 'from': (now - timedelta(hours=3)).isoformat(),
+        })
+        rows = [(row['student_id'], row['sessions'], row['total_seconds']) for row in response.json()['students']]
+        self.assertEqual(rows, [(self.first.id, 1, 3600)])
+
+
+class HistogramTests(TestCase):
+    """Taps are counted into zero-filled, half-open time buckets."""
+
+    def setUp(self):
+        self.team = RegistrationService.create_team('Team Alpha')
+        self.other = RegistrationService.create_team('Team Beta')
+        self.student = RegistrationService.register_student(self.team.id, 'Student 1', 'RFID001')
+        self.outsider = RegistrationService.register_student(self.other.id, 'Student 2', 'RFID002')
+
+    def at(self, hour, minute, second=0):
+        from datetime import datetime
+
+        return timezone.make_aware(datetime(2026, 1, 5, hour, minute, second))
+
+    def log(self, student, status, at):
+        from .models import AttendanceLog
+
+        log = AttendanceLog.objects.create(student=student, team_id=student.team_id, status=status)
+        AttendanceLog.objects.filter(pk=log.pk).update(created_at=at)
+
+    def test_bucket_edges(self):
+        from .analytics import HistogramService
+
+        self.log(self.student, 'IN', self.at(9, 5))  # before the range
+        self.log(self.student, 'IN', self.at(9, 7))
+        self.log(self.student, 'OUT', self.at(9, 14, 59))
+        self.log(self.student, 'IN', self.at(9, 15))
+        self.log(self.outsider, 'IN', self.at(9, 15))
+        self.log(self.student, 'OUT', self.at(9, 59, 59))
+        self.log(self.student, 'IN', self.at(10, 0))  # end is exclusive
+
+        buckets = HistogramService.get_histogram(self.at(9, 7), self.at(10, 0), '15m', team_id=self.team.id)
+        # The first bucket is the one holding the start, and empty ones are kept
+        self.assertEqual(buckets, [
+            {'start': '2026-01-05T09:00:00+05:30', 'in': 1, 'out': 1},
+            {'start': '2026-01-05T09:15:00+05:30', 'in': 1, 'out': 0},
+            {'start': '2026-01-05T09:30:00+05:30', 'in': 0, 'out': 0},
+            {'start': '2026-01-05T09:45:00+05:30', 'in': 0, 'out': 1},
+        ])
+
+        hourly = HistogramService.get_histogram(self.at(9, 0), self.at(11, 0))
+        self.assertEqual([(bucket['in'], bucket['out']) for bucket in hourly], [(4, 2), (1, 0)])
+
+    def test_reads_across_the_retention_horizon(self):
+        from .analytics import HistogramService
+        from .archive import apply_retention
+        from .models import ArchivedAttendanceLog
+
+        now = timezone.now()
+        archived = now - timedelta(days=30, hours=2)
+        self.log(self.student, 'IN', archived)
+        self.log(self.student, 'OUT', archived + timedelta(minutes=30))
+        self.log(self.student, 'IN', now - timedelta(hours=1))
+        apply_retention(days=30)
+        self.assertEqual(ArchivedAttendanceLog.objects.count(), 2)
+
+        buckets = HistogramService.get_histogram(now - timedelta(days=30, hours=3), now, '1h')
+        self.assertEqual(
+            (sum(bucket['in'] for bucket in buckets), sum(bucket['out'] for bucket in buckets)), (2, 1)
+        )
+        # Ranges after the horizon skip the archive
+        buckets = HistogramService.get_histogram(now - timedelta(days=1), now, '1h')
+        self.assertEqual(sum(bucket['in'] + bucket['out'] for bucket in buckets), 1)
+
+    def test_invalid_requests(self):
+        from .analytics import HistogramService
+
+        for interval, start, end in (
+            ('7m', self.at(9, 0), self.at(10, 0)),
+            ('1h', self.at(10, 0), self.at(10, 0)),
+            ('1h', self.at(9, 0), self.at(9, 0) + timedelta(days=32)),
+        ):
+            with self.assertRaises(ValidationError):
+                HistogramService.get_histogram(start, end, interval)
+
+    def test_api(self):
+        self.log(self.student, 'IN', self.at(9, 30))
+        self.log(self.outsider, 'OUT', self.at(23, 59, 59))
+
+        response = self.client.get('/api/attendance/histogram', {
+            'from': '2026-01-05', 'to': '2026-01-05', 'interval': '30m',
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['buckets']), 48)
+        self.assertEqual((data['total_in'], data['total_out']), (1, 1))
+        self.assertEqual(data['buckets'][19], {'start': '2026-01-05T09:30:00+05:30', 'in': 1, 'out': 0})
+
+        response = self.client.get('/api/attendance/histogram', {'interval': '2h'})
+        self.assertEqual(response.status_code, 400)
+
+
+class StudentCountTests(TestCase):
+    """Team.student_count follows registrations, deletions and moves."""
+
+    def setUp(self):
+        self.alpha = RegistrationService.create_team('Team Alpha')
+        self.beta = RegistrationService.create_team('Team Beta')
+
+    def counts(self):
+        return {
+            team.id: (team.student_count, team.is_complete)
+            for team in Team.objects.filter(id__in=(self.alpha.id, self.beta.id))
+        }
+
+    def test_delete_gives_the_slot_back(self):
+        students = [
+            RegistrationService.register_student(self.alpha.id, f'Student {number}', f'RFIDA{number}')
+            for number in range(MAX_STUDENTS_PER_TEAM)
+        ]
+        self.assertEqual(self.counts()[self.alpha.id], (MAX_STUDENTS_PER_TEAM, True))
+
+        students[0].delete()
+        self.assertEqual(self.counts()[self.alpha.id], (MAX_STUDENTS_PER_TEAM - 1, False))
+        Student.objects.filter(id__in=[student.id for student in students[1:3]]).delete()
+        self.assertEqual(self.counts()[self.alpha.id], (MAX_STUDENTS_PER_TEAM - 3, False))
+
+    def test_move_takes_the_slot_along(self):
+        mover = RegistrationService.register_student(self.alpha.id, 'Mover', 'RFIDA0')
+        RegistrationService.register_student(self.alpha.id, 'Stayer', 'RFIDA1')
+
+        mover = Student.objects.get(id=mover.id)
+        mover.team = self.beta
+        mover.save()
+        self.assertEqual(self.counts(), {self.alpha.id: (1, False), self.beta.id: (1, False)})
+
+        # Saving again without a move leaves the counts alone
+        mover.name = 'Mover Renamed'
+        mover.save()
+        self.assertEqual(self.counts(), {self.alpha.id: (1, False), self.beta.id: (1, False)})
+
+    def test_move_into_a_full_team_is_rejected(self):
+        for number in range(MAX_STUDENTS_PER_TEAM):
+            RegistrationService.register_student(self.beta.id, f'Student {number}', f'RFIDB{number}')
+        mover = Student.objects.get(id=RegistrationService.register_student(self.alpha.id, 'Mover', 'RFIDA0').id)
+
+        mover.team = Team.objects.get(id=self.beta.id)
+        with self.assertRaises(ValidationError):
+            mover.save(full_clean=False)
+        self.assertEqual(self.counts(), {self.alpha.id: (1, False), self.beta.id: (MAX_STUDENTS_PER_TEAM, True)})
+        self.assertEqual(Student.objects.get(id=mover.id).team_id, self.alpha.id)
+
+    def test_saving_a_stale_team_keeps_the_count(self):
+        stale = Team.objects.get(id=self.alpha.id)
+        for number in range(MAX_STUDENTS_PER_TEAM):
+            RegistrationService.register_student(self.alpha.id, f'Student {number}', f'RFIDA{number}')
+
+        stale.team_name = 'Team Alpha Renamed'
+        stale.save()
+        stale.save(update_fields=['team_name', 'student_count'])
+        team = Team.objects.get(id=self.alpha.id)
+        self.assertEqual(team.team_name, 'Team Alpha Renamed')
+        self.assertEqual((team.student_count, team.is_complete), (MAX_STUDENTS_PER_TEAM, True))
+
+        # The admin change form shows the counters without posting them back
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.post(f'/admin/tracker/team/{self.alpha.id}/change/', {
+            'team_name': 'Team Alpha', 'student_count': 0, 'is_complete': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        team = Team.objects.get(id=self.alpha.id)
+        self.assertEqual((team.team_name, team.student_count, team.is_complete), ('Team Alpha', MAX_STUDENTS_PER_TEAM, True))
+
+    def test_reserve_slot_checks_the_stored_count(self):
+        stale = Team.objects.get(id=self.alpha.id)
+        for number in range(MAX_STUDENTS_PER_TEAM - 1):
+            RegistrationService.register_student(self.alpha.id, f'Student {number}', f'RFIDA{number}')
+
+        # The stale instance still says 0, but the UPDATE sees 5 and takes the last slot
+        self.assertEqual(stale.student_count, 0)
+        stale.reserve_slot()
+        self.assertEqual(self.counts()[self.alpha.id], (MAX_STUDENTS_PER_TEAM, True))
+
+        stale = Team.objects.get(id=self.alpha.id)
+        stale.student_count = 0
+        with self.assertRaises(ValidationError):
+            stale.reserve_slot()
+        with self.assertRaises(ValidationError):
+            Team.objects.get(id=self.beta.id).reserve_slot(MAX_STUDENTS_PER_TEAM + 1)
+        self.assertEqual(self.counts(), {self.alpha.id: (MAX_STUDENTS_PER_TEAM, True), self.beta.id: (0, False)})
+
+
+class RequestMetricsTests(TestCase):
+    """The metrics middleware times each request and exports it per view."""
+
+    def setUp(self):
+        from .metrics import request_metrics
+
+        request_metrics.reset()
+        self.addCleanup(request_metrics.reset)
+        RegistrationService.create_team('Team Alpha')
+
+    def test_server_timing_and_metrics(self):
+        import re
+        from django.db import connection
+        from django.test import override_settings
+        from django.test.utils import CaptureQueriesContext
+
+        with override_settings(ATTENDANCE_METRICS_ENABLED=True):
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get('/api/teams/list')
+            # Read now: the next request clears the connection's query log
+            queries = len(captured)
+            again = self.client.get('/api/teams/list')
+            self.client.get('/api/teams/999999')
+            metrics = self.client.get('/api/metrics').content.decode()
+
+        timing = re.fullmatch(r'app;dur=([\d.]+), db;dur=([\d.]+);desc="(\d+) queries"', response['Server-Timing'])
+        self.assertIsNotNone(timing, response['Server-Timing'])
+        self.assertLessEqual(float(timing[2]), float(timing[1]))
+        self.assertEqual(int(timing[3]), queries)
+
+        self.assertIn('attendance_http_responses_total{view="list_teams",status="200"} 2', metrics)
+        self.assertIn('attendance_http_responses_total{view="get_team_detail",status="404"} 1', metrics)
+        self.assertIn('attendance_http_request_duration_seconds_count{view="list_teams"} 2', metrics)
+        self.assertIn('attendance_http_request_db_queries_bucket{view="list_teams",le="+Inf"} 2', metrics)
+        # The histogram sums the queries each listing reported
+        self.assertIn('attendance_http_request_db_queries_count{view="list_teams"} 2', metrics)
+        total = int(re.search(r'db_queries_sum\{view="list_teams"\} (\d+)\.0+\n', metrics)[1])
+        self.assertEqual(total, queries + int(re.search(r'(\d+) queries', again['Server-Timing'])[1]))
+
+    def test_disabled_by_default(self):
+        from django.test import override_settings
+
+        with override_settings(ATTENDANCE_METRICS_ENABLED=False):
+            response = self.client.get('/api/teams/list')
+            metrics = self.client.get('/api/metrics').content.decode()
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('view="list_teams"', metrics)
+
+    def test_histogram_buckets(self):
+        from .metrics import Histogram
+
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 1.5, 5, 7):
+            histogram.observe(value)
+        # Bounds are inclusive (le) and counts are cumulative
+        self.assertEqual(histogram.render('x', {'view': 'a"b'}), [
+            'x_bucket{view="a\\"b",le="1"} 2',
+            'x_bucket{view="a\\"b",le="5"} 4',
+            'x_bucket{view="a\\"b",le="+Inf"} 5',
+            'x_sum{view="a\\"b"} 14.500000',
+            'x_count{view="a\\"b"} 5',
+        ])
+
+
+class TapTracingTests(TestCase):
+    """Tap phases are timed when tracing is on and switched via a token."""
+
+    def setUp(self):
+        from .tracing import tap_tracer
+
+        enabled = tap_tracer.enabled
+        self.addCleanup(setattr, tap_tracer, 'enabled', enabled)
+        self.addCleanup(tap_tracer.reset)
+        tap_tracer.reset()
+        team = RegistrationService.create_team('Team Alpha')
+        RegistrationService.register_student(team.id, 'Student 1', 'RFID001')
+
+    def post(self, payload, **headers):
+        return self.client.post('/api/debug/tap-phases', payload, content_type='application/json', **headers)
+
+    def test_phases(self):
+        from .tracing import tap_tracer
+
+        tap_tracer.enabled = False
+        AttendanceService.process_rfid_tap('RFID001')
+        self.assertEqual(tap_tracer.summary(), {})
+
+        tap_tracer.enabled = True
+        for _ in range(3):
+            AttendanceService.process_rfid_tap('RFID001')
+        summary = tap_tracer.summary()
+        self.assertEqual(
+            list(summary),
+            ['normalize', 'student_lookup', 'last_log_lookup', 'insert', 'session_commit', 'total'],
+        )
+        total = summary['total']
+        self.assertEqual((total['count'], total['window']), (3, 3))
+        self.assertTrue(total['p50_us'] <= total['p95_us'] <= total['p99_us'] <= total['max_us'])
+        self.assertGreaterEqual(total['max_us'], max(stats['max_us'] for stats in summary.values()))
+
+        metrics = self.client.get('/api/metrics').content.decode()
+        self.assertIn('attendance_rfid_tap_phase_seconds_count{phase="insert"} 3', metrics)
+
+    def test_switching_needs_debug_or_the_token(self):
+        from django.contrib.auth.models import User
+        from django.test import override_settings
+        from .tracing import tap_tracer
+
+        tap_tracer.enabled = False
+        with override_settings(DEBUG=False, ATTENDANCE_DEBUG_TOKEN='s3cret'):
+            self.assertEqual(self.post({'enabled': True}).status_code, 403)
+            self.assertEqual(self.post({'enabled': True}, HTTP_X_DEBUG_TOKEN='wrong').status_code, 403)
+            # A staff session is not enough: cookies would need CSRF protection
+            self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+            self.assertEqual(self.post({'enabled': True}).status_code, 403)
+            self.assertFalse(tap_tracer.enabled)
+
+            response = self.post({'enabled': True}, HTTP_X_DEBUG_TOKEN='s3cret')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()['enabled'])
+            AttendanceService.process_rfid_tap('RFID001')
+            response = self.post({'reset': True}, HTTP_X_DEBUG_TOKEN='s3cret')
+            self.assertEqual(response.json()['phases'], {})
+
+        with override_settings(DEBUG=False, ATTENDANCE_DEBUG_TOKEN=''):
+            self.assertEqual(self.post({'enabled': False}, HTTP_X_DEBUG_TOKEN='').status_code, 403)
+        with override_settings(DEBUG=True, ATTENDANCE_DEBUG_TOKEN=''):
+            self.assertFalse(self.post({'enabled': False}).json()['enabled'])
+        self.assertEqual(self.client.get('/api/debug/tap-phases').status_code, 200)
+
+    def test_tap_top_sends_the_token(self):
+        from io import StringIO
+        from unittest import mock
+        from django.core.management import call_command
+
+        sent = []
+
+        def urlopen(request, timeout):
+            sent.append(request)
+            response = mock.MagicMock()
+            response.__enter__.return_value.read.return_value = json.dumps({
+                'enabled': True, 'window': 2048, 'phases': {}, 'timestamp': timezone.now().isoformat(),
+            }).encode()
+            return response
+
+        with mock.patch('urllib.request.urlopen', urlopen):
+            call_command('tap_top', enable=True, once=True, token='s3cret', stdout=StringIO())
+        enable, poll = sent
+        self.assertEqual(json.loads(enable.data), {'enabled': True})
+        self.assertEqual(enable.get_header('X-debug-token'), 's3cret')
+        self.assertIsNone(poll.get_header('X-debug-token'))
+
+
+class BenchmarkDataTests(TestCase):
+    """Synthetic benchmark data matches what real registration and taps produce."""
+
+    def test_roster_and_history(self):
+        from .benchmark import generate_roster, generate_log_history
+        from .models import AttendanceLog
+
+        teams = generate_roster(3)
+        self.assertEqual(Student.objects.count(), 3 * MAX_STUDENTS_PER_TEAM)
+        self.assertTrue(all(team.is_complete for team in Team.objects.all()))
+        self.assertEqual(teams[0].get_student_count(), MAX_STUDENTS_PER_TEAM)
+
+        self.assertEqual(generate_log_history(200, days=2), 200)
+        for student in Student.objects.all():
+            statuses = list(
+                AttendanceLog.objects.filter(student=student).order_by('created_at').values_list('status', flat=True)
+            )
+            self.assertEqual(statuses, ['IN', 'OUT'] * (len(statuses) // 2) + ['IN'] * (len(statuses) % 2))
+        first, last = AttendanceLog.objects.order_by('created_at')[::199]
+        self.assertGreater(last.created_at - first.created_at, timedelta(days=1))
+
+
+class TapReplayTests(TestCase):
+    """Tap files parse in either format and replays flag diverging toggles."""
+
+    def test_reads_exported_and_reader_formats(self):
+        import tempfile
+        from .replay import read_taps
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('timestamp,rfid_uid,status\n'
+                    '2026-10-19T09:00:05+05:30,RFID002,IN\n'
+                    '# reader restarted\n'
+                    '1792384200 RFID001\n')
+        taps = read_taps(f.name)
+
+        self.assertEqual([tap.rfid_uid for tap in taps], ['RFID002', 'RFID001'])
+        self.assertEqual([tap.status for tap in taps], ['IN', None])
+
+    def test_replay_reports_divergence_and_errors(self):
+        from .replay import Tap, replay
+
+        now = timezone.now()
+        taps = [
+            Tap(now, 'A', 'IN'),
+            Tap(now + timedelta(seconds=1), 'A', 'OUT'),
+            Tap(now + timedelta(seconds=2), 'B', 'IN'),
+            Tap(now + timedelta(seconds=3), 'C', None),
+        ]
+        replies = {'A': iter(['IN', 'IN']), 'B': iter(['IN'])}
+
+        def target(rfid_uid, reader_id):
+            if rfid_uid not in replies:
+                raise ValidationError('not registered')
+            return next(replies[rfid_uid])
+
+        report = replay(taps, target, speed=0, concurrency=2)
+
+        self.assertEqual(report['taps'], 4)
+        self.assertEqual(report['compared'], 3)
+        self.assertEqual(report['errors'], 1)
+        self.assertEqual(report['divergences'], 1)
+        self.assertEqual(report['divergence_samples'][0]['index'], 1)
+
+
+class RFIDAliasTests(TestCase):
+    """A card registered in one reader format resolves from every other one."""
+
+    def setUp(self):
+        self.team = RegistrationService.create_team('Team Alpha')
+
+    def test_encodings_of_one_card(self):
+        from .rfid import canonical_uid, uid_aliases
+
+        # 0x04A21B7C == 77732732; byte-reversed 0x7C1BA204 == 2082185732
+        self.assertEqual(canonical_uid('77732732'), '04A21B7C')
+        self.assertEqual(canonical_uid('04:a2:1b:7c'), '04A21B7C')
+        self.assertEqual(uid_aliases('04A21B7C'), ['04A21B7C', '7C1BA204'])
+        self.assertEqual(uid_aliases('77732732'), ['04A21B7C', '7C1BA204'])
+        self.assertEqual(uid_aliases('RFID001'), ['RFID001'])
+
+    def test_decimal_cards_do_not_alias_each_other(self):
+        from django.test import override_settings
+        from .rfid import uid_aliases
+
+        # Read as hex too, 3039 would be 12345: two different decimal cards
+        self.assertTrue(set(uid_aliases('3039')).isdisjoint(uid_aliases('12345')))
+        RegistrationService.register_student(self.team.id, 'John Doe', '12345')
+        RegistrationService.register_student(self.team.id, 'Jane Doe', '3039')
+
+        self.assertEqual(Student.objects.count(), 2)
+
+    def test_errors_name_the_uid_as_sent(self):
+        with self.assertRaisesMessage(ValidationError, "RFID '99999' is not registered"):
+            AttendanceService.process_rfid_tap('99999')
+        response = self.client.post(
+            '/api/attendance/tap', {'rfid_uid': '04:a2:1b:7c'}, content_type='application/json'
+        )
+        self.assertIn("RFID '04:a2:1b:7c' is not registered", response.json()['error'])
+        self.assertNotIn('04A21B7C', response.json()['error'])
+
+    def test_hex_digit_readers(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.test import override_settings
+
+        RegistrationService.register_student(self.team.id, 'John Doe', '04123456')
+        self.assertNotEqual(lookup_key('04123456'), lookup_key('04:12:34:56'))
+
+        with override_settings(ATTENDANCE_RFID_DIGITS='hex'):
+            self.assertEqual(lookup_key('04123456'), lookup_key('04:12:34:56'))
+            with self.assertRaisesMessage(ValidationError, 'not registered'):
+                AttendanceService.process_rfid_tap('04:12:34:56')
+            call_command('rebuild_rfid_aliases', stdout=StringIO())
+            self.assertEqual(AttendanceService.process_rfid_tap('04:12:34:56')['student_name'], 'John Doe')
+            self.assertEqual(Student.objects.get().uid_canonical, '04123456')
+
+    def test_tap_resolves_any_reader_format(self):
+        student = RegistrationService.register_student(self.team.id, 'John Doe', '0077732732')
+        self.assertEqual(student.uid_canonical, '04A21B7C')
+
+        for reading in ('77732732', '04A21B7C', '04:a2:1b:7c', '7C1BA204', '2082185732'):
+            with self.assertNumQueries(1):
+                found = Student.objects.select_related('team').get(rfid_aliases__alias=lookup_key(reading))
+            self.assertEqual(found, student)
+
+        statuses = [AttendanceService.process_rfid_tap(reading)['status'] for reading in ('04A21B7C', '7C1BA204')]
+        self.assertEqual(statuses, ['IN', 'OUT'])
+
+    def test_same_card_in_another_format_is_rejected(self):
+        RegistrationService.register_student(self.team.id, 'John Doe', '77732732')
+
+        with self.assertRaisesMessage(ValidationError, 'already registered'):
+            RegistrationService.register_student(self.team.id, 'Jane Doe', '04:A2:1B:7C')
+        self.assertEqual(Student.objects.count(), 1)
+
+
+class GateStatsTests(TestCase):
+    """Taps are attributed to their reader and summarized without queries."""
+
+    def setUp(self):
+        from .gates import gate_stats
+
+        from .ratelimit import tap_limiter
+
+        self.gate_stats = gate_stats
+        gate_stats.reset()
+        self.addCleanup(gate_stats.reset)
+        tap_limiter.reset()
+        team = RegistrationService.create_team('Team Alpha')
+        RegistrationService.register_student(team.id, 'John Doe', 'RFID001')
+
+    def tap(self, **body):
+        return self.client.post('/api/attendance/tap', body, content_type='application/json')
+
+    def test_reader_id_is_stored_and_counted(self):
+        from .models import AttendanceLog
+
+        self.assertEqual(self.tap(rfid_uid='RFID001', reader_id='gate-1').json()['attendance_log']['reader_id'], 'gate-1')
+        self.tap(rfid_uid='RFID001', reader_id='gate-1')
+        self.tap(rfid_uid='UNKNOWN', reader_id='gate-2')
+        self.tap(rfid_uid='RFID001')
+
+        self.assertEqual(AttendanceLog.objects.filter(reader_id='gate-1').count(), 2)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/attendance/gates')
+        gates = response.json()['gates']
+        self.assertEqual(gates['gate-1']['taps_in_window'], 2)
+        self.assertEqual(gates['gate-1']['in_flight'], 0)
+        self.assertEqual(gates['gate-2']['errors'], 1)
+        self.assertEqual(gates['unknown']['total'], 1)
+
+    def test_ring_buffer_keeps_newest(self):
+        from .gates import RingBuffer
+
+        buffer = RingBuffer(3)
+        for value in range(5):
+            buffer.append(value)
+        self.assertEqual(list(buffer), [4, 3, 2])
+
+
+class ReplicaRouterTests(TestCase):
+    """Only tracker reads inside a reporting block go to the replica."""
+
+    def test_routing(self):
+        from django.contrib.auth.models import User
+        from .models import AttendanceLog
+        from .replica import _reading_from_replica, use_replica
+        from .routers import ReplicaRouter
+
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(AttendanceLog))
+
+        token = _reading_from_replica.set(True)
+        try:
+            self.assertEqual(router.db_for_read(AttendanceLog), 'replica')
+            self.assertIsNone(router.db_for_read(User))
+            self.assertEqual(router.db_for_write(AttendanceLog), 'default')
+        finally:
+            _reading_from_replica.reset(token)
+
+        # Without a configured replica, reporting blocks read the primary
+        with use_replica():
+            self.assertIsNone(router.db_for_read(AttendanceLog))
+        self.assertFalse(router.allow_migrate('replica', 'tracker'))
+
+
+class ReplicaSyncTests(TestCase):
+    """Syncing puts the primary in WAL mode, so a replica sync never blocks taps."""
+
+    def test_sync_reads_a_snapshot_of_a_wal_primary(self):
+        import sqlite3
+        import tempfile
+        from pathlib import Path
+        from django.db import connections
+        from .replica import sync_replica
+
+        def journal_mode(path):
+            connection = sqlite3.connect(path)
+            try:
+                return connection.execute('PRAGMA journal_mode').fetchone()[0]
+            finally:
+                connection.close()
+
+        with tempfile.TemporaryDirectory() as directory:
+            source, target = Path(directory, 'primary.sqlite3'), Path(directory, 'replica.sqlite3')
+            # Connecting alone leaves the journal mode alone
+            default = connections['default']
+            primary = type(default)({**default.settings_dict, 'NAME': str(source)}, alias='default')
+            try:
+                with primary.cursor() as cursor:
+                    cursor.execute('CREATE TABLE taps (id INTEGER PRIMARY KEY)')
+                    cursor.execute('INSERT INTO taps VALUES (1)')
+            finally:
+                primary.close()
+            self.assertEqual(journal_mode(source), 'delete')
+
+            sync_replica(source, target)
+            self.assertEqual(journal_mode(source), 'wal')
+
+            # A reader holding a snapshot (as the backup does) does not stop a writer
+            reader = sqlite3.connect(source, isolation_level=None)
+            writer = sqlite3.connect(source, timeout=0)
+            try:
+                reader.execute('BEGIN')
+                reader.execute('SELECT * FROM taps').fetchall()
+                writer.execute('INSERT INTO taps VALUES (2)')
+                writer.commit()
+                reader.execute('COMMIT')
+            finally:
+                reader.close()
+                writer.close()
+
+            sync_replica(source, target)
+            replica = sqlite3.connect(f'{target.as_uri()}?mode=ro', uri=True)
+            try:
+                self.assertEqual(replica.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+                self.assertEqual(replica.execute('SELECT COUNT(*) FROM taps').fetchone()[0], 2)
+            finally:
+                replica.close()
+
+
+class CacheLayerTests(TestCase):
+    """Cached reads skip the database and are dropped when the roster changes."""
+
+    def setUp(self):
+        from .caching import app_cache
+
+        self.cache = app_cache
+        self.team = RegistrationService.create_team('Team Alpha')
+        RegistrationService.register_student(self.team.id, 'John Doe', 'RFID001')
+
+    def test_tap_lookup_hits_cache(self):
+        AttendanceService.process_rfid_tap('RFID001')
+        # Last-log lookup, then savepoint, log insert, session lookup and
+        # update, release; the student lookup is served from the cache
+        with self.assertNumQueries(6):
+            result = AttendanceService.process_rfid_tap('RFID001')
+        self.assertEqual(result['status'], 'OUT')
+        self.assertEqual(result['team_name'], 'Team Alpha')
+
+    def test_team_list_invalidated_by_registration(self):
+        self.client.get('/api/teams/list')
+        # Only the ETag's roster version is read; the payload is cached
+        with self.assertNumQueries(2):
+            self.client.get('/api/teams/list')
+
+        RegistrationService.register_student(self.team.id, 'Jane Doe', 'RFID002')
+        teams = self.client.get('/api/teams/list').json()['teams']
+        self.assertEqual(teams[0]['student_count'], 2)
+
+    def test_deleted_student_is_not_resolved_from_cache(self):
+        AttendanceService.process_rfid_tap('RFID001')
+        Student.objects.filter(rfid_uid='RFID001').delete()
+        with self.assertRaisesMessage(ValidationError, 'not registered'):
+            AttendanceService.process_rfid_tap('RFID001')
+
+    def test_hit_rate_stats(self):
+        self.cache.reset_stats()
+        self.client.get('/api/teams/list')
+        self.client.get('/api/teams/list')
+        self.assertEqual(self.cache.stats()['teams'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+
+class StaticFilesTests(TestCase):
+    """collectstatic output is hashed, precompressed and cached forever."""
+
+    def test_hashed_precompressed_assets(self):
+        import tempfile
+        from django.core.management import call_command
+        from django.templatetags.static import static
+        from django.test import override_settings
+
+        with tempfile.TemporaryDirectory() as root, override_settings(STATIC_ROOT=root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+
+            url = static('tracker/dashboard.css')
+            self.assertRegex(url, r'^/static/tracker/dashboard\.[0-9a-f]{12}\.css$')
+
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertIn('immutable', response['Cache-Control'])
+            response.close()
+
+            response = self.client.get('/static/tracker/dashboard.css')
+            self.assertNotIn('Content-Encoding', response)
+            self.assertIn('must-revalidate', response['Cache-Control'])
+            response.close()
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged query API payloads are answered with 304 from version markers."""
+
+    def setUp(self):
+        self.team = RegistrationService.create_team('Team Alpha')
+        self.student = RegistrationService.register_student(self.team.id, 'John Doe', 'RFID001')
+
+    def test_team_list_not_modified_until_roster_changes(self):
+        etag = self.client.get('/api/teams/list')['ETag']
+        # The team and student version aggregates only
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/teams/list', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        RegistrationService.register_student(self.team.id, 'Jane Doe', 'RFID002')
+        response = self.client.get('/api/teams/list', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_roster_etag_follows_the_database(self):
+        from .caching import TEAMS, app_cache
+
+        url = f'/api/teams/{self.team.id}'
+        etag = self.client.get(url)['ETag']
+        # Another worker's roster change never reaches this process's cache
+        app_cache.invalidate(TEAMS)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A rename by another worker: nothing reaches this process's cache
+        self.client.get('/api/teams/list')
+        Team.objects.filter(pk=self.team.pk).update(team_name='Team Omega', updated_at=timezone.now())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/teams/list').json()['teams'][0]['team_name'], 'Team Omega')
+
+        etag = response['ETag']
+        Student.objects.filter(pk=self.student.pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_history_not_modified_until_next_tap(self):
+        url = f'/api/attendance/team/{self.team.id}'
+        AttendanceService.process_rfid_tap('RFID001')
+        etag = self.client.get(url)['ETag']
+
+        # Only the roster and log version aggregates run
+        with self.assertNumQueries(4):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # A different range is a different representation
+        response = self.client.get(url + '?from=2020-01-01', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        AttendanceService.process_rfid_tap('RFID001')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(b''.join(response.streaming_content))['total_logs'], 2)
+
+    def test_large_json_is_gzipped(self):
+        for _ in range(20):
+            AttendanceService.process_rfid_tap('RFID001')
+        url = f'/api/attendance/student/{self.student.id}'
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+        response = self.client.get('/api/teams/list', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+
+class StreamingJSONTests(TestCase):
+    """History APIs stream the same JSON the list-based views used to build."""
+
+    def test_stream_spans_chunks(self):
+        from .streaming import ELEMENTS_PER_CHUNK, StreamingJSONResponse
+
+        items = [{'n': n, 'at': timezone.now()} for n in range(ELEMENTS_PER_CHUNK * 2 + 3)]
+        response = StreamingJSONResponse({'a': 1}, 'items', iter(items), count_key='total')
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['total'], len(items))
+        self.assertEqual([item['n'] for item in data['items']], list(range(len(items))))
+        self.assertEqual(data['items'][0]['at'], items[0]['at'].isoformat())
+
+        response = StreamingJSONResponse({}, 'items', iter([]))
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), {'items': []})
+
+    def test_team_history_stream(self):
+        team = RegistrationService.create_team('Team Alpha')
+        student = RegistrationService.register_student(team.id, 'John Doe', 'RFID001')
+        AttendanceService.process_rfid_tap('RFID001', reader_id='gate-1')
+        AttendanceService.process_rfid_tap('RFID001')
+
+        response = self.client.get(f'/api/attendance/team/{team.id}')
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual((data['team_id'], data['team_name'], data['total_logs']), (team.id, 'Team Alpha', 2))
+        newest, oldest = data['attendance_logs']
+        self.assertEqual((newest['status'], oldest['status']), ('OUT', 'IN'))
+        self.assertEqual(oldest['student'], {'id': student.id, 'name': 'John Doe', 'rfid_uid': 'RFID001'})
+        self.assertEqual((oldest['reader_id'], newest['reader_id']), ('gate-1', None))
+        self.assertIsNone(oldest['check_out_time'])
+        self.assertIsNotNone(timezone.datetime.fromisoformat(newest['created_at']).tzinfo)
+
+
+class StreamingHistoryLockTests(TransactionTestCase):
+    """A half-read history stream must not block taps from other connections."""
+
+    def setUp(self):
+        from .caching import app_cache
+
+        # Tap lookups cached by other tests point at flushed students
+        app_cache.backend.clear()
+        self.addCleanup(app_cache.backend.clear)
+
+    def test_tap_while_stream_half_read(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from django.db import connection
+
+        team = RegistrationService.create_team('Team Alpha')
+        student = RegistrationService.register_student(team.id, 'John Doe', 'RFID001')
+        for _ in range(5):
+            AttendanceService.process_rfid_tap('RFID001')
+
+        rows = AttendanceService.iter_history(
+            {'student_id': student.id}, ('id', 'status', 'created_at'), page_size=2
+        )
+        first = next(rows)
+
+        def tap():
+            try:
+                return AttendanceService.process_rfid_tap('RFID001')['status']
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(executor.submit(tap).result(timeout=10), 'OUT')
+
+        # The rest of the stream continues from where it stopped
+        ids = [first['id']] + [row['id'] for row in rows]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+
+class AdminChangelistTests(TestCase):
+    """Admin changelists do a fixed number of queries however many rows there are."""
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        self.team = RegistrationService.create_team('Team Alpha')
+        RegistrationService.register_student(self.team.id, 'John Doe', 'RFID001')
+
+    def changelist_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_log_changelist_queries_do_not_grow(self):
+        url = '/admin/tracker/attendancelog/'
+        AttendanceService.process_rfid_tap('RFID001')
+        few = self.changelist_queries(url)
+        for number in range(2, 6):
+            RegistrationService.register_student(self.team.id, f'Student {number}', f'RFID00{number}')
+            AttendanceService.process_rfid_tap(f'RFID00{number}')
+        self.assertEqual(self.changelist_queries(url), few)
+        self.assertEqual(self.changelist_queries(url + '?team_name=alpha'), few)
+
+    def test_team_filter(self):
+        other = RegistrationService.create_team('Team Beta')
+        RegistrationService.register_student(other.id, 'Jane Doe', 'RFID002')
+        response = self.client.get('/admin/tracker/student/?team_name=beta')
+        self.assertContains(response, 'Jane Doe')
+        self.assertNotContains(response, 'John Doe')
+
+    def test_estimated_count_paginator(self):
+        from .admin import EstimatedCountPaginator
+        from .models import AttendanceLog
+
+        for _ in range(5):
+            AttendanceService.process_rfid_tap('RFID001')
+        logs = AttendanceLog.objects.order_by('pk')
+        self.assertEqual(EstimatedCountPaginator(logs, 2).count, 5)
+
+        paginator = EstimatedCountPaginator(logs.filter(status='IN'), 2)
+        paginator.count_limit = 2
+        self.assertEqual(paginator.count, 2)
+
+
+class AutoCheckoutTests(TestCase):
+    """End-of-day checkout closes every open IN with set-based queries."""
+
+    def setUp(self):
+        self.team = RegistrationService.create_team('Team Alpha')
+        for number in range(1, 5):
+            RegistrationService.register_student(self.team.id, f'Student {number}', f'RFID00{number}')
+        for number in (1, 2, 3):
+            AttendanceService.process_rfid_tap(f'RFID00{number}')
+        AttendanceService.process_rfid_tap('RFID003')  # already OUT
+
+    def test_check_out_all(self):
+        from .models import AttendanceLog, AttendanceSession
+        from .utils import AUTO_CHECKOUT_READER
+
+        at = timezone.now()
+        # Select, session update, insert, created_at update (plus savepoints)
+        with self.assertNumQueries(6):
+            self.assertEqual(AttendanceService.check_out_all(at), 2)
+
+        auto = AttendanceLog.objects.filter(reader_id=AUTO_CHECKOUT_READER)
+        self.assertEqual(set(auto.values_list('student__rfid_uid', flat=True)), {'RFID001', 'RFID002'})
+        self.assertTrue(all(log.created_at == log.check_out_time == at for log in auto))
+        self.assertFalse(AttendanceSession.objects.filter(check_out_time__isnull=True).exists())
+        session = AttendanceSession.objects.filter(check_out_time=at).first()
+        self.assertEqual(session.duration, at - session.check_in_time)
+
+        # Next morning's tap checks back IN, and nobody is left to check out
+        self.assertEqual(AttendanceService.process_rfid_tap('RFID001')['status'], 'IN')
+        self.assertEqual(AttendanceService.check_out_all(at), 0)
+
+    def test_later_check_ins_are_kept(self):
+        earlier = timezone.now() - timedelta(hours=1)
+        self.assertEqual(AttendanceService.check_out_all(earlier), 0)
+
+    def test_api_and_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        other = RegistrationService.create_team('Team Beta')
+        RegistrationService.register_student(other.id, 'Jane Doe', 'RFID009')
+        AttendanceService.process_rfid_tap('RFID009')
+
+        response = self.client.post(
+            '/api/attendance/checkout-all', {'team_id': other.id}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['checked_out'], 1)
+
+        response = self.client.post(
+            '/api/attendance/checkout-all', {'at': '2999-01-01T00:00:00'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        out = StringIO()
+        call_command('auto_checkout', stdout=out)
+        self.assertIn('Checked out 2 student(s)', out.getvalue())
+
+    def test_admin_action(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.post('/admin/tracker/team/', {
+            'action': 'check_out_students', '_selected_action': [self.team.id],
+        }, follow=True)
+        self.assertContains(response, 'Checked out 2 student(s).')
+
+
+class ReaderGatewayTests(TransactionTestCase):
+    """Taps sent over the gateway's line protocol are recorded and answered."""
+
+    def test_simulated_readers(self):
+        import asyncio
+        from .gateway import serve, simulate_readers
+        from .models import AttendanceLog
+        from .ratelimit import tap_limiter
+
+        tap_limiter.reset()
+        self.addCleanup(tap_limiter.reset)
+
+        team = RegistrationService.create_team('Team Alpha')
+        uids = [f'RFID00{number}' for number in range(1, 5)]
+        for number, uid in enumerate(uids, 1):
+            RegistrationService.register_student(team.id, f'Student {number}', uid)
+
+        async def scenario():
+            ready = asyncio.get_running_loop().create_future()
+            server = asyncio.create_task(serve(port=0, started=ready.set_result))
+            port = (await ready).sockets[0].getsockname()[1]
+
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'READER gate-1\nRFID001\nUNKNOWN\nrfid001\n')
+            replies = [(await reader.readline()).decode().strip() for _ in range(4)]
+            writer.close()
+            await writer.wait_closed()
+
+            report = await simulate_readers('127.0.0.1', port, uids, readers=5, taps=8)
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+            return replies, report
+
+        replies, report = asyncio.run(scenario())
+        self.assertEqual(replies[:2], ['OK', 'IN Student 1'])
+        self.assertTrue(replies[2].startswith('ERR'))
+        self.assertEqual(replies[3], 'OUT Student 1')
+
+        self.assertEqual((report['taps'], report['errors']), (40, 0))
+        self.assertEqual(AttendanceLog.objects.count(), 42)
+        self.assertEqual(AttendanceLog.objects.filter(reader_id='gate-1').count(), 2)
+
+
+class TapRateLimitTests(TestCase):
+    """Readers over their tap rate get a 429 before any query runs."""
+
+    def setUp(self):
+        from .ratelimit import RateLimiter, tap_limiter
+
+        self.limiter = tap_limiter
+        tap_limiter.reset()
+        self.addCleanup(tap_limiter.reset)
+        team = RegistrationService.create_team('Team Alpha')
+        RegistrationService.register_student(team.id, 'John Doe', 'RFID001')
+        self.RateLimiter = RateLimiter
+
+    def tap(self, **body):
+        return self.client.post('/api/attendance/tap', body, content_type='application/json')
+
+    def test_token_bucket(self):
+        limiter = self.RateLimiter(rate=2, burst=3)
+        self.assertEqual([limiter.take('gate-1') for _ in range(3)], [0, 0, 0])
+        retry_after = limiter.take('gate-1')
+        self.assertGreater(retry_after, 0)
+        self.assertLessEqual(retry_after, 0.5)
+        self.assertEqual(limiter.take('gate-2'), 0)
+
+        # A second later two tokens are back
+        limiter._buckets['gate-1'].updated -= 1
+        self.assertEqual(limiter.take('gate-1'), 0)
+        self.assertEqual(limiter.take('gate-1'), 0)
+        self.assertGreater(limiter.take('gate-1'), 0)
+
+        self.assertEqual(self.RateLimiter(rate=0, burst=0).take('gate-1'), 0)
+
+    def test_flooding_reader_gets_429(self):
+        for _ in range(self.limiter.burst):
+            self.assertEqual(self.tap(rfid_uid='RFID001', reader_id='gate-1').status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.tap(rfid_uid='RFID001', reader_id='gate-1')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # Other gates, and taps without a reader id from the same host, are unaffected
+        self.assertEqual(self.tap(rfid_uid='RFID001', reader_id='gate-2').status_code, 200)
+        self.assertEqual(self.tap(rfid_uid='RFID001').status_code, 200)
+
+        metrics = self.client.get('/api/metrics').content.decode()
+        self.assertIn('attendance_tap_rate_limit_requests_total{result="limited"} 1', metrics)
+        self.assertIn('attendance_tap_rate_limited_total{key="reader:gate-1"} 1', metrics)
+
+    def test_unnamed_readers_are_limited_by_client_ip(self):
+        from django.test import override_settings
+
+        for _ in range(self.limiter.burst):
+            self.assertEqual(self.tap(rfid_uid='RFID001').status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.tap(rfid_uid='RFID001', reader_id='  ').status_code, 429)
+        self.assertEqual(
+            self.client.post(
+                '/api/attendance/tap', {'rfid_uid': 'RFID001'}, content_type='application/json',
+                REMOTE_ADDR='10.0.0.2',
+            ).status_code, 200
+        )
+
+        # Behind a trusted proxy the address it adds last is the client
+        with override_settings(ATTENDANCE_CLIENT_IP_HEADER='X-Forwarded-For'):
+            response = self.client.post(
+                '/api/attendance/tap', {'rfid_uid': 'RFID001'}, content_type='application/json',
+                HTTP_X_FORWARDED_FOR='127.0.0.1, 10.0.0.3',
+            )
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post(
+                '/api/attendance/tap', {'rfid_uid': 'RFID001'}, content_type='application/json',
+                HTTP_X_FORWARDED_FOR='10.0.0.3, 127.0.0.1',
+            )
+            self.assertEqual(response.status_code, 429)
+        metrics = self.client.get('/api/metrics').content.decode()
+        self.assertIn('attendance_tap_rate_limited_total{key="ip:127.0.0.1"} 2', metrics)
+
+
+class IdempotencyKeyTests(TestCase):
+    """Repeats of an Idempotency-Key replay the first response instead of re-running it."""
+
+    def setUp(self):
+        from .idempotency import idempotency_store
+        from .ratelimit import tap_limiter
+
+        self.store = idempotency_store
+        idempotency_store.reset()
+        self.addCleanup(idempotency_store.reset)
+        tap_limiter.reset()
+        team = RegistrationService.create_team('Team Alpha')
+        RegistrationService.register_student(team.id, 'John Doe', 'RFID001')
+
+    def post(self, url, body, key):
+        return self.client.post(url, body, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_tap_does_not_toggle_twice(self):
+        from .models import AttendanceLog
+
+        first = self.post('/api/attendance/tap', {'rfid_uid': 'RFID001'}, 'tap-1')
+        with self.assertNumQueries(0):
+            retry = self.post('/api/attendance/tap', {'rfid_uid': 'RFID001'}, 'tap-1')
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(AttendanceLog.objects.count(), 1)
+
+        # Another worker (empty LRU) replays from the database
+        self.store.reset()
+        retry = self.post('/api/attendance/tap', {'rfid_uid': 'RFID001'}, 'tap-1')
+        self.assertEqual(retry.json()['attendance_log']['status'], 'IN')
+        self.assertEqual(AttendanceLog.objects.count(), 1)
+
+        self.assertEqual(self.post('/api/attendance/tap', {'rfid_uid': 'RFID001'}, 'tap-2').json()['attendance_log']['status'], 'OUT')
+
+    def test_create_team_retry_and_conflicts(self):
+        first = self.post('/api/teams', {'team_name': 'Team Beta'}, 'team-1')
+        self.assertEqual(first.status_code, 201)
+        retry = self.post('/api/teams', {'team_name': 'Team Beta'}, 'team-1')
+        self.assertEqual((retry.status_code, retry.json()['id']), (201, first.json()['id']))
+
+        self.assertEqual(self.post('/api/teams', {'team_name': 'Team Gamma'}, 'team-1').status_code, 422)
+
+    def test_failures_are_not_stored_and_pending_keys_conflict(self):
+        from .models import IdempotencyRecord
+
+        self.assertEqual(self.post('/api/attendance/tap', {'rfid_uid': 'UNKNOWN'}, 'tap-x').status_code, 400)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+        import hashlib
+
+        body = json.dumps({'rfid_uid': 'RFID001'})
+        IdempotencyRecord.objects.create(
+            path='/api/attendance/tap', key='busy', fingerprint=hashlib.sha256(body.encode()).hexdigest()
+        )
+        response = self.post('/api/attendance/tap', body, 'busy')
+        self.assertEqual((response.status_code, response['Retry-After']), (409, '1'))
+
+    def test_throttled_keyed_tap_makes_no_queries(self):
+        from .ratelimit import tap_limiter
+
+        self.addCleanup(tap_limiter.reset)
+        for _ in range(tap_limiter.burst):
+            tap_limiter.take(tap_limiter.key_for('gate-1'))
+        with self.assertNumQueries(0):
+            response = self.post('/api/attendance/tap', {'rfid_uid': 'RFID001', 'reader_id': 'gate-1'}, 'tap-1')
+        self.assertEqual(response.status_code, 429)
+
+    def test_expired_records_are_evicted(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import IdempotencyRecord
+
+        self.post('/api/attendance/tap', {'rfid_uid': 'RFID001'}, 'tap-1')
+        IdempotencyRecord.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.store.reset()
+        # Expired records are ignored even before they are purged
+        response = self.post('/api/attendance/tap', {'rfid_uid': 'RFID001'}, 'tap-1')
+        self.assertEqual(response.json()['attendance_log']['status'], 'OUT')
+
+        IdempotencyRecord.objects.update(created_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1 expired', out.getvalue())
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        self.store.reset()
+        response = self.post('/api/attendance/tap', {'rfid_uid': 'RFID001'}, 'tap-1')
+        self.assertEqual(response.json()['attendance_log']['status'], 'IN')
+
+
+class OccupancyTests(TestCase):
+    """Occupancy curves are built from per-minute tap counts."""
+
+    def setUp(self):
+        from .caching import app_cache
+
+        app_cache.backend.clear()
+        self.alpha = RegistrationService.create_team('Team Alpha')
+        self.beta = RegistrationService.create_team('Team Beta')
+        self.students = [
+            RegistrationService.register_student(self.alpha.id, 'Student 1', 'RFID001'),
+            RegistrationService.register_student(self.alpha.id, 'Student 2', 'RFID002'),
+            RegistrationService.register_student(self.beta.id, 'Student 3', 'RFID003'),
+        ]
+
+    def log(self, student, status, *when):
+        from datetime import datetime
+        from .models import AttendanceLog
+
+        at = timezone.make_aware(datetime(*when))
+        log = AttendanceLog.objects.create(student=student, team_id=student.team_id, status=status)
+        AttendanceLog.objects.filter(pk=log.pk).update(created_at=at)
+
+    def test_curve_and_peaks(self):
+        from datetime import date
+        from .analytics import OccupancyService
+
+        first, second, third = self.students
+        self.log(third, 'IN', 2026, 1, 4, 18, 0)  # still inside from the day before
+        self.log(first, 'IN', 2026, 1, 5, 9, 0)
+        self.log(second, 'IN', 2026, 1, 5, 9, 0, 30)
+        self.log(first, 'OUT', 2026, 1, 5, 10, 0)
+        self.log(third, 'OUT', 2026, 1, 5, 11, 0)
+
+        result = OccupancyService.get_occupancy(date(2026, 1, 5))
+        curve = result['curve']
+        self.assertEqual(len(curve), 24 * 60)
+        self.assertEqual(result['initial_occupancy'], 1)
+        self.assertEqual((curve[0], curve[539], curve[540], curve[600], curve[660]), (1, 1, 3, 2, 1))
+        self.assertEqual(result['peak'], 3)
+        self.assertEqual(result['peak_time'], '2026-01-05T09:00:00+05:30')
+        self.assertEqual(result['time_to_peak_minutes'], 0)
+
+        alpha, beta = result['teams']
+        self.assertEqual((alpha['team_id'], alpha['peak'], alpha['curve'][600]), (self.alpha.id, 2, 1))
+        self.assertEqual((beta['team_id'], beta['peak'], beta['curve'][660]), (self.beta.id, 1, 0))
+        # Team Beta was at its peak before anyone arrived
+        self.assertIsNone(beta['time_to_peak_minutes'])
+
+    def test_queries_do_not_grow_with_taps(self):
+        from datetime import date
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .analytics import OccupancyService
+
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                OccupancyService._compute(date(2026, 1, 5))
+            return len(captured)
+
+        self.log(self.students[0], 'IN', 2026, 1, 5, 9, 0)
+        few = queries()
+        for minute in range(1, 30):
+            for student in self.students:
+                self.log(student, 'OUT' if minute % 2 else 'IN', 2026, 1, 5, 9, minute)
+        self.assertEqual(queries(), few)
+
+    def test_days_when_the_clocks_change(self):
+        from datetime import date
+        from django.test import override_settings
+        from .analytics import OccupancyService
+
+        with override_settings(TIME_ZONE='America/New_York'):
+            # 04:00 EDT on the spring-forward day is three real hours after midnight
+            self.log(self.students[0], 'IN', 2026, 3, 8, 4, 0)
+            result = OccupancyService._compute(date(2026, 3, 8))
+            self.assertEqual(len(result['curve']), 23 * 60)
+            self.assertEqual((result['curve'][179], result['curve'][180]), (0, 1))
+            self.assertEqual(result['peak_time'], '2026-03-08T04:00:00-04:00')
+
+            self.log(self.students[1], 'IN', 2026, 11, 1, 23, 59)
+            result = OccupancyService._compute(date(2026, 11, 1))
+            self.assertEqual(len(result['curve']), 25 * 60)
+            self.assertEqual(result['curve'][-1], 2)
+            self.assertEqual(result['peak_time'], '2026-11-01T23:59:00-05:00')
+
+    def test_archived_days_are_read_from_the_archive(self):
+        from datetime import date
+        from .analytics import OccupancyService
+        from .models import AttendanceLog, ArchivedAttendanceLog
+
+        self.log(self.students[0], 'IN', 2026, 1, 4, 18, 0)
+        self.log(self.students[1], 'IN', 2026, 1, 5, 9, 0)
+        self.log(self.students[0], 'OUT', 2026, 1, 5, 10, 0)
+        online = OccupancyService.get_occupancy(date(2026, 1, 5))
+
+        ArchivedAttendanceLog.objects.bulk_create(
+            ArchivedAttendanceLog(
+                id=log.id, student_id=log.student_id, team_id=log.team_id,
+                status=log.status, created_at=log.created_at,
+            )
+            for log in AttendanceLog.objects.all()
+        )
+        AttendanceLog.objects.all().delete()
+        self.assertEqual(OccupancyService.get_occupancy(date(2026, 1, 5)), online)
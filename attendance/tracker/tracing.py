@@ -0,0 +1,147 @@
+# tracker/tracing.py
+"""
+Lightweight phase tracing for the RFID tap hot path.
+
+A trace records time.perf_counter_ns() at each phase boundary. Finished
+traces feed a bounded window of recent durations per phase, from which
+percentiles are computed on demand. When tracing is off, begin() returns a
+shared no-op trace, so the hot path pays only for a couple of method calls.
+"""
+import hmac
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from .metrics import format_labels, register_collector
+
+
+PERCENTILES = (50, 95, 99)
+
+# Header carrying ATTENDANCE_DEBUG_TOKEN for the tap-phases control endpoint
+DEBUG_TOKEN_HEADER = 'X-Debug-Token'
+
+
+def debug_token_valid(request):
+    """True when the request carries the configured debug token (never when none is set)."""
+    expected = getattr(settings, 'ATTENDANCE_DEBUG_TOKEN', '')
+    supplied = request.headers.get(DEBUG_TOKEN_HEADER, '')
+    return bool(expected) and hmac.compare_digest(supplied.encode(), expected.encode())
+
+
+class _NullTrace:
+    """No-op trace used while tracing is disabled."""
+
+    def mark(self, phase):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class _Trace:
+    """Durations of the phases of one traced operation."""
+
+    __slots__ = ('tracer', 'started', 'last', 'phases')
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+        self.started = self.last = time.perf_counter_ns()
+        self.phases = []
+
+    def mark(self, phase):
+        """Close the current phase under the given name."""
+        now = time.perf_counter_ns()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def finish(self):
+        """Record the phases and the total duration."""
+        self.phases.append(('total', self.last - self.started))
+        self.tracer.record(self.phases)
+
+
+class PhaseTracer:
+    """Collects per-phase durations over a sliding window of recent traces."""
+
+    def __init__(self, name, window=2048, enabled=False):
+        self.name = name
+        self.window = window
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def begin(self):
+        """Start a trace, or return the no-op trace when disabled."""
+        if not self.enabled:
+            return NULL_TRACE
+        return _Trace(self)
+
+    def record(self, phases):
+        with self._lock:
+            for phase, duration_ns in phases:
+                samples = self._samples.get(phase)
+                if samples is None:
+                    samples = self._samples[phase] = deque(maxlen=self.window)
+                samples.append(duration_ns)
+                self._counts[phase] = self._counts.get(phase, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def summary(self):
+        """
+        Summarize each phase over the recent window.
+
+        Returns:
+            dict: phase -> {'count', 'window', 'mean_us', 'p50_us', 'p95_us', 'p99_us', 'max_us'},
+            in the order phases were first seen
+        """
+        with self._lock:
+            snapshot = {phase: list(samples) for phase, samples in self._samples.items()}
+            counts = dict(self._counts)
+
+        summary = {}
+        for phase, samples in snapshot.items():
+            samples.sort()
+            stats = {
+                'count': counts[phase],
+                'window': len(samples),
+                'mean_us': round(sum(samples) / len(samples) / 1000, 1),
+                'max_us': round(samples[-1] / 1000, 1),
+            }
+            for percentile in PERCENTILES:
+                # Nearest-rank percentile
+                rank = max(0, -(-percentile * len(samples) // 100) - 1)
+                stats[f'p{percentile}_us'] = round(samples[rank] / 1000, 1)
+            summary[phase] = stats
+        return summary
+
+    def render_metrics(self):
+        """Render the phase percentiles as a Prometheus summary."""
+        metric = f'attendance_{self.name}_phase_seconds'
+        lines = [
+            f'# HELP {metric} Recent {self.name} phase durations (sliding window).',
+            f'# TYPE {metric} summary',
+        ]
+        for phase, stats in self.summary().items():
+            for percentile in PERCENTILES:
+                labels = format_labels({'phase': phase, 'quantile': percentile / 100})
+                lines.append(f'{metric}{labels} {stats[f"p{percentile}_us"] / 1e6:.6f}')
+            lines.append(f'{metric}_count{format_labels({"phase": phase})} {stats["count"]}')
+        return lines
+
+
+tap_tracer = PhaseTracer(
+    'rfid_tap',
+    window=getattr(settings, 'ATTENDANCE_TRACE_WINDOW', 2048),
+    enabled=getattr(settings, 'ATTENDANCE_TAP_TRACING', False),
+)
+register_collector(tap_tracer.render_metrics)
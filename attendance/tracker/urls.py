@@ -11,21 +11,32 @@ HTML Interface Pages:
 - GET/POST /registration               - Student registration page
 - GET/POST /attendance                 - Attendance marking page
 
-API Endpoints:
+API Endpoints (POST APIs accept an Idempotency-Key header, see idempotency.py):
 
 PHASE 1 - REGISTRATION:
 - POST /api/teams                      - Create team
+- POST /api/teams/bulk                 - Create/update many teams with members
 - POST /api/students/register          - Register student to team
+- POST /api/students/register/batch    - Register many students at once
 
 PHASE 2 - ATTENDANCE:
 - POST /api/attendance/tap             - Process RFID tap (check-in/out)
+- GET  /api/attendance/gates           - Per-gate tap rate, queue depth, latency
+- POST /api/attendance/checkout-all    - Check out every student still IN
 
 ADMIN QUERIES:
 - GET  /api/teams                      - List all teams
 - GET  /api/teams/<id>                 - Get team details
 - GET  /api/attendance/team/<id>       - Get team attendance history
 - GET  /api/attendance/student/<id>    - Get student attendance history
+- GET  /api/attendance/time-on-site    - Total time on site per student
 - GET  /api/status                     - System status and statistics
+- GET  /api/metrics                    - Prometheus metrics (latency, queries)
+- GET  /api/debug/tap-phases           - RFID tap phase percentiles (POST toggles)
+
+ANALYTICS:
+- GET  /api/analytics/occupancy        - Per-minute occupancy curve and peak
+- GET  /api/attendance/histogram       - IN/OUT counts per time bucket
 """
 
 urlpatterns = [
@@ -44,12 +55,16 @@ urlpatterns = [
     # PHASE 1: TEAM REGISTRATION (API)
     # ========================================================================
     path('api/teams', views.create_team, name='create_team'),
+    path('api/teams/bulk', views.upsert_teams, name='upsert_teams'),
     path('api/students/register', views.register_student, name='register_student_api'),
+    path('api/students/register/batch', views.register_students_batch, name='register_students_batch'),
     
     # ========================================================================
     # PHASE 2: ATTENDANCE TRACKING (API)
     # ========================================================================
     path('api/attendance/tap', views.rfid_tap, name='rfid_tap'),
+    path('api/attendance/gates', views.gate_status, name='gate_status'),
+    path('api/attendance/checkout-all', views.checkout_all, name='checkout_all'),
     
     # ========================================================================
     # ADMIN QUERIES (API)
@@ -58,9 +73,18 @@ urlpatterns = [
     path('api/teams/<int:team_id>', views.get_team_detail, name='get_team_detail'),
     path('api/attendance/team/<int:team_id>', views.get_team_attendance, name='get_team_attendance'),
     path('api/attendance/student/<int:student_id>', views.get_student_attendance, name='get_student_attendance'),
+    path('api/attendance/time-on-site', views.get_time_on_site, name='get_time_on_site'),
+    
+    # ========================================================================
+    # ANALYTICS (API)
+    # ========================================================================
+    path('api/analytics/occupancy', views.occupancy_timeline, name='occupancy_timeline'),
+    path('api/attendance/histogram', views.attendance_histogram, name='attendance_histogram'),
     
     # ========================================================================
     # SYSTEM STATUS (API)
     # ========================================================================
     path('api/status', views.system_status, name='system_status'),
+    path('api/metrics', views.metrics, name='metrics'),
+    path('api/debug/tap-phases', views.tap_phases, name='tap_phases'),
 ]
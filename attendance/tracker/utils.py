@@ -2,9 +2,34 @@
 """
 Business logic and validation utilities for RFID team attendance system.
 """
+import heapq
+from operator import itemgetter
+
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case, Count, DateTimeField, DurationField, Exists, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from .models import Team, Student, AttendanceLog
+from .models import (
+    MAX_STUDENTS_PER_TEAM, Team, Student, RFIDAlias, AttendanceLog, ArchivedAttendanceLog, AttendanceSession
+)
+from .rfid import lookup_key, uid_aliases
+from .archive import archive_horizon
+from .caching import RFID, app_cache, roster_changed
+from .gates import gate_stats
+from .tracing import tap_tracer
+
+
+# Maximum number of students accepted by one batch registration
+MAX_BATCH_SIZE = 500
+
+# reader_id recorded on OUT logs written by the end-of-day checkout
+AUTO_CHECKOUT_READER = 'auto-checkout'
+
+# Rows fetched per page when streaming attendance history
+HISTORY_PAGE_SIZE = 2000
 
 
 class RFIDHelper:
@@ -41,8 +66,23 @@ class TeamValidator:
     @staticmethod
     def validate_team_capacity(team):
         """Check if team can accept more students (max 6)."""
-        if team.students.count() >= 6:
-            raise ValidationError(f"Team '{team.team_name}' already has 6 students.")
+        if team.student_count >= MAX_STUDENTS_PER_TEAM:
+            raise ValidationError(f"Team '{team.team_name}' already has {MAX_STUDENTS_PER_TEAM} students.")
+
+    @staticmethod
+    def recount_students(team_ids):
+        """Recompute student_count and is_complete for teams in one UPDATE."""
+        counts = Student.objects.filter(team=OuterRef('pk')).order_by().values('team').annotate(
+            total=Count('id')
+        ).values('total')
+        Team.objects.filter(id__in=team_ids).update(
+            student_count=Coalesce(Subquery(counts), 0),
+            is_complete=Case(
+                When(Exists(counts.filter(total__gte=MAX_STUDENTS_PER_TEAM)), then=Value(True)),
+                default=Value(False)
+            )
+        )
+        roster_changed()
 
     @staticmethod
     def validate_rfid_unique(rfid_uid, exclude_student_id=None):
@@ -59,7 +99,7 @@ class AttendanceService:
     """Business logic for attendance tracking."""
 
     @staticmethod
-    def process_rfid_tap(rfid_uid):
+    def process_rfid_tap(rfid_uid, reader_id=''):
         """
         Process an RFID tap and toggle between CHECK-IN and CHECK-OUT.
         
@@ -70,23 +110,41 @@ class AttendanceService:
         - 4th tap: OUT
         ... and so on
         
+        Args:
+            rfid_uid (str): UID as reported by the reader
+            reader_id (str): Optional id of the reader (gate) that saw the tap
+        
         Returns:
             dict: Attendance log details with status
         
         Raises:
             ValidationError: If RFID is not registered
         """
-        # Normalize RFID UID (remove leading zeros)
-        rfid_uid = RFIDHelper.normalize_rfid(rfid_uid)
-        
-        # Find student by RFID
+        token = gate_stats.begin(reader_id)
+        ok = False
         try:
-            student = Student.objects.select_related('team').get(rfid_uid=rfid_uid)
-        except Student.DoesNotExist:
-            raise ValidationError(f"RFID '{rfid_uid}' is not registered in the system.")
+            result = AttendanceService._record_tap(rfid_uid, reader_id)
+            ok = True
+            return result
+        finally:
+            gate_stats.finish(token, ok)
+
+    @staticmethod
+    def _record_tap(rfid_uid, reader_id):
+        """Resolve the card, toggle its status and write the log and session."""
+        trace = tap_tracer.begin()
+
+        # Reduce the reader value to its alias lookup key
+        key = lookup_key(rfid_uid)
+        trace.mark('normalize')
+        
+        # Find student by any registered encoding of the card
+        student = AttendanceService._resolve_student(key, rfid_uid)
+        trace.mark('student_lookup')
 
         # Get the last attendance record for this student
         last_log = AttendanceLog.objects.filter(student=student).order_by('-created_at').first()
+        trace.mark('last_log_lookup')
 
         # Determine new status (toggle between IN and OUT)
         if last_log is None or last_log.status == 'OUT':
@@ -94,12 +152,26 @@ class AttendanceService:
         else:
             new_status = 'OUT'
 
-        # Create new attendance log
-        attendance_log = AttendanceLog.objects.create(
-            student=student,
-            team=student.team,
-            status=new_status
-        )
+        # Create new attendance log and open/close the matching session
+        try:
+            with transaction.atomic():
+                attendance_log = AttendanceLog.objects.create(
+                    student=student,
+                    team=student.team,
+                    status=new_status,
+                    reader_id=reader_id or ''
+                )
+                trace.mark('insert')
+                if new_status == 'IN':
+                    SessionService.open_session(student, attendance_log.check_in_time)
+                else:
+                    SessionService.close_session(student, attendance_log.check_out_time)
+        except IntegrityError:
+            # A cached lookup for a student deleted by another worker
+            app_cache.delete(RFID, key)
+            raise ValidationError(f"RFID '{rfid_uid}' is not registered in the system.")
+        trace.mark('session_commit')
+        trace.finish()
 
         return {
             'id': attendance_log.id,
@@ -108,28 +180,184 @@ class AttendanceService:
             'team_id': student.team.id,
             'team_name': student.team.team_name,
             'status': new_status,
+            'reader_id': attendance_log.reader_id or None,
             'timestamp': attendance_log.created_at,
             'check_in_time': attendance_log.check_in_time,
             'check_out_time': attendance_log.check_out_time
         }
 
     @staticmethod
-    def get_student_attendance_history(student_id):
-        """Get all attendance logs for a specific student."""
-        logs = AttendanceLog.objects.filter(
-            student_id=student_id
-        ).select_related('student', 'team').order_by('-created_at')
+    def check_out_all(at=None, team_ids=None):
+        """
+        Check out every student who is still IN, as of `at`.
+        
+        Students whose latest log is an IN at or before `at` are found with
+        one query. An OUT log dated `at` is bulk-inserted for each of them,
+        and their open sessions are closed with one UPDATE. Students who
+        checked in after `at` are left alone.
+        
+        Args:
+            at (datetime): Checkout time (default: now)
+            team_ids (iterable): Only check out students of these teams
+        
+        Returns:
+            int: Number of students checked out
+        
+        Raises:
+            ValidationError: If `at` is in the future
+        """
+        now = timezone.now()
+        at = at or now
+        if at > now:
+            raise ValidationError("Checkout time cannot be in the future.")
+        newer_log = AttendanceLog.objects.filter(
+            student_id=OuterRef('student_id'), created_at__gt=OuterRef('created_at')
+        )
+        still_in = AttendanceLog.objects.filter(status='IN', created_at__lte=at).exclude(Exists(newer_log))
+        if team_ids is not None:
+            still_in = still_in.filter(team_id__in=team_ids)
+
+        with transaction.atomic():
+            rows = list(still_in.values_list('student_id', 'team_id'))
+            if not rows:
+                return 0
+
+            # Sessions first: once the OUT logs exist, still_in is empty
+            AttendanceSession.objects.filter(check_out_time__isnull=True).filter(Exists(
+                still_in.filter(student_id=OuterRef('student_id'), check_in_time=OuterRef('check_in_time'))
+            )).update(
+                check_out_time=at,
+                duration=ExpressionWrapper(
+                    Value(at, output_field=DateTimeField()) - F('check_in_time'),
+                    output_field=DurationField()
+                )
+            )
+
+            logs = AttendanceLog.objects.bulk_create([
+                AttendanceLog(
+                    student_id=student_id, team_id=team_id, status='OUT',
+                    check_out_time=at, reader_id=AUTO_CHECKOUT_READER
+                )
+                for student_id, team_id in rows
+            ])
+            # created_at is auto_now_add; date the logs at the checkout time
+            AttendanceLog.objects.filter(pk__in=[log.pk for log in logs]).update(created_at=at)
+        return len(rows)
+
+    @staticmethod
+    def _resolve_student(key, rfid_uid):
+        """
+        Find the student a lookup key belongs to, through the RFID cache.
+        
+        On a hit no query is made; the returned student and team carry
+        only the fields a tap needs. Errors name the UID as the reader
+        sent it (rfid_uid), not the internal key.
+        """
+        identity = app_cache.get(RFID, key)
+        if identity is not None:
+            student_id, name, team_id, team_name = identity
+            student = Student(id=student_id, name=name, team_id=team_id)
+            student.team = Team(id=team_id, team_name=team_name)
+            return student
+
+        try:
+            student = Student.objects.select_related('team').get(rfid_aliases__alias=key)
+        except Student.DoesNotExist:
+            raise ValidationError(f"RFID '{rfid_uid}' is not registered in the system.")
+        app_cache.set(RFID, key, (student.id, student.name, student.team_id, student.team.team_name))
+        return student
+
+    @staticmethod
+    def _history_querysets(filters, start=None, end=None):
+        """
+        Unordered querysets of the logs matching filters within an optional time range.
+
+        Online logs are always included. The cold-storage table is only
+        included when the range reaches back past the newest archived log.
+        """
+        querysets = []
+        for model in (AttendanceLog, ArchivedAttendanceLog):
+            queryset = model.objects.filter(**filters)
+            if start:
+                queryset = queryset.filter(created_at__gte=start)
+            if end:
+                queryset = queryset.filter(created_at__lt=end)
+            querysets.append(queryset)
+            if model is AttendanceLog:
+                horizon = archive_horizon()
+                if horizon is None or (start and start > horizon):
+                    break
+        return querysets
+
+    @staticmethod
+    def _history_pages(queryset, fields, page_size):
+        """
+        Yield the rows of queryset newest first, as dicts of fields.
+
+        Rows are read in keyset pages of (created_at, id), each fetched in
+        full before any of it is yielded. No cursor stays open while the
+        caller holds a row, so a slow client never keeps SQLite's read
+        lock and live taps can still write.
+        """
+        queryset = queryset.order_by('-created_at', '-id').values(*fields)
+        page = list(queryset[:page_size])
+        while page:
+            yield from page
+            if len(page) < page_size:
+                return
+            last = page[-1]
+            page = list(queryset.filter(
+                Q(created_at__lt=last['created_at']) | Q(created_at=last['created_at'], id__lt=last['id'])
+            )[:page_size])
+
+    @staticmethod
+    def iter_history(filters, fields, start=None, end=None, page_size=HISTORY_PAGE_SIZE):
+        """
+        Lazily yield logs matching filters as dicts of fields, newest first.
 
-        return logs
+        Rows are fetched page_size at a time and no model instances are
+        built, so memory stays flat however long the history is. fields
+        must include 'id' and 'created_at'.
+        """
+        pages = [
+            # Pin the database now: streamed rows are read after the view
+            # returns, outside any replica routing block
+            AttendanceService._history_pages(queryset.using(queryset.db), fields, page_size)
+            for queryset in AttendanceService._history_querysets(filters, start, end)
+        ]
+        if len(pages) == 1:
+            return pages[0]
+        return heapq.merge(*pages, key=itemgetter('created_at', 'id'), reverse=True)
 
     @staticmethod
-    def get_team_attendance_history(team_id):
-        """Get all attendance logs for a specific team."""
-        logs = AttendanceLog.objects.filter(
-            team_id=team_id
-        ).select_related('student', 'team').order_by('-created_at')
+    def roster_version(team_id=None):
+        """
+        Marker that changes whenever the teams (or one team) and their students change.
 
-        return logs
+        Read from the database, so every worker agrees on it: edits move the
+        newest updated_at, and deletions lower the row count.
+        """
+        teams, students = Team.objects.all(), Student.objects.all()
+        if team_id is not None:
+            teams, students = teams.filter(id=team_id), students.filter(team_id=team_id)
+        return tuple(
+            tuple(queryset.aggregate(last=Max('updated_at'), count=Count('id')).values())
+            for queryset in (teams, students)
+        )
+
+    @staticmethod
+    def history_version(filters):
+        """
+        Cheap marker that changes whenever the logs matching filters change.
+
+        Taps only ever add logs, and archiving and purging remove them, so
+        the newest id and row count of both tables are enough, and both
+        come from the team/student indexes without reading any log rows.
+        """
+        return tuple(
+            tuple(model.objects.filter(**filters).aggregate(last=Max('id'), count=Count('id')).values())
+            for model in (AttendanceLog, ArchivedAttendanceLog)
+        )
 
     @staticmethod
     def get_live_count():
@@ -169,6 +397,116 @@ class AttendanceService:
         }
 
 
+class SessionService:
+    """Business logic for paired IN/OUT attendance sessions."""
+
+    @staticmethod
+    def open_session(student, check_in_time):
+        """Open a new session for a student who just checked IN."""
+        return AttendanceSession.objects.create(
+            student=student,
+            team_id=student.team_id,
+            check_in_time=check_in_time
+        )
+
+    @staticmethod
+    def close_session(student, check_out_time):
+        """
+        Close the student's most recent open session.
+        
+        Returns:
+            AttendanceSession or None: The closed session, or None if the
+            student had no open session (e.g. logs predate sessions)
+        """
+        session = AttendanceSession.objects.filter(
+            student=student, check_out_time__isnull=True
+        ).order_by('-check_in_time').first()
+        if session is None:
+            return None
+
+        session.check_out_time = check_out_time
+        session.duration = check_out_time - session.check_in_time
+        session.save(update_fields=['check_out_time', 'duration'])
+        return session
+
+    @staticmethod
+    def backfill_sessions(batch_size=1000):
+        """
+        Rebuild all sessions from online and archived attendance logs.
+        
+        Logs are read once, sorted by student then time, and paired in a
+        single pass: an IN opens a session and the next OUT closes it.
+        An IN that is followed by another IN leaves its session open-ended.
+        
+        Returns:
+            int: Number of sessions created
+        """
+        fields = ('student_id', 'team_id', 'status', 'check_in_time', 'check_out_time', 'created_at')
+        sources = [
+            model.objects.order_by('student_id', 'created_at').values_list(*fields).iterator(chunk_size=batch_size)
+            for model in (ArchivedAttendanceLog, AttendanceLog)
+        ]
+        logs = heapq.merge(*sources, key=lambda row: (row[0], row[5]))
+
+        created = 0
+        batch = []
+        open_session = None
+        with transaction.atomic():
+            AttendanceSession.objects.all().delete()
+            for student_id, team_id, status, check_in_time, check_out_time, created_at in logs:
+                if open_session is not None and open_session.student_id != student_id:
+                    open_session = None
+
+                if status == 'IN':
+                    open_session = AttendanceSession(
+                        student_id=student_id,
+                        team_id=team_id,
+                        check_in_time=check_in_time or created_at
+                    )
+                    batch.append(open_session)
+                elif open_session is not None:
+                    open_session.check_out_time = check_out_time or created_at
+                    open_session.duration = open_session.check_out_time - open_session.check_in_time
+                    open_session = None
+
+                # Only flush once the newest session is closed, so it is
+                # never written before its OUT has been paired.
+                if len(batch) >= batch_size and open_session is None:
+                    AttendanceSession.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+
+            AttendanceSession.objects.bulk_create(batch)
+            created += len(batch)
+        return created
+
+    @staticmethod
+    def get_time_on_site(start=None, end=None, team_id=None, student_id=None):
+        """
+        Sum closed session durations per student for sessions starting in a range.
+        
+        Returns:
+            QuerySet: Rows of student id/name, team id/name, session count
+            and total duration, longest first
+        """
+        sessions = AttendanceSession.objects.filter(check_out_time__isnull=False)
+        if start:
+            sessions = sessions.filter(check_in_time__gte=start)
+        if end:
+            sessions = sessions.filter(check_in_time__lt=end)
+        if team_id:
+            sessions = sessions.filter(team_id=team_id)
+        if student_id:
+            sessions = sessions.filter(student_id=student_id)
+
+        return sessions.values(
+            'student_id', 'student__name', 'team_id', 'team__team_name'
+        ).annotate(
+            sessions=Count('id'),
+            total_duration=Sum('duration')
+        ).order_by('-total_duration')
+
+
 class RegistrationService:
     """Business logic for team and student registration."""
 
@@ -195,6 +533,13 @@ class RegistrationService:
         """
         Register a new student to a team.
         
+        Validation runs in a single pass: one query fetches the team
+        together with whether the RFID is already taken, capacity is
+        checked against the denormalized student_count, and the insert
+        relies on reserve_slot() and the unique RFID and alias indexes for
+        the final guarantee. A successful registration costs three queries
+        plus one or two alias inserts (and BEGIN/COMMIT around the writes).
+        
         Args:
             team_id (int): ID of the team
             student_name (str): Name of the student
@@ -209,29 +554,313 @@ class RegistrationService:
         # Normalize RFID UID (remove leading zeros)
         rfid_uid = RFIDHelper.normalize_rfid(rfid_uid)
         
-        # Get team
-        try:
-            team = Team.objects.get(id=team_id)
-        except Team.DoesNotExist:
+        # Get team and RFID availability in one query; the card is taken if
+        # any registered card already answers to one of its encodings
+        team = Team.objects.annotate(
+            rfid_taken=Exists(RFIDAlias.objects.filter(alias__in=uid_aliases(rfid_uid)))
+        ).filter(id=team_id).first()
+        if team is None:
             raise ValidationError(f"Team with ID {team_id} does not exist.")
 
         # Validate RFID uniqueness
-        TeamValidator.validate_rfid_unique(rfid_uid)
+        if team.rfid_taken:
+            raise ValidationError(f"RFID '{rfid_uid}' is already registered.")
 
-        # Validate team capacity
+        # Validate team capacity (no query: uses student_count)
         TeamValidator.validate_team_capacity(team)
 
-        # Create student
-        student = Student.objects.create(
-            name=student_name,
-            rfid_uid=rfid_uid,
-            team=team
-        )
+        # Validate field values without touching the database (the team
+        # was just loaded, so its foreign key check is skipped)
+        student = Student(name=student_name, rfid_uid=rfid_uid, team=team)
+        student.clean_fields(exclude=['team'])
 
-        # Check if team is now complete (6 students)
-        if team.students.count() == 6:
-            team.is_complete = True
-            team.save()
+        # Reserve the slot and insert; the unique indexes catch a
+        # concurrent registration of the same card
+        try:
+            student.save(full_clean=False)
+        except IntegrityError:
+            raise ValidationError(f"RFID '{rfid_uid}' is already registered.")
 
         return student
 
+    @staticmethod
+    def register_students_batch(items, all_or_nothing=True):
+        """
+        Register many students in one pass.
+        
+        The whole batch is validated with set-based queries: one query for
+        RFIDs that are already registered and one for the referenced teams.
+        Duplicate RFIDs inside the batch and team overflow are detected in
+        memory. Valid students are then inserted in a single transaction
+        with one slot reservation per team and one bulk_create.
+        
+        Args:
+            items (list): Dicts with team_id, name (or student_name) and rfid_uid
+            all_or_nothing (bool): If True, nothing is inserted when any
+                item fails; otherwise valid items are inserted and
+                invalid ones reported
+            
+        Returns:
+            list: One result per item, in input order. Each result has
+            'index' and 'status' ('created', 'error' or 'skipped'), plus
+            'student' for created items or 'error' for failed ones
+        
+        Raises:
+            ValidationError: If the batch itself is malformed
+        """
+        if not isinstance(items, list) or not items:
+            raise ValidationError("students must be a non-empty list")
+        if len(items) > MAX_BATCH_SIZE:
+            raise ValidationError(f"A batch cannot contain more than {MAX_BATCH_SIZE} students")
+
+        results = [{'index': index, 'status': 'pending'} for index in range(len(items))]
+        pending = []
+
+        def fail(index, message):
+            results[index]['status'] = 'error'
+            results[index]['error'] = message
+
+        # Per-item field validation (no queries)
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                fail(index, "Each student must be an object")
+                continue
+            name = str(item.get('name') or item.get('student_name') or '').strip()
+            rfid_uid = RFIDHelper.normalize_rfid(str(item.get('rfid_uid') or '').strip())
+            team_id = item.get('team_id')
+            if not team_id:
+                fail(index, "team_id is required")
+            elif not name:
+                fail(index, "name is required")
+            elif not rfid_uid:
+                fail(index, "rfid_uid is required")
+            else:
+                try:
+                    team_id = int(team_id)
+                    Student(name=name, rfid_uid=rfid_uid, team_id=team_id).clean_fields(exclude=['team'])
+                except (TypeError, ValueError):
+                    fail(index, "team_id must be an integer")
+                except ValidationError as e:
+                    fail(index, str(e))
+                else:
+                    pending.append((index, team_id, name, rfid_uid))
+
+        # Set-based checks against the database and within the batch, over
+        # every encoding of each card
+        aliases = {index: uid_aliases(rfid_uid) for index, _, _, rfid_uid in pending}
+        registered = set(RFIDAlias.objects.filter(
+            alias__in={alias for keys in aliases.values() for alias in keys}
+        ).values_list('alias', flat=True))
+        teams = Team.objects.in_bulk({team_id for _, team_id, _, _ in pending})
+
+        seen = set()
+        free_slots = {team_id: MAX_STUDENTS_PER_TEAM - team.student_count for team_id, team in teams.items()}
+        valid = []
+        for index, team_id, name, rfid_uid in pending:
+            if team_id not in teams:
+                fail(index, f"Team with ID {team_id} does not exist.")
+            elif not registered.isdisjoint(aliases[index]):
+                fail(index, f"RFID '{rfid_uid}' is already registered.")
+            elif not seen.isdisjoint(aliases[index]):
+                fail(index, f"RFID '{rfid_uid}' appears more than once in the batch.")
+            elif free_slots[team_id] <= 0:
+                fail(index, f"Team '{teams[team_id].team_name}' already has {MAX_STUDENTS_PER_TEAM} students.")
+            else:
+                seen.update(aliases[index])
+                free_slots[team_id] -= 1
+                valid.append((index, team_id, name, rfid_uid))
+
+        has_errors = len(valid) < len(items)
+        if all_or_nothing and has_errors:
+            for result in results:
+                if result['status'] == 'pending':
+                    result['status'] = 'skipped'
+            return results
+
+        # Insert everything that passed in one transaction
+        per_team = {}
+        for entry in valid:
+            per_team.setdefault(entry[1], []).append(entry)
+
+        students = []
+        try:
+            with transaction.atomic():
+                for team_id, entries in per_team.items():
+                    try:
+                        teams[team_id].reserve_slot(len(entries))
+                    except ValidationError as e:
+                        # Another registration took the slots since validation
+                        if all_or_nothing:
+                            raise
+                        for index, _, _, _ in entries:
+                            fail(index, str(e))
+                        continue
+                    students.extend(
+                        (index, Student(name=name, rfid_uid=rfid_uid, team=teams[team_id]))
+                        for index, _, name, rfid_uid in entries
+                    )
+                Student.bulk_register([student for _, student in students])
+        except (ValidationError, IntegrityError) as e:
+            # Concurrent change: the transaction was rolled back, nothing was created
+            message = e.messages[0] if isinstance(e, ValidationError) else "RFID was registered concurrently; retry the batch."
+            for result in results:
+                if result['status'] == 'pending':
+                    result['status'] = 'error'
+                    result['error'] = message
+            return results
+
+        for index, student in students:
+            results[index]['status'] = 'created'
+            results[index]['student'] = student
+        return results
+
+    @staticmethod
+    def upsert_teams(teams_data):
+        """
+        Create or update many teams and their members in one transaction.
+        
+        Teams are matched by team_name and members by RFID, in any reader
+        encoding of the card. New teams
+        and students are created, existing students get their name updated,
+        and students not listed are left untouched. Existence checks are
+        set-based (one query for teams, one for RFIDs), writes are bulk,
+        and student counts for every touched team are recomputed with a
+        single UPDATE.
+        
+        Args:
+            teams_data (list): Dicts shaped like the team detail API:
+                {"team_name": ..., "students": [{"name": ..., "rfid_uid": ...}]}
+            
+        Returns:
+            tuple: (teams, created_names) where teams is a list of Team
+            instances in input order and created_names is the set of team
+            names that did not exist before
+        
+        Raises:
+            ValidationError: With a list of errors if any team or student is
+            invalid; nothing is written in that case
+        """
+        if not isinstance(teams_data, list) or not teams_data:
+            raise ValidationError("teams must be a non-empty list")
+        if len(teams_data) > MAX_BATCH_SIZE:
+            raise ValidationError(f"A request cannot contain more than {MAX_BATCH_SIZE} teams")
+
+        errors = []
+        parsed = []
+        seen_names = set()
+        seen_rfids = set()
+
+        # Parse and validate the payload in memory
+        for index, team_data in enumerate(teams_data):
+            if not isinstance(team_data, dict):
+                errors.append(f"teams[{index}]: must be an object")
+                continue
+            team_name = str(team_data.get('team_name') or '').strip()
+            if not team_name:
+                errors.append(f"teams[{index}]: team_name is required")
+                continue
+            if team_name in seen_names:
+                errors.append(f"teams[{index}]: team '{team_name}' appears more than once")
+                continue
+            seen_names.add(team_name)
+            try:
+                Team(team_name=team_name).clean_fields()
+            except ValidationError as e:
+                errors.append(f"teams[{index}]: {'; '.join(e.messages)}")
+                continue
+
+            members = []
+            for position, member in enumerate(team_data.get('students') or []):
+                label = f"teams[{index}].students[{position}]"
+                if not isinstance(member, dict):
+                    errors.append(f"{label}: must be an object")
+                    continue
+                name = str(member.get('name') or '').strip()
+                rfid_uid = RFIDHelper.normalize_rfid(str(member.get('rfid_uid') or '').strip())
+                if not name or not rfid_uid:
+                    errors.append(f"{label}: name and rfid_uid are required")
+                    continue
+                keys = uid_aliases(rfid_uid)
+                if not seen_rfids.isdisjoint(keys):
+                    errors.append(f"{label}: RFID '{rfid_uid}' appears more than once")
+                    continue
+                seen_rfids.update(keys)
+                try:
+                    Student(name=name, rfid_uid=rfid_uid).clean_fields(exclude=['team'])
+                except ValidationError as e:
+                    errors.append(f"{label}: {'; '.join(e.messages)}")
+                    continue
+                members.append((name, rfid_uid, keys))
+            parsed.append((team_name, members))
+
+        if errors:
+            raise ValidationError(errors)
+
+        # Set-based existence checks
+        existing_teams = {
+            team.team_name: team for team in Team.objects.filter(team_name__in=seen_names).order_by()
+        }
+        students_by_alias = {
+            student.matched_alias: student
+            for student in Student.objects.filter(rfid_aliases__alias__in=seen_rfids).annotate(
+                matched_alias=F('rfid_aliases__alias')
+            ).only('id', 'name', 'rfid_uid', 'team_id').order_by()
+        }
+
+        new_team_names = [name for name, _ in parsed if name not in existing_teams]
+        for team_name, members in parsed:
+            team = existing_teams.get(team_name)
+            added = 0
+            for _, rfid_uid, keys in members:
+                # A member is an existing student when its own key is one of
+                # that card's encodings; a clash on a derived one is another card
+                student = students_by_alias.get(keys[0])
+                if student is None and not students_by_alias.keys().isdisjoint(keys):
+                    errors.append(f"Team '{team_name}': RFID '{rfid_uid}' is already registered")
+                elif student is None:
+                    added += 1
+                elif team is None or student.team_id != team.id:
+                    errors.append(f"Team '{team_name}': RFID '{rfid_uid}' is already registered to another team")
+            current = team.student_count if team else 0
+            if current + added > MAX_STUDENTS_PER_TEAM:
+                errors.append(
+                    f"Team '{team_name}': {current + added} students exceeds the limit of {MAX_STUDENTS_PER_TEAM}"
+                )
+
+        if errors:
+            raise ValidationError(errors)
+
+        # Bulk writes in one transaction
+        with transaction.atomic():
+            created_teams = Team.objects.bulk_create([Team(team_name=name) for name in new_team_names])
+            teams_by_name = dict(existing_teams)
+            teams_by_name.update({team.team_name: team for team in created_teams})
+
+            renamed = []
+            new_students = []
+            for team_name, members in parsed:
+                team = teams_by_name[team_name]
+                for name, rfid_uid, keys in members:
+                    student = students_by_alias.get(keys[0])
+                    if student is None:
+                        new_students.append(Student(name=name, rfid_uid=rfid_uid, team=team))
+                    elif student.name != name:
+                        student.name = name
+                        student.updated_at = timezone.now()
+                        renamed.append(student)
+
+            Student.objects.bulk_update(renamed, ['name', 'updated_at'])
+            if renamed:
+                roster_changed(rfid=True)
+            Student.bulk_register(new_students)
+
+            # Recount every touched team in one statement, then re-check the
+            # limit in case a concurrent registration took a slot meanwhile
+            touched_ids = [team.id for team in teams_by_name.values()]
+            TeamValidator.recount_students(touched_ids)
+            if Team.objects.filter(id__in=touched_ids, student_count__gt=MAX_STUDENTS_PER_TEAM).exists():
+                raise ValidationError("A team exceeded the student limit during the update; retry the request.")
+
+        teams = Team.objects.filter(id__in=touched_ids).prefetch_related('students')
+        teams_by_name = {team.team_name: team for team in teams}
+        return [teams_by_name[name] for name, _ in parsed], set(new_team_names)
@@ -7,21 +7,33 @@ This module provides:
 2. RESTful API endpoints - For RFID hardware integration
 """
 import csv as csv_module
+import hashlib
+from django.conf import settings
 from django.http import JsonResponse, HttpResponse
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
-from django.db.models import Count, Q, Subquery, OuterRef, Exists
+from django.db.models import Q, Subquery, OuterRef, Exists
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from datetime import datetime, timedelta
 import json
 
-from .models import Team, Student, AttendanceLog
-from .utils import RegistrationService, AttendanceService, TeamValidator
+from .models import Team, Student, AttendanceLog, ArchivedAttendanceLog
+from .utils import RegistrationService, AttendanceService, SessionService, TeamValidator
+from .analytics import OccupancyService, HistogramService
+from .caching import DASHBOARD, STATUS, TEAMS, app_cache
+from .gates import gate_stats
+from .idempotency import idempotent
+from .metrics import render_metrics
+from .ratelimit import throttle_taps
+from .replica import replica_status
+from .streaming import StreamingJSONResponse
+from .tracing import DEBUG_TOKEN_HEADER, debug_token_valid, tap_tracer
 
 
 # ============================================================================
@@ -51,11 +63,8 @@ def logout_view(request):
     return redirect('login')
 
 
-@login_required(login_url='login')
-def dashboard(request):
-    """Render dashboard with attendance statistics."""
-    today = timezone.now().date()
-    
+def dashboard_aggregates(today):
+    """Attendance counts and the team-wise breakdown for the dashboard."""
     # Get statistics
     total_students = Student.objects.count()
     
@@ -68,11 +77,6 @@ def dashboard(request):
     
     absent_count = total_students - present_count
     attendance_rate = round((present_count / total_students * 100) if total_students > 0 else 0, 1)
-    
-    # Get recent attendance records (last 10)
-    recent_records = AttendanceLog.objects.select_related(
-        'student', 'student__team'
-    ).order_by('-created_at')[:10]
 
     # --- Team-wise attendance breakdown ---
     # IDs of students who checked in today
@@ -98,16 +102,34 @@ def dashboard(request):
             'absent_students': absent,
             'rate': round(len(present) / total * 100, 1) if total > 0 else 0,
         })
-    
-    context = {
-        'today': today,
+
+    return {
         'total_students': total_students,
         'present_count': present_count,
         'absent_count': absent_count,
         'attendance_rate': attendance_rate,
-        'records': recent_records,
         'team_stats': team_stats,
-        'total_teams': teams.count(),
+        'total_teams': len(team_stats),
+    }
+
+
+@login_required(login_url='login')
+def dashboard(request):
+    """Render dashboard with attendance statistics."""
+    today = timezone.now().date()
+    
+    # Aggregates are cached briefly (ATTENDANCE_CACHE_TTL['dashboard'])
+    aggregates = app_cache.get_or_set(DASHBOARD, today.isoformat(), lambda: dashboard_aggregates(today))
+    
+    # Get recent attendance records (last 10)
+    recent_records = AttendanceLog.objects.select_related(
+        'student', 'student__team'
+    ).order_by('-created_at')[:10]
+    
+    context = {
+        'today': today,
+        **aggregates,
+        'records': recent_records,
     }
     
     return render(request, 'dash.html', context)
@@ -172,9 +194,7 @@ def registration_page(request):
             messages.error(request, f'Error: {str(e)}')
     
     # Get all teams for the dropdown
-    teams = Team.objects.annotate(
-        student_count=Count('students')
-    ).order_by('team_name')
+    teams = Team.objects.order_by('team_name')
     
     # Get all registered students
     students = Student.objects.select_related('team').order_by('-registered_at')
@@ -208,9 +228,7 @@ def team_management_page(request):
             messages.error(request, f'Error: {str(e)}')
     
     # Get all teams
-    teams = Team.objects.annotate(
-        student_count=Count('students')
-    ).order_by('team_name')
+    teams = Team.objects.order_by('team_name')
     
     context = {
         'teams': teams,
@@ -289,12 +307,140 @@ def parse_json_body(request):
         raise ValidationError("Invalid JSON in request body")
 
 
+def serialize_team_detail(team):
+    """Serialize a team with its (prefetched) students for the team detail API."""
+    students_data = [{
+        'id': student.id,
+        'name': student.name,
+        'rfid_uid': student.rfid_uid,
+        'registered_at': student.registered_at.isoformat()
+    } for student in team.students.all()]
+    
+    return {
+        'id': team.id,
+        'team_name': team.team_name,
+        'is_complete': team.is_complete,
+        'student_count': len(students_data),
+        'created_at': team.created_at.isoformat(),
+        'students': students_data
+    }
+
+
+STUDENT_HISTORY_FIELDS = ('id', 'status', 'reader_id', 'check_in_time', 'check_out_time', 'created_at')
+TEAM_HISTORY_FIELDS = STUDENT_HISTORY_FIELDS + ('student_id', 'student__name', 'student__rfid_uid')
+
+
+def serialize_student_log(row):
+    """Serialize a history row for the student attendance API (datetimes left to the encoder)."""
+    return {
+        'id': row['id'],
+        'status': row['status'],
+        'reader_id': row['reader_id'] or None,
+        'check_in_time': row['check_in_time'],
+        'check_out_time': row['check_out_time'],
+        'created_at': row['created_at']
+    }
+
+
+def serialize_team_log(row):
+    """Serialize a history row for the team attendance API (datetimes left to the encoder)."""
+    return {
+        'id': row['id'],
+        'student': {
+            'id': row['student_id'],
+            'name': row['student__name'],
+            'rfid_uid': row['student__rfid_uid']
+        },
+        'status': row['status'],
+        'reader_id': row['reader_id'] or None,
+        'check_in_time': row['check_in_time'],
+        'check_out_time': row['check_out_time'],
+        'created_at': row['created_at']
+    }
+
+
+def parse_int_param(request, name):
+    """Parse an optional integer query parameter."""
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError(f"'{name}' must be an integer")
+
+
+def parse_time_range(request):
+    """
+    Parse optional ?from= and ?to= query parameters into aware datetimes.
+
+    Accepts ISO dates (YYYY-MM-DD) or datetimes. A date-only `to` is
+    inclusive of that whole day.
+    """
+    def parse(name, end_of_day=False):
+        value = request.GET.get(name)
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+            moment = None if day else parse_datetime(value)
+        except ValueError:
+            day = moment = None
+        if day:
+            if end_of_day:
+                day += timedelta(days=1)
+            moment = datetime.combine(day, datetime.min.time())
+        elif moment is None:
+            raise ValidationError(f"Invalid '{name}' value: {value}")
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    return parse('from'), parse('to', end_of_day=True)
+
+
+def make_etag(*markers):
+    """Build an ETag from version markers."""
+    return hashlib.md5(repr(markers).encode(), usedforsecurity=False).hexdigest()
+
+
+def team_list_etag(request):
+    # Kept on the request so list_teams can key its cached payload by it
+    request.roster_etag = make_etag('teams', AttendanceService.roster_version())
+    return request.roster_etag
+
+
+def team_detail_etag(request, team_id):
+    return make_etag('team', team_id, AttendanceService.roster_version(team_id))
+
+
+def history_etag(request, filters):
+    """ETag for an attendance history: roster, matching logs and requested range."""
+    try:
+        time_range = parse_time_range(request)
+    except ValidationError:
+        return None  # the view answers 400
+    return make_etag(
+        filters, time_range, AttendanceService.roster_version(filters.get('team_id')),
+        AttendanceService.history_version(filters)
+    )
+
+
+def team_attendance_etag(request, team_id):
+    return history_etag(request, {'team_id': team_id})
+
+
+def student_attendance_etag(request, student_id):
+    return history_etag(request, {'student_id': student_id})
+
+
 # ============================================================================
 # PHASE 1: TEAM REGISTRATION APIs
 # ============================================================================
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@idempotent
 def create_team(request):
     """
     Create a new team.
@@ -332,6 +478,57 @@ def create_team(request):
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@idempotent
+def upsert_teams(request):
+    """
+    Create or update many teams and their members in one request.
+    
+    POST /api/teams/bulk
+    Body: {
+        "teams": [
+            {
+                "team_name": "Team Alpha",
+                "students": [
+                    {"name": "John Doe", "rfid_uid": "ABC123"},
+                    ...
+                ]
+            },
+            ...
+        ]
+    }
+    
+    Each team uses the same shape as GET /api/teams/<id>. Teams are matched
+    by team_name and students by rfid_uid; students not listed are kept.
+    The request is all-or-nothing.
+    
+    Returns:
+        200: Teams with their members after the update
+        400: Validation errors (nothing is written)
+    """
+    try:
+        data = parse_json_body(request)
+        teams, created_names = RegistrationService.upsert_teams(data.get('teams'))
+        
+        teams_data = [
+            dict(serialize_team_detail(team), created=team.team_name in created_names)
+            for team in teams
+        ]
+        
+        return json_success_response({
+            'created': len(created_names),
+            'updated': len(teams) - len(created_names),
+            'teams': teams_data
+        })
+        
+    except ValidationError as e:
+        return json_success_response({'error': 'Validation failed', 'errors': e.messages}, status=400)
+    except Exception as e:
+        return json_error_response(f"Server error: {str(e)}", status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
 def register_student(request):
     """
     Register a student to a team with RFID.
@@ -388,18 +585,92 @@ def register_student(request):
         return json_error_response(f"Server error: {str(e)}", status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+def register_students_batch(request):
+    """
+    Register many students in one request.
+    
+    POST /api/students/register/batch
+    Body: {
+        "mode": "all_or_nothing",      // or "partial"
+        "students": [
+            {"team_id": 1, "name": "John Doe", "rfid_uid": "ABC123"},
+            ...
+        ]
+    }
+    
+    Returns:
+        201: Every student registered
+        200: Partial mode with some failures (see per-item results)
+        400: Malformed batch, or all-or-nothing mode with any failure
+    """
+    try:
+        data = parse_json_body(request)
+        mode = data.get('mode', 'all_or_nothing')
+        if mode not in ('all_or_nothing', 'partial'):
+            return json_error_response("mode must be 'all_or_nothing' or 'partial'")
+        
+        results = RegistrationService.register_students_batch(
+            data.get('students'), all_or_nothing=(mode == 'all_or_nothing')
+        )
+        
+        results_data = []
+        for result in results:
+            item = {'index': result['index'], 'status': result['status']}
+            if result['status'] == 'created':
+                student = result['student']
+                item['student'] = {
+                    'id': student.id,
+                    'name': student.name,
+                    'rfid_uid': student.rfid_uid,
+                    'team_id': student.team_id,
+                    'registered_at': student.registered_at.isoformat()
+                }
+            elif result['status'] == 'error':
+                item['error'] = result['error']
+            results_data.append(item)
+        
+        created = sum(1 for result in results if result['status'] == 'created')
+        failed = sum(1 for result in results if result['status'] == 'error')
+        if created == len(results):
+            status = 201
+        elif mode == 'partial':
+            status = 200
+        else:
+            status = 400
+        
+        return json_success_response({
+            'mode': mode,
+            'created': created,
+            'failed': failed,
+            'results': results_data
+        }, status=status)
+        
+    except ValidationError as e:
+        return json_error_response(str(e))
+    except Exception as e:
+        return json_error_response(f"Server error: {str(e)}", status=500)
+
+
 # ============================================================================
 # PHASE 2: ATTENDANCE TRACKING APIs
 # ============================================================================
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@throttle_taps
+@idempotent
 def rfid_tap(request):
     """
     Process RFID tap for attendance (check-in/check-out toggle).
     
     POST /api/attendance/tap
-    Body: { "rfid_uid": "ABC123XYZ" }
+    Body: { "rfid_uid": "ABC123XYZ", "reader_id": "gate-1" }
+    
+    reader_id is optional and identifies the gate for per-gate stats and
+    rate limiting; taps without one are not rate limited.
     
     Logic:
     - 1st tap: IN
@@ -411,16 +682,21 @@ def rfid_tap(request):
     Returns:
         200: Attendance logged successfully
         400: RFID not registered
+        429: Reader over its tap rate (see Retry-After)
     """
     try:
         data = parse_json_body(request)
-        rfid_uid = data.get('rfid_uid', '').strip()
         
+        reader_id = data.get('reader_id') or ''
+        if not isinstance(reader_id, str) or len(reader_id.strip()) > 64:
+            return json_error_response("reader_id must be a string of at most 64 characters")
+        
+        rfid_uid = data.get('rfid_uid', '').strip()
         if not rfid_uid:
             return json_error_response("rfid_uid is required")
         
         # Process tap using service
-        result = AttendanceService.process_rfid_tap(rfid_uid)
+        result = AttendanceService.process_rfid_tap(rfid_uid, reader_id=reader_id.strip())
         
         return json_success_response({
             'message': f"Attendance logged: {result['status']}",
@@ -433,11 +709,64 @@ def rfid_tap(request):
         return json_error_response(f"Server error: {str(e)}", status=500)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+@idempotent
+def checkout_all(request):
+    """
+    Check out every student who is still IN (end-of-day close).
+    
+    POST /api/attendance/checkout-all
+    Body (optional): { "at": "2025-01-31T18:00:00", "team_id": 1 }
+    
+    `at` defaults to now and cannot be in the future. Without team_id,
+    students of every team are checked out.
+    
+    Returns:
+        200: Number of students checked out
+        400: Invalid at or team_id
+        404: Team not found
+    """
+    try:
+        data = parse_json_body(request) if request.body else {}
+        
+        at = None
+        if data.get('at'):
+            at = parse_datetime(str(data['at']))
+            if at is None:
+                return json_error_response(f"Invalid 'at' value: {data['at']}")
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        
+        team_ids = None
+        if data.get('team_id') is not None:
+            if not isinstance(data['team_id'], int):
+                return json_error_response("team_id must be an integer")
+            if not Team.objects.filter(id=data['team_id']).exists():
+                return json_error_response(f"Team with ID {data['team_id']} not found", status=404)
+            team_ids = [data['team_id']]
+        
+        at = at or timezone.now()
+        checked_out = AttendanceService.check_out_all(at, team_ids=team_ids)
+        
+        return json_success_response({
+            'message': f"Checked out {checked_out} student(s)",
+            'checked_out': checked_out,
+            'check_out_time': at.isoformat()
+        })
+        
+    except ValidationError as e:
+        return json_error_response(str(e))
+    except Exception as e:
+        return json_error_response(f"Server error: {str(e)}", status=500)
+
+
 # ============================================================================
 # ADMIN QUERY APIs
 # ============================================================================
 
 @require_http_methods(["GET"])
+@condition(etag_func=team_list_etag)
 def list_teams(request):
     """
     Get list of all teams.
@@ -446,30 +775,32 @@ def list_teams(request):
     
     Returns:
         200: List of all teams with student counts
+        304: Unchanged since the ETag in If-None-Match
     """
     try:
-        teams = Team.objects.annotate(
-            student_count=Count('students')
-        ).order_by('team_name')
-        
-        teams_data = [{
-            'id': team.id,
-            'team_name': team.team_name,
-            'is_complete': team.is_complete,
-            'student_count': team.student_count,
-            'created_at': team.created_at.isoformat()
-        } for team in teams]
+        def build():
+            teams_data = [{
+                'id': team.id,
+                'team_name': team.team_name,
+                'is_complete': team.is_complete,
+                'student_count': team.student_count,
+                'created_at': team.created_at.isoformat()
+            } for team in Team.objects.order_by('team_name')]
+            return {
+                'total_teams': len(teams_data),
+                'teams': teams_data
+            }
         
-        return json_success_response({
-            'total_teams': teams.count(),
-            'teams': teams_data
-        })
+        # Cached per roster version, so no worker serves a stale list
+        version = getattr(request, 'roster_etag', None) or team_list_etag(request)
+        return json_success_response(app_cache.get_or_set(TEAMS, f'list:{version}', build))
         
     except Exception as e:
         return json_error_response(f"Server error: {str(e)}", status=500)
 
 
 @require_http_methods(["GET"])
+@condition(etag_func=team_detail_etag)
 def get_team_detail(request, team_id):
     """
     Get detailed information about a specific team.
@@ -478,26 +809,13 @@ def get_team_detail(request, team_id):
     
     Returns:
         200: Team details with all students
+        304: Unchanged since the ETag in If-None-Match
         404: Team not found
     """
     try:
         team = Team.objects.prefetch_related('students').get(id=team_id)
         
-        students_data = [{
-            'id': student.id,
-            'name': student.name,
-            'rfid_uid': student.rfid_uid,
-            'registered_at': student.registered_at.isoformat()
-        } for student in team.students.all()]
-        
-        return json_success_response({
-            'id': team.id,
-            'team_name': team.team_name,
-            'is_complete': team.is_complete,
-            'student_count': len(students_data),
-            'created_at': team.created_at.isoformat(),
-            'students': students_data
-        })
+        return json_success_response(serialize_team_detail(team))
         
     except Team.DoesNotExist:
         return json_error_response(f"Team with ID {team_id} not found", status=404)
@@ -506,91 +824,210 @@ def get_team_detail(request, team_id):
 
 
 @require_http_methods(["GET"])
+@condition(etag_func=team_attendance_etag)
 def get_team_attendance(request, team_id):
     """
     Get attendance history for a specific team.
     
-    GET /api/attendance/team/<team_id>
+    GET /api/attendance/team/<team_id>?from=YYYY-MM-DD&to=YYYY-MM-DD
+    
+    Archived logs are included only when the range reaches back far enough.
     
     Returns:
         200: List of all attendance logs for the team
+        304: Unchanged since the ETag in If-None-Match
         404: Team not found
     """
     try:
         # Check if team exists
         team = Team.objects.get(id=team_id)
         
-        # Get attendance logs
-        logs = AttendanceService.get_team_attendance_history(team_id)
-        
-        logs_data = [{
-            'id': log.id,
-            'student': {
-                'id': log.student.id,
-                'name': log.student.name,
-                'rfid_uid': log.student.rfid_uid
-            },
-            'status': log.status,
-            'check_in_time': log.check_in_time.isoformat() if log.check_in_time else None,
-            'check_out_time': log.check_out_time.isoformat() if log.check_out_time else None,
-            'created_at': log.created_at.isoformat()
-        } for log in logs]
+        # Stream attendance logs as they are read
+        start, end = parse_time_range(request)
+        rows = AttendanceService.iter_history(
+            {'team_id': team.id}, TEAM_HISTORY_FIELDS, start, end
+        )
         
-        return json_success_response({
-            'team_id': team.id,
-            'team_name': team.team_name,
-            'total_logs': len(logs_data),
-            'attendance_logs': logs_data
-        })
+        return StreamingJSONResponse(
+            {'team_id': team.id, 'team_name': team.team_name},
+            'attendance_logs', map(serialize_team_log, rows), count_key='total_logs'
+        )
         
     except Team.DoesNotExist:
         return json_error_response(f"Team with ID {team_id} not found", status=404)
+    except ValidationError as e:
+        return json_error_response(str(e))
     except Exception as e:
         return json_error_response(f"Server error: {str(e)}", status=500)
 
 
 @require_http_methods(["GET"])
+@condition(etag_func=student_attendance_etag)
 def get_student_attendance(request, student_id):
     """
     Get attendance history for a specific student.
     
-    GET /api/attendance/student/<student_id>
+    GET /api/attendance/student/<student_id>?from=YYYY-MM-DD&to=YYYY-MM-DD
+    
+    Archived logs are included only when the range reaches back far enough.
     
     Returns:
         200: List of all attendance logs for the student
+        304: Unchanged since the ETag in If-None-Match
         404: Student not found
     """
     try:
         # Check if student exists
         student = Student.objects.select_related('team').get(id=student_id)
         
-        # Get attendance logs
-        logs = AttendanceService.get_student_attendance_history(student_id)
-        
-        logs_data = [{
-            'id': log.id,
-            'status': log.status,
-            'check_in_time': log.check_in_time.isoformat() if log.check_in_time else None,
-            'check_out_time': log.check_out_time.isoformat() if log.check_out_time else None,
-            'created_at': log.created_at.isoformat()
-        } for log in logs]
+        # Stream attendance logs as they are read
+        start, end = parse_time_range(request)
+        rows = AttendanceService.iter_history(
+            {'student_id': student.id}, STUDENT_HISTORY_FIELDS, start, end
+        )
         
-        return json_success_response({
-            'student': {
-                'id': student.id,
-                'name': student.name,
-                'rfid_uid': student.rfid_uid,
-                'team': {
-                    'id': student.team.id,
-                    'team_name': student.team.team_name
+        return StreamingJSONResponse(
+            {
+                'student': {
+                    'id': student.id,
+                    'name': student.name,
+                    'rfid_uid': student.rfid_uid,
+                    'team': {
+                        'id': student.team.id,
+                        'team_name': student.team.team_name
+                    }
                 }
             },
-            'total_logs': len(logs_data),
-            'attendance_logs': logs_data
-        })
+            'attendance_logs', map(serialize_student_log, rows), count_key='total_logs'
+        )
         
     except Student.DoesNotExist:
         return json_error_response(f"Student with ID {student_id} not found", status=404)
+    except ValidationError as e:
+        return json_error_response(str(e))
+    except Exception as e:
+        return json_error_response(f"Server error: {str(e)}", status=500)
+
+
+@require_http_methods(["GET"])
+def get_time_on_site(request):
+    """
+    Get total time on site per student from paired attendance sessions.
+    
+    GET /api/attendance/time-on-site?team_id=1&student_id=2&from=YYYY-MM-DD&to=YYYY-MM-DD
+    
+    Only closed sessions that started within the range are counted.
+    
+    Returns:
+        200: Per-student session counts and total seconds on site
+        400: Invalid parameters
+    """
+    try:
+        start, end = parse_time_range(request)
+        rows = SessionService.get_time_on_site(
+            start=start,
+            end=end,
+            team_id=parse_int_param(request, 'team_id'),
+            student_id=parse_int_param(request, 'student_id')
+        )
+        
+        students_data = [{
+            'student_id': row['student_id'],
+            'student_name': row['student__name'],
+            'team_id': row['team_id'],
+            'team_name': row['team__team_name'],
+            'sessions': row['sessions'],
+            'total_seconds': int(row['total_duration'].total_seconds())
+        } for row in rows]
+        
+        return json_success_response({
+            'from': start.isoformat() if start else None,
+            'to': end.isoformat() if end else None,
+            'total_students': len(students_data),
+            'students': students_data
+        })
+        
+    except ValidationError as e:
+        return json_error_response(str(e))
+    except Exception as e:
+        return json_error_response(f"Server error: {str(e)}", status=500)
+
+
+# ============================================================================
+# ANALYTICS APIs
+# ============================================================================
+
+@require_http_methods(["GET"])
+def occupancy_timeline(request):
+    """
+    Get the per-minute occupancy curve for a day, event-wide and per team.
+    
+    GET /api/analytics/occupancy?date=YYYY-MM-DD&team_id=1
+    
+    `date` defaults to today; `team_id` limits the team breakdown to one team.
+    
+    Returns:
+        200: Occupancy curve, peak, peak time and time-to-peak
+        400: Invalid parameters
+    """
+    try:
+        day = timezone.localdate()
+        if request.GET.get('date'):
+            day = parse_date(request.GET['date'])
+            if day is None:
+                raise ValidationError(f"Invalid 'date' value: {request.GET['date']}")
+        team_id = parse_int_param(request, 'team_id')
+        
+        result = OccupancyService.get_occupancy(day)
+        if team_id:
+            result = dict(result, teams=[t for t in result['teams'] if t['team_id'] == team_id])
+        
+        return json_success_response(result)
+        
+    except ValidationError as e:
+        return json_error_response(str(e))
+    except ValueError as e:
+        return json_error_response(f"Invalid 'date' value: {e}")
+    except Exception as e:
+        return json_error_response(f"Server error: {str(e)}", status=500)
+
+
+@require_http_methods(["GET"])
+def attendance_histogram(request):
+    """
+    Get arrival/departure counts per time bucket.
+    
+    GET /api/attendance/histogram?interval=15m&team_id=1&from=YYYY-MM-DD&to=YYYY-MM-DD
+    
+    `interval` is one of 5m, 15m, 30m, 1h (default 1h). The range defaults
+    to today and may span up to 31 days; `team_id` limits it to one team.
+    
+    Returns:
+        200: Zero-filled list of buckets with IN and OUT counts
+        400: Invalid parameters
+    """
+    try:
+        start, end = parse_time_range(request)
+        day_start, day_end = OccupancyService.day_bounds(timezone.localdate())
+        start = start or day_start
+        end = end or max(day_end, start + timedelta(days=1))
+        interval = request.GET.get('interval', '1h')
+        team_id = parse_int_param(request, 'team_id')
+        
+        buckets = HistogramService.get_histogram(start, end, interval=interval, team_id=team_id)
+        
+        return json_success_response({
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'interval': interval,
+            'team_id': team_id,
+            'total_in': sum(bucket['in'] for bucket in buckets),
+            'total_out': sum(bucket['out'] for bucket in buckets),
+            'buckets': buckets
+        })
+        
+    except ValidationError as e:
+        return json_error_response(str(e))
     except Exception as e:
         return json_error_response(f"Server error: {str(e)}", status=500)
 
@@ -610,23 +1047,104 @@ def system_status(request):
         200: System statistics
     """
     try:
-        total_teams = Team.objects.count()
-        complete_teams = Team.objects.filter(is_complete=True).count()
-        total_students = Student.objects.count()
-        total_attendance_logs = AttendanceLog.objects.count()
-        
-        return json_success_response({
-            'status': 'operational',
-            'statistics': {
+        def build():
+            total_teams = Team.objects.count()
+            complete_teams = Team.objects.filter(is_complete=True).count()
+            return {
                 'total_teams': total_teams,
                 'complete_teams': complete_teams,
                 'incomplete_teams': total_teams - complete_teams,
-                'total_students': total_students,
-                'total_attendance_logs': total_attendance_logs,
+                'total_students': Student.objects.count(),
+                'total_attendance_logs': AttendanceLog.objects.count(),
+                'archived_attendance_logs': ArchivedAttendanceLog.objects.count(),
                 'students_per_team': 6
-            },
+            }
+        
+        # Log counts may lag by up to ATTENDANCE_CACHE_TTL['status'] seconds
+        return json_success_response({
+            'status': 'operational',
+            'statistics': app_cache.get_or_set(STATUS, 'statistics', build),
+            'cache': app_cache.stats(),
+            'replica': replica_status(),
             'timestamp': timezone.now().isoformat()
         })
         
     except Exception as e:
         return json_error_response(f"Server error: {str(e)}", status=500)
+
+
+@require_http_methods(["GET"])
+def gate_status(request):
+    """
+    Per-gate tap rate, queue depth and latency over the sliding window.
+    
+    GET /api/attendance/gates
+    
+    Served from in-memory ring buffers of this worker process; no
+    database queries.
+    
+    Returns:
+        200: Stats per reader id
+    """
+    return json_success_response({
+        'window_seconds': gate_stats.window,
+        'gates': gate_stats.summary(),
+        'timestamp': timezone.now().isoformat()
+    })
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """
+    Expose in-process metrics in Prometheus text format.
+    
+    GET /api/metrics
+    
+    Per-view request metrics are only recorded when
+    ATTENDANCE_METRICS_ENABLED is on.
+    
+    Returns:
+        200: Prometheus text exposition
+    """
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def tap_phases(request):
+    """
+    Per-phase timing percentiles of recent RFID taps.
+    
+    GET  /api/debug/tap-phases
+    POST /api/debug/tap-phases
+    Body: { "enabled": true, "reset": true }
+    
+    POST switches tracing on/off and/or clears the window; it needs
+    DEBUG mode or the ATTENDANCE_DEBUG_TOKEN in an X-Debug-Token header.
+    Session cookies are not accepted, so the endpoint needs no CSRF token.
+    
+    Returns:
+        200: Tracing state and per-phase percentiles in microseconds
+        403: POST without DEBUG or a valid debug token
+    """
+    try:
+        if request.method == 'POST':
+            if not (settings.DEBUG or debug_token_valid(request)):
+                return json_error_response(f"A valid {DEBUG_TOKEN_HEADER} header is required", status=403)
+            data = parse_json_body(request)
+            if 'enabled' in data:
+                tap_tracer.enabled = bool(data['enabled'])
+            if data.get('reset'):
+                tap_tracer.reset()
+        
+        return json_success_response({
+            'enabled': tap_tracer.enabled,
+            'window': tap_tracer.window,
+            'phases': tap_tracer.summary(),
+            'timestamp': timezone.now().isoformat()
+        })
+        
+    except ValidationError as e:
+        return json_error_response(str(e))
+    except Exception as e:
+        return json_error_response(f"Server error: {str(e)}", status=500)